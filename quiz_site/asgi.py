@@ -3,6 +3,14 @@ ASGI config for quiz_site project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Serving through ASGI routes the read views to their async versions
+(QUIZ_ASYNC_VIEWS=1) and disables persistent database connections
+(QUIZ_DB_CONN_MAX_AGE=0), since connections opened by the async ORM's worker
+threads are not reused between requests. Both can be overridden in the
+environment. For example:
+
+    uvicorn quiz_site.asgi:application --workers 4
+
 For more information on this file, see
 https://docs.djangoproject.com/en/4.2/howto/deployment/asgi/
 """
@@ -12,5 +20,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'quiz_site.settings')
+os.environ.setdefault('QUIZ_ASYNC_VIEWS', '1')
+os.environ.setdefault('QUIZ_DB_CONN_MAX_AGE', '0')
 
 application = get_asgi_application()
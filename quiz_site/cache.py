@@ -0,0 +1,52 @@
+"""
+Cache backends for quiz_site project.
+
+This module defines the following classes:
+- AtomicFileBasedCache: File-based cache whose add and incr are atomic.
+
+Django's FileBasedCache implements add and incr as a read followed by a
+write, so two processes can both add the same key or both increment from the
+same value. The content versions and the leaderboard locks rely on both being
+atomic (see quizzes.versions and quizzes.leaderboards), which Redis and
+Memcached guarantee; AtomicFileBasedCache gives the same guarantee between
+the processes of one host by holding an exclusive file lock around them.
+"""
+
+import os
+import zlib
+from contextlib import contextmanager
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.files import locks
+
+LOCK_STRIPES = 64
+
+
+class AtomicFileBasedCache(FileBasedCache):
+    """
+    File-based cache whose add and incr are atomic between processes.
+
+    Keys are spread over LOCK_STRIPES lock files in the "locks" subdirectory
+    of the cache, so operations on unrelated keys rarely wait for each other.
+    Plain reads and writes take no lock: a write replaces its file atomically.
+    """
+
+    @contextmanager
+    def _locked(self, key, version):
+        directory = os.path.join(self._dir, "locks")
+        os.makedirs(directory, 0o700, exist_ok=True)
+        stripe = zlib.crc32(self.make_key(key, version).encode()) % LOCK_STRIPES
+        with open(os.path.join(directory, f"{stripe}.lock"), "ab") as lock:
+            locks.lock(lock, locks.LOCK_EX)
+            try:
+                yield
+            finally:
+                locks.unlock(lock)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        with self._locked(key, version):
+            return super().add(key, value, timeout, version)
+
+    def incr(self, key, delta=1, version=None):
+        with self._locked(key, version):
+            return super().incr(key, delta, version)
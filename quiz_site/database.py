@@ -0,0 +1,171 @@
+"""
+Database configuration for quiz_site project.
+
+The database is chosen with environment variables:
+
+    QUIZ_DB_ENGINE        "sqlite" (default) or "postgresql"
+    QUIZ_DB_NAME          SQLite file path or PostgreSQL database name
+    QUIZ_DB_CONN_MAX_AGE  Seconds to keep connections open (default: 60)
+
+SQLite:
+
+    QUIZ_SQLITE_BUSY_TIMEOUT  Seconds to wait for the write lock (default: 20)
+    QUIZ_SQLITE_MMAP_SIZE     Bytes of the file to memory-map (default: 256 MiB)
+    QUIZ_SQLITE_WAL           "1" to switch the database to WAL journaling
+
+The PRAGMAs are applied to every SQLite connection by a connection_created
+hook. WAL journaling with synchronous=NORMAL, so readers never block behind a
+writer, is recommended in production but opt-in: it is stored in the database
+file and keeps -wal and -shm files next to it, which would change the
+database shipped with the repository whenever a command runs.
+
+PostgreSQL:
+
+    QUIZ_DB_USER, QUIZ_DB_PASSWORD, QUIZ_DB_HOST, QUIZ_DB_PORT
+    QUIZ_DB_POOL          "" (persistent connections only), "pgbouncer" or
+                          "native" (psycopg pool, Django 5.1+)
+    QUIZ_DB_POOL_MIN_SIZE, QUIZ_DB_POOL_MAX_SIZE  Native pool bounds
+
+Read replicas:
+
+    QUIZ_DB_REPLICAS      Comma-separated replicas: SQLite file paths, or
+                          PostgreSQL hosts as host[:port]. They are configured
+                          as the aliases replica1, replica2... and used by
+                          quiz_site.replicas.ReplicaRouter.
+
+SQLite replicas are plain copies of the primary refreshed by the
+sync_sqlite_replicas command, which stands in for replication in development.
+"""
+
+import os
+import django
+from django.core.exceptions import ImproperlyConfigured
+from django.db.backends.signals import connection_created
+
+
+def _env_int(name, default):
+    """
+    Return an integer environment variable.
+    """
+    return int(os.environ.get(name, default))
+
+
+def sqlite_pragmas():
+    """
+    Return the PRAGMA statements applied to every SQLite connection.
+    """
+    pragmas = {}
+    if os.environ.get("QUIZ_SQLITE_WAL", "0") == "1":
+        pragmas.update(journal_mode="WAL", synchronous="NORMAL")
+    return {
+        **pragmas,
+        "busy_timeout": _env_int("QUIZ_SQLITE_BUSY_TIMEOUT", 20) * 1000,
+        "mmap_size": _env_int("QUIZ_SQLITE_MMAP_SIZE", 256 * 1024 * 1024),
+        "temp_store": "MEMORY",
+        "cache_size": -20000,
+    }
+
+
+def database_config(base_dir):
+    """
+    Build the DATABASES setting from the environment.
+
+    Args:
+        base_dir (Path): The base directory of the project.
+
+    Returns:
+        dict: The DATABASES setting.
+    """
+    engine = os.environ.get("QUIZ_DB_ENGINE", "sqlite")
+    conn_max_age = _env_int("QUIZ_DB_CONN_MAX_AGE", 60)
+
+    if engine == "sqlite":
+        database = {
+            "ENGINE": "django.db.backends.sqlite3",
+            "NAME": os.environ.get("QUIZ_DB_NAME", base_dir / "db.sqlite3"),
+            "CONN_MAX_AGE": conn_max_age,
+            "OPTIONS": {"timeout": _env_int("QUIZ_SQLITE_BUSY_TIMEOUT", 20)},
+        }
+        return _with_replicas(database, engine)
+
+    if engine != "postgresql":
+        raise ImproperlyConfigured(f"Unsupported QUIZ_DB_ENGINE: {engine!r}")
+
+    database = {
+        "ENGINE": "django.db.backends.postgresql",
+        "NAME": os.environ.get("QUIZ_DB_NAME", "quiz_site"),
+        "USER": os.environ.get("QUIZ_DB_USER", ""),
+        "PASSWORD": os.environ.get("QUIZ_DB_PASSWORD", ""),
+        "HOST": os.environ.get("QUIZ_DB_HOST", ""),
+        "PORT": os.environ.get("QUIZ_DB_PORT", ""),
+        "CONN_MAX_AGE": conn_max_age,
+        "CONN_HEALTH_CHECKS": True,
+        "OPTIONS": {"connect_timeout": 5},
+    }
+    pool = os.environ.get("QUIZ_DB_POOL", "")
+    if pool == "pgbouncer":
+        # Transaction pooling cannot keep server-side cursors open.
+        database["DISABLE_SERVER_SIDE_CURSORS"] = True
+    elif pool == "native":
+        if django.VERSION < (5, 1):
+            raise ImproperlyConfigured("QUIZ_DB_POOL=native requires Django 5.1+.")
+        database["CONN_MAX_AGE"] = 0
+        database["OPTIONS"]["pool"] = {
+            "min_size": _env_int("QUIZ_DB_POOL_MIN_SIZE", 2),
+            "max_size": _env_int("QUIZ_DB_POOL_MAX_SIZE", 20),
+        }
+    elif pool:
+        raise ImproperlyConfigured(f"Unsupported QUIZ_DB_POOL: {pool!r}")
+    return _with_replicas(database, engine)
+
+
+def _with_replicas(database, engine):
+    """
+    Return the DATABASES setting of a primary and the replicas of QUIZ_DB_REPLICAS.
+
+    Replicas share the settings of the primary except for their location, and
+    mirror the primary in tests.
+    """
+    databases = {"default": database}
+    replicas = [
+        replica.strip()
+        for replica in os.environ.get("QUIZ_DB_REPLICAS", "").split(",")
+        if replica.strip()
+    ]
+    for index, replica in enumerate(replicas, start=1):
+        if engine == "sqlite":
+            location = {"NAME": replica}
+        else:
+            host, _, port = replica.partition(":")
+            location = {"HOST": host, "PORT": port or database["PORT"]}
+        databases[f"replica{index}"] = {
+            **database,
+            **location,
+            "OPTIONS": dict(database["OPTIONS"]),
+            "TEST": {"MIRROR": "default"},
+        }
+    return databases
+
+
+def replica_aliases(databases):
+    """
+    Return the aliases of the read replicas of a DATABASES setting.
+    """
+    return [alias for alias in databases if alias.startswith("replica")]
+
+
+# pylint: disable=W0613
+def configure_sqlite_connection(sender, connection, **kwargs):
+    """
+    Apply the PRAGMAs of sqlite_pragmas to a new SQLite connection.
+    """
+    if connection.vendor != "sqlite":
+        return
+    with connection.cursor() as cursor:
+        for pragma, value in sqlite_pragmas().items():
+            cursor.execute(f"PRAGMA {pragma} = {value}")
+
+
+connection_created.connect(
+    configure_sqlite_connection, dispatch_uid="quiz_site.configure_sqlite_connection"
+)
@@ -0,0 +1,149 @@
+"""
+Read replica routing for quiz_site project.
+
+ReplicaRouter sends every write, and by default every read, to the primary
+database ("default"). Reads go to a read replica (see QUIZ_DB_REPLICAS in
+quiz_site/database.py) only while ReplicaMiddleware allows it, that is while
+handling a GET or HEAD request, so that workers, management commands and the
+shell never act on stale data. A request reads from one replica throughout,
+chosen at random, so its reads are consistent with each other.
+
+Replicas lag behind the primary. To let takers read their own writes, a
+request that may write (any other method) pins its client to the primary with
+a short-lived cookie: the redirect to quiz_result after a submission, and
+every page for DATABASE_REPLICA_PIN_SECONDS afterwards, read the primary.
+Reads inside a transaction of the primary also stay on it. Views that never
+write, such as autosaving to a cache, opt out of pinning with no_replica_pin,
+so that their requests do not move a busy client off the replicas.
+
+Queries are counted per alias by the request instrumentation (see
+quizzes.instrumentation), which shows how the load is split.
+"""
+
+import random
+import time
+from contextvars import ContextVar
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+PIN_COOKIE_NAME = "quizzes_primary"
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+read_alias = ContextVar("quiz_site_read_alias", default=None)
+
+
+def no_replica_pin(view_func):
+    """
+    Mark a view whose requests never write to the database.
+
+    ReplicaMiddleware does not pin the clients of such a view to the primary,
+    whatever the method of the request.
+
+    Args:
+        view_func (callable): The view function.
+
+    Returns:
+        callable: The same view function.
+    """
+    view_func.replica_pin_exempt = True
+    return view_func
+
+
+def get_replicas():
+    """
+    Return the aliases of the configured read replicas.
+    """
+    return getattr(settings, "DATABASE_REPLICAS", [])
+
+
+class ReplicaRouter:
+    """
+    Database router sending allowed reads to a replica and the rest to the primary.
+    """
+
+    def db_for_read(self, model, **hints):
+        alias = read_alias.get()
+        if alias is None or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return alias
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
+
+
+class ReplicaMiddleware:
+    """
+    Choose the database a request reads from and pin writers to the primary.
+
+    The middleware supports both WSGI and ASGI. The chosen alias is kept in a
+    context variable, which follows the async ORM into its worker threads.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = read_alias.set(self.choose_alias(request))
+        try:
+            response = self.get_response(request)
+        finally:
+            read_alias.reset(token)
+        return self.pin(request, response)
+
+    async def __acall__(self, request):
+        token = read_alias.set(self.choose_alias(request))
+        try:
+            response = await self.get_response(request)
+        finally:
+            read_alias.reset(token)
+        return self.pin(request, response)
+
+    @staticmethod
+    def choose_alias(request):
+        """
+        Return the replica a request may read from, or None for the primary.
+        """
+        replicas = get_replicas()
+        if not replicas or request.method not in SAFE_METHODS:
+            return None
+        try:
+            pinned_until = float(request.COOKIES.get(PIN_COOKIE_NAME, 0))
+        except ValueError:
+            pinned_until = 0
+        if pinned_until > time.time():
+            return None
+        return random.choice(replicas)
+
+    @staticmethod
+    def pin(request, response):
+        """
+        Pin the client of a request that may have written to the primary.
+        """
+        view_func = getattr(request.resolver_match, "func", None)
+        if getattr(view_func, "replica_pin_exempt", False):
+            return response
+        if get_replicas() and request.method not in SAFE_METHODS:
+            seconds = getattr(settings, "DATABASE_REPLICA_PIN_SECONDS", 5)
+            response.set_cookie(
+                PIN_COOKIE_NAME,
+                str(round(time.time() + seconds, 3)),
+                max_age=seconds,
+                httponly=True,
+                samesite="Lax",
+            )
+        return response
@@ -13,6 +13,8 @@ https://docs.djangoproject.com/en/4.2/ref/settings/
 from pathlib import Path
 import os
 
+from .database import database_config, replica_aliases
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -43,6 +45,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'quizzes.middleware.InstrumentationMiddleware',
+    'quiz_site.replicas.ReplicaMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -56,7 +60,7 @@ ROOT_URLCONF = 'quiz_site.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'quizzes.instrumentation.InstrumentedDjangoTemplates',
         'DIRS': [],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -75,12 +79,154 @@ WSGI_APPLICATION = 'quiz_site.wsgi.application'
 
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
+# Configured from QUIZ_DB_* environment variables, see quiz_site/database.py.
+
+DATABASES = database_config(BASE_DIR)
+
+# Reads of GET requests go to the QUIZ_DB_REPLICAS replicas, if any, and
+# everything else to the primary. Clients that posted read the primary for
+# the next few seconds, which must cover the replication lag
+# (see quiz_site/replicas.py).
+
+DATABASE_REPLICAS = replica_aliases(DATABASES)
+DATABASE_ROUTERS = ['quiz_site.replicas.ReplicaRouter']
+DATABASE_REPLICA_PIN_SECONDS = int(os.environ.get('QUIZ_DB_REPLICA_PIN_SECONDS', 5))
+
+
+# Async read views
+# Route quiz_list, take_quiz and quiz_result to their async versions.
+# quiz_site/asgi.py turns this on unless QUIZ_ASYNC_VIEWS is set explicitly.
+
+QUIZZES_ASYNC_VIEWS = os.environ.get('QUIZ_ASYNC_VIEWS', '0') == '1'
+
+
+# Quiz editing
+# The edit page posts every question with its options, about 30 fields per
+# question, so the default limit of 1000 fields caps quizzes at ~30 questions.
+
+DATA_UPLOAD_MAX_NUMBER_FIELDS = 20000
+
 
-DATABASES = {
+# Caches
+# Content versions (see quizzes/versions.py) must be shared by every process
+# serving the site, or an edit made in one process is never seen by the
+# others, must never be evicted, and need an atomic incr. They are kept in
+# files under QUIZ_CACHE_DIR by default, with the file-locked add and incr of
+# quiz_site/cache.py, which covers the processes of one host; set
+# QUIZ_SHARED_CACHE_URL (redis://...) to share them between hosts.
+# The default cache only holds entries derived from versioned content, so it
+# may be per process, but it needs room for a few entries per quiz.
+# Leaderboards are kept in their own cache so that they are never evicted by
+# other entries. They must be shared the same way, in files under
+# QUIZ_CACHE_DIR (or QUIZ_LEADERBOARD_CACHE_DIR) or through
+# QUIZ_SHARED_CACHE_URL, with an atomic add for their update locks.
+# Autosaved drafts of attempts in progress get a cache of their own for the
+# same reason. They hold the answers and draw of a taker, who may reach any
+# process, so they are shared too: in files under QUIZ_CACHE_DIR (or
+# QUIZ_DRAFT_CACHE_DIR) or through QUIZ_SHARED_CACHE_URL. Do not use the
+# database cache for drafts: autosaving must never write to the database.
+
+QUIZ_CACHE_DIR = os.environ.get(
+    'QUIZ_CACHE_DIR', os.path.join(BASE_DIR, 'var', 'cache')
+)
+
+CACHES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'OPTIONS': {'MAX_ENTRIES': 100000},
+    },
+    'versions': {
+        'BACKEND': 'quiz_site.cache.AtomicFileBasedCache',
+        'LOCATION': os.path.join(QUIZ_CACHE_DIR, 'versions'),
+        'TIMEOUT': None,
+        'OPTIONS': {'MAX_ENTRIES': 10000000},
+    },
+    'leaderboards': {
+        'BACKEND': 'quiz_site.cache.AtomicFileBasedCache',
+        'LOCATION': os.path.join(QUIZ_CACHE_DIR, 'leaderboards'),
+        'TIMEOUT': None,
+        'OPTIONS': {'MAX_ENTRIES': 10000000},
+    },
+    'drafts': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.path.join(QUIZ_CACHE_DIR, 'drafts'),
+        'OPTIONS': {'MAX_ENTRIES': 100000},
+    },
+}
+if os.environ.get('QUIZ_SHARED_CACHE_URL'):
+    CACHES['versions'] = {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.environ['QUIZ_SHARED_CACHE_URL'],
+        'KEY_PREFIX': 'versions',
+        'TIMEOUT': None,
+    }
+    CACHES['leaderboards'] = {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.environ['QUIZ_SHARED_CACHE_URL'],
+        'KEY_PREFIX': 'leaderboards',
+        'TIMEOUT': None,
+    }
+    CACHES['drafts'] = {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.environ['QUIZ_SHARED_CACHE_URL'],
+        'KEY_PREFIX': 'drafts',
+    }
+if os.environ.get('QUIZ_LEADERBOARD_CACHE_DIR'):
+    CACHES['leaderboards'] = {
+        'BACKEND': 'quiz_site.cache.AtomicFileBasedCache',
+        'LOCATION': os.environ['QUIZ_LEADERBOARD_CACHE_DIR'],
+        'TIMEOUT': None,
+        'OPTIONS': {'MAX_ENTRIES': 10000000},
     }
+if os.environ.get('QUIZ_DRAFT_CACHE_DIR'):
+    CACHES['drafts'] = {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ['QUIZ_DRAFT_CACHE_DIR'],
+        'OPTIONS': {'MAX_ENTRIES': 100000},
+    }
+
+# Quiz snapshots
+# Decoded snapshots of quiz versions are kept in the memory of each process,
+# least recently used first out beyond this many bytes of JSON.
+
+QUIZZES_SNAPSHOT_CACHE_BYTES = int(
+    os.environ.get('QUIZ_SNAPSHOT_CACHE_BYTES', 64 * 1024 * 1024)
+)
+
+
+# Background jobs
+# Statistics and thumbnails are computed by the workers of
+# `manage.py run_workers` from a queue in the database, see quizzes/jobs.py.
+# QUIZ_JOBS_EAGER=1 runs them in-process on commit instead, without workers.
+
+QUIZZES_JOBS = {
+    'EAGER': os.environ.get('QUIZ_JOBS_EAGER', '0') == '1',
+    'WORKERS': int(os.environ.get('QUIZ_JOB_WORKERS', 2)),
+}
+
+
+# Request instrumentation
+# Measured requests are summarized at /manage/instrumentation/ (staff only).
+# QUIZ_INSTRUMENTATION_LOG=1 also logs one JSON line per request through the
+# 'quizzes.instrumentation' logger; it is off by default to keep the output of
+# the development server and of the test runner readable.
+
+QUIZZES_INSTRUMENTATION = {
+    'SAMPLE_RATE': float(os.environ.get('QUIZ_INSTRUMENTATION_SAMPLE_RATE', 1.0)),
+    'BUFFER_SIZE': 1000,
+    'LOG': os.environ.get('QUIZ_INSTRUMENTATION_LOG', '0') == '1',
+}
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'quizzes.instrumentation': {'handlers': ['console'], 'level': 'INFO'},
+        'quizzes.jobs': {'handlers': ['console'], 'level': 'WARNING'},
+    },
 }
 
 
@@ -126,6 +272,19 @@ STATICFILES_DIRS = [
 
 STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 
+# collectstatic fingerprints and precompresses the files, which the WSGI
+# application serves with far-future cache headers (see quiz_site/staticfiles.py).
+# Vendor libraries are downloaded to static/vendor by fetch_vendor_assets.
+
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'quiz_site.staticfiles.CompressedManifestStaticFilesStorage',
+    },
+}
+
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
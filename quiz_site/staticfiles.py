@@ -0,0 +1,236 @@
+"""
+Static files pipeline for quiz_site project.
+
+CompressedManifestStaticFilesStorage is the staticfiles storage: collectstatic
+copies every file to STATIC_ROOT under a name containing a hash of its content
+(see ManifestStaticFilesStorage) and writes gzip and, when the brotli package
+is installed, brotli versions of text files next to them:
+
+    static/vendor/bootstrap/4.5.2/bootstrap.min.<hash>.css
+    static/vendor/bootstrap/4.5.2/bootstrap.min.<hash>.css.gz
+    static/vendor/bootstrap/4.5.2/bootstrap.min.<hash>.css.br
+
+StaticFilesMiddleware serves STATIC_ROOT in front of the WSGI application
+(see quiz_site/wsgi.py), choosing the precompressed version the client
+accepts. Hashed names never change content, so they are cached for a year
+with the immutable directive; other names are revalidated after a minute.
+The files are indexed at startup: restart the server after collectstatic.
+"""
+
+import email.utils
+import gzip
+import mimetypes
+import os
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_EXTENSIONS = {
+    ".css",
+    ".js",
+    ".mjs",
+    ".map",
+    ".json",
+    ".svg",
+    ".txt",
+    ".html",
+    ".xml",
+    ".ico",
+    ".ttf",
+    ".otf",
+    ".eot",
+}
+# A compressed version is only kept if it saves at least this share of bytes.
+MIN_SAVING = 0.05
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+MUTABLE_CACHE_CONTROL = "public, max-age=60"
+ENCODINGS = [("br", ".br"), ("gzip", ".gz")]
+CHUNK_SIZE = 64 * 1024
+
+
+def _write_atomic(path, data):
+    """
+    Replace a file with new content, so that it is never served half written.
+    """
+    temporary = f"{path}.tmp"
+    with open(temporary, "wb") as output:
+        output.write(data)
+    os.replace(temporary, path)
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """
+    Manifest storage that also writes precompressed versions of text files.
+    """
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+        for name in {*self.hashed_files, *self.hashed_files.values()}:
+            if os.path.splitext(name)[1].lower() in COMPRESSIBLE_EXTENSIONS:
+                self.compress(name)
+
+    def compress(self, name):
+        """
+        Write the gzip and brotli versions of a stored file, if they are smaller.
+
+        Args:
+            name (str): The storage name of the file.
+        """
+        path = self.path(name)
+        with open(path, "rb") as original:
+            content = original.read()
+        versions = {".gz": gzip.compress(content, compresslevel=9, mtime=0)}
+        if brotli is not None:
+            versions[".br"] = brotli.compress(content)
+        for suffix, compressed in versions.items():
+            if len(compressed) <= len(content) * (1 - MIN_SAVING):
+                _write_atomic(path + suffix, compressed)
+            elif os.path.exists(path + suffix):
+                os.remove(path + suffix)
+
+
+def _read_chunks(path):
+    """
+    Yield the content of a file in chunks.
+    """
+    with open(path, "rb") as file:
+        yield from iter(lambda: file.read(CHUNK_SIZE), b"")
+
+
+def _accepted_encodings(header):
+    """
+    Return the content codings accepted by an Accept-Encoding header.
+    """
+    accepted = set()
+    for item in header.split(","):
+        coding, _, params = item.partition(";")
+        if params.replace(" ", "") not in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            accepted.add(coding.strip().lower())
+    return accepted
+
+
+class StaticFilesMiddleware:
+    """
+    WSGI middleware serving the collected static files.
+
+    Requests under STATIC_URL for a collected file are answered without
+    reaching Django; other requests go to the wrapped application.
+
+    Attributes:
+        application (callable): The wrapped WSGI application.
+        prefix (str): The URL path static files are served under.
+        files (dict): The response of every file, by path below the prefix.
+    """
+
+    def __init__(self, application, root=None, prefix=None):
+        self.application = application
+        root = root or settings.STATIC_ROOT
+        prefix = prefix or settings.STATIC_URL
+        self.prefix = "/" + prefix.strip("/") + "/"
+        self.files = self._index(root) if root and "://" not in prefix else {}
+
+    @staticmethod
+    def _immutable_names(root):
+        """
+        Return the hashed names listed in the staticfiles manifest, if any.
+        """
+        storage = CompressedManifestStaticFilesStorage(location=root)
+        return set(storage.hashed_files.values())
+
+    def _index(self, root):
+        """
+        Describe every collected file and its precompressed versions.
+        """
+        if not os.path.isdir(root):
+            return {}
+        immutable = self._immutable_names(root)
+        files = {}
+        for directory, _, names in os.walk(root):
+            present = set(names)
+            for name in names:
+                if name.endswith((".gz", ".br", ".tmp")):
+                    continue
+                path = os.path.join(directory, name)
+                relative = os.path.relpath(path, root).replace(os.sep, "/")
+                content_type, _ = mimetypes.guess_type(name)
+                content_type = content_type or "application/octet-stream"
+                if content_type.startswith("text/") or content_type in (
+                    "application/javascript",
+                    "application/json",
+                ):
+                    content_type += "; charset=utf-8"
+                stat = os.stat(path)
+                variants = {None: (path, stat.st_size)}
+                for coding, suffix in ENCODINGS:
+                    if name + suffix in present:
+                        variants[coding] = (
+                            path + suffix,
+                            os.path.getsize(path + suffix),
+                        )
+                files[relative] = {
+                    "content_type": content_type,
+                    "variants": variants,
+                    "etag": f'"{int(stat.st_mtime):x}-{stat.st_size:x}"',
+                    "last_modified": email.utils.formatdate(
+                        stat.st_mtime, usegmt=True
+                    ),
+                    "cache_control": (
+                        IMMUTABLE_CACHE_CONTROL
+                        if relative in immutable
+                        else MUTABLE_CACHE_CONTROL
+                    ),
+                }
+        return files
+
+    def __call__(self, environ, start_response):
+        path = environ.get("PATH_INFO", "")
+        entry = None
+        if path.startswith(self.prefix):
+            entry = self.files.get(path[len(self.prefix) :])
+        if entry is None:
+            return self.application(environ, start_response)
+        if environ["REQUEST_METHOD"] not in ("GET", "HEAD"):
+            start_response("405 Method Not Allowed", [("Allow", "GET, HEAD")])
+            return [b""]
+
+        coding = None
+        accepted = _accepted_encodings(environ.get("HTTP_ACCEPT_ENCODING", ""))
+        for candidate, _ in ENCODINGS:
+            if candidate in entry["variants"] and candidate in accepted:
+                coding = candidate
+                break
+        file_path, size = entry["variants"][coding]
+        etag = entry["etag"] if coding is None else f'{entry["etag"][:-1]}-{coding}"'
+        headers = [
+            ("Cache-Control", entry["cache_control"]),
+            ("ETag", etag),
+            ("Last-Modified", entry["last_modified"]),
+        ]
+        if len(entry["variants"]) > 1:
+            headers.append(("Vary", "Accept-Encoding"))
+
+        if etag in environ.get("HTTP_IF_NONE_MATCH", ""):
+            start_response("304 Not Modified", headers)
+            return [b""]
+        headers += [
+            ("Content-Type", entry["content_type"]),
+            ("Content-Length", str(size)),
+            ("X-Content-Type-Options", "nosniff"),
+        ]
+        if coding is not None:
+            headers.append(("Content-Encoding", coding))
+        start_response("200 OK", headers)
+        if environ["REQUEST_METHOD"] == "HEAD":
+            return [b""]
+        file_wrapper = environ.get("wsgi.file_wrapper")
+        if file_wrapper is not None:
+            # The server closes the file through the wrapper.
+            # pylint: disable=R1732
+            return file_wrapper(open(file_path, "rb"), CHUNK_SIZE)
+        return _read_chunks(file_path)
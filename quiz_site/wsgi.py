@@ -3,6 +3,9 @@ WSGI config for quiz_site project.
 
 It exposes the WSGI callable as a module-level variable named ``application``.
 
+Collected static files are served ahead of Django, precompressed and with
+far-future cache headers, by StaticFilesMiddleware (see quiz_site/staticfiles.py).
+
 For more information on this file, see
 https://docs.djangoproject.com/en/4.2/howto/deployment/wsgi/
 """
@@ -11,6 +14,8 @@ import os
 
 from django.core.wsgi import get_wsgi_application
 
+from .staticfiles import StaticFilesMiddleware
+
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'quiz_site.settings')
 
-application = get_wsgi_application()
+application = StaticFilesMiddleware(get_wsgi_application())
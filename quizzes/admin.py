@@ -1,10 +1,124 @@
 """
 Admin module for managing the Category, Quiz, Question, \
-and Option models in the Django admin interface.
+Option and Job models in the Django admin interface.
+
+The admin is tuned for large catalogues: changelists fetch the related objects
+they display with list_select_related, foreign keys are picked with
+autocomplete widgets instead of selects listing every row, unfiltered
+changelists of large tables show an estimated count instead of counting every
+row, and the questions of a quiz are edited one page at a time.
 """
 
 from django.contrib import admin
-from .models import Category, Quiz, Question, Option
+from django.core.paginator import Paginator
+from django.db import DatabaseError, connections
+from django.db.models import QuerySet
+from django.forms.models import BaseInlineFormSet
+from django.urls import reverse
+from django.utils.functional import cached_property
+from django.utils import timezone
+from django.utils.html import format_html
+from .editing import copy_quizzes
+from .models import Category, Quiz, Question, Option, Job
+
+ESTIMATED_COUNT_THRESHOLD = 10000
+INLINE_PAGE_SIZE = 50
+
+
+def estimate_row_count(model, using="default"):
+    """
+    Return the estimated number of rows of a model's table.
+
+    PostgreSQL estimates come from the planner statistics (pg_class.reltuples),
+    SQLite ones from the statistics gathered by ANALYZE (sqlite_stat1).
+
+    Args:
+        model (Model): The model class.
+        using (str): The database alias.
+
+    Returns:
+        int: The estimated number of rows, or None if the database has no
+        statistics for the table.
+    """
+    connection = connections[using]
+    table = model._meta.db_table
+    if connection.vendor == "postgresql":
+        sql = "SELECT reltuples FROM pg_class WHERE oid = %s::regclass"
+    elif connection.vendor == "sqlite":
+        sql = "SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1"
+    else:
+        return None
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [table])
+            row = cursor.fetchone()
+    except DatabaseError:
+        return None
+    if row is None:
+        return None
+    estimate = int(str(row[0]).split()[0].split(".")[0])
+    return estimate if estimate >= 0 else None
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator that estimates the size of unfiltered large tables.
+
+    Counting every row of a large table is a full scan. When a changelist is
+    not filtered and the table statistics report at least
+    ESTIMATED_COUNT_THRESHOLD rows, the estimate is used as the count; otherwise
+    the rows are counted exactly.
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if isinstance(queryset, QuerySet) and not queryset.query.where:
+            estimate = estimate_row_count(queryset.model, queryset.db)
+            if estimate is not None and estimate >= ESTIMATED_COUNT_THRESHOLD:
+                return estimate
+        return super().count
+
+
+class PaginatedInlineFormSet(BaseInlineFormSet):
+    """
+    Inline formset that edits one page of the related objects.
+
+    The page is read from the page_param query parameter, which the change form
+    keeps when it is submitted, so the saved forms are the ones displayed.
+    """
+
+    per_page = INLINE_PAGE_SIZE
+    page_param = "page"
+    page_number = None
+    query = None
+
+    def get_queryset(self):
+        if not hasattr(self, "_queryset"):
+            self.page = Paginator(super().get_queryset(), self.per_page).get_page(
+                self.page_number
+            )
+            self._queryset = self.page.object_list
+        return self._queryset
+
+    def page_links(self):
+        """
+        Return (number, query string) pairs linking to the other pages.
+
+        The query string is None for the current page and the ellipses.
+        """
+        self.get_queryset()
+        if self.page.paginator.num_pages < 2:
+            return []
+        links = []
+        for number in self.page.paginator.get_elided_page_range(self.page.number):
+            if number == self.page.number or number == Paginator.ELLIPSIS:
+                links.append((number, None))
+                continue
+            query = self.query.copy()
+            query[self.page_param] = number
+            links.append((number, query.urlencode()))
+        return links
 
 
 class OptionInline(admin.TabularInline):
@@ -21,10 +135,65 @@ class QuestionInline(admin.TabularInline):
     """
     Inline admin descriptor for Question model.
     Defines the formset for the Question model to be displayed inline within the Quiz admin view.
+    Questions are shown one page at a time, so quizzes with hundreds of
+    questions stay editable.
     """
 
     model = Question
-    extra = 5
+    extra = 1
+    formset = PaginatedInlineFormSet
+    template = "admin/quizzes/paginated_tabular.html"
+    page_param = "questions_page"
+
+    def get_formset(self, request, obj=None, **kwargs):
+        formset = super().get_formset(request, obj, **kwargs)
+        formset.page_param = self.page_param
+        formset.page_number = request.GET.get(self.page_param)
+        formset.query = request.GET
+        return formset
+
+
+class QuizFilter(admin.SimpleListFilter):
+    """
+    Filter questions by quiz without listing every quiz.
+    Only the selected quiz is offered; the quiz changelist links to the
+    questions of each quiz.
+    """
+
+    title = "quiz"
+    parameter_name = "quiz"
+
+    def lookups(self, request, model_admin):
+        value = self.value()
+        if not value or not value.isdigit():
+            return []
+        return list(Quiz.objects.filter(id=value).values_list("id", "title"))
+
+    def queryset(self, request, queryset):
+        value = self.value()
+        if value and value.isdigit():
+            return queryset.filter(quiz_id=value)
+        return queryset
+
+
+@admin.action(description="Duplicate selected quizzes")
+def duplicate_quizzes(modeladmin, request, queryset):
+    """
+    Copy the selected quizzes with their questions and options.
+    """
+    copies = copy_quizzes(queryset)
+    modeladmin.message_user(request, f"{len(copies)} quiz(zes) duplicated.")
+
+
+class CategoryAdmin(admin.ModelAdmin):
+    """
+    Admin view for the Category model.
+    Searchable by name, which the category autocomplete of quizzes relies on.
+    """
+
+    list_display = ["name"]
+    search_fields = ["name"]
+    ordering = ["name"]
 
 
 class QuizAdmin(admin.ModelAdmin):
@@ -34,6 +203,23 @@ class QuizAdmin(admin.ModelAdmin):
     """
 
     inlines = [QuestionInline]
+    list_display = ["title", "category", "question_list"]
+    list_select_related = ["category"]
+    list_filter = ["category"]
+    search_fields = ["title"]
+    autocomplete_fields = ["category"]
+    ordering = ["-id"]
+    actions = [duplicate_quizzes]
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    @admin.display(description="questions")
+    def question_list(self, obj):
+        """
+        Link to the questions of a quiz.
+        """
+        url = reverse("admin:quizzes_question_changelist")
+        return format_html('<a href="{}?quiz={}">questions</a>', url, obj.id)
 
 
 class QuestionAdmin(admin.ModelAdmin):
@@ -44,10 +230,66 @@ class QuestionAdmin(admin.ModelAdmin):
     """
 
     inlines = [OptionInline]
-    list_filter = ["quiz"]
+    list_display = ["text", "quiz", "question_type"]
+    list_select_related = ["quiz"]
+    list_filter = [QuizFilter, "question_type"]
+    search_fields = ["text"]
+    autocomplete_fields = ["quiz"]
+    ordering = ["-id"]
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+class OptionAdmin(admin.ModelAdmin):
+    """
+    Admin view for the Option model.
+    """
+
+    list_display = ["text", "question", "is_correct"]
+    list_select_related = ["question"]
+    list_filter = ["is_correct"]
+    search_fields = ["text"]
+    autocomplete_fields = ["question"]
+    ordering = ["-id"]
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+@admin.action(description="Retry selected jobs")
+def retry_jobs(modeladmin, request, queryset):
+    """
+    Queue the selected failed or pending jobs to run again right away.
+    """
+    count = queryset.exclude(status=Job.RUNNING).update(
+        status=Job.PENDING, attempts=0, run_after=timezone.now(), finished=None
+    )
+    modeladmin.message_user(request, f"Queued {count} jobs.")
+
+
+class JobAdmin(admin.ModelAdmin):
+    """
+    Admin view for the Job model.
+    Jobs are read-only apart from the retry action.
+    """
+
+    list_display = ["id", "name", "status", "attempts", "run_after", "finished"]
+    list_filter = ["status", "name"]
+    search_fields = ["key"]
+    ordering = ["-id"]
+    actions = [retry_jobs]
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
 
 
 # Registering the models to the Django admin site
-admin.site.register(Category)
+admin.site.register(Category, CategoryAdmin)
 admin.site.register(Quiz, QuizAdmin)
 admin.site.register(Question, QuestionAdmin)
+admin.site.register(Option, OptionAdmin)
+admin.site.register(Job, JobAdmin)
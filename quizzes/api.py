@@ -0,0 +1,219 @@
+# pylint: disable=E1101
+"""
+JSON API module for the quizzes application.
+
+This module defines the following views:
+- category_list: Return every category.
+- quiz_list: Return a page of quizzes.
+- quiz_detail: Return a quiz with its questions and options, without answers.
+- submit_quiz: Grade and save a submission sent as one JSON body.
+
+Lists are read with .values_list() and serialized by hand, and every response is
+encoded compactly (no whitespace, UTF-8 rather than escapes) with a fixed key
+order, then gzipped when the client accepts it. The read views answer
+conditional requests from content versions like their HTML counterparts.
+
+submit_quiz replaces the form POST, redirect and result page round trip: the
+graded result is returned with the saved attempt.
+"""
+
+import json
+from django.core.exceptions import ValidationError
+from django.http import JsonResponse
+from django.views.decorators.cache import cache_control, never_cache
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.gzip import gzip_page
+from django.views.decorators.http import condition, require_GET, require_POST
+from .conditional import catalogue_etag, catalogue_last_modified, quiz_content_etag
+from .images import get_derivative_url_by_name
+from .models import Category, Quiz
+from .payloads import get_quiz_payload
+from .sampling import (
+    apply_layout,
+    draw_layout,
+    get_question_bank,
+    is_randomized,
+    sign_layout,
+)
+from .submissions import parse_json_answers, save_answers
+
+API_PAGE_SIZE = 100
+API_MAX_AGE = 60
+JSON_DUMPS_PARAMS = {"separators": (",", ":"), "ensure_ascii": False}
+
+
+def _json_response(data, status=200):
+    """
+    Return a compactly encoded JSON response.
+    """
+    return JsonResponse(
+        data, status=status, safe=False, json_dumps_params=JSON_DUMPS_PARAMS
+    )
+
+
+def _error(message, status):
+    """
+    Return a JSON error response.
+    """
+    return _json_response({"error": message}, status=status)
+
+
+@require_GET
+@gzip_page
+@cache_control(public=True, max_age=API_MAX_AGE)
+@condition(catalogue_etag, catalogue_last_modified)
+def category_list(request):
+    """
+    Return every category.
+
+    Args:
+        request (HttpRequest): The HTTP request object.
+
+    Returns:
+        JsonResponse: {"categories": [{"id", "name"}, ...]}, ordered by name.
+    """
+    categories = Category.objects.order_by("name").values_list("id", "name")
+    return _json_response(
+        {"categories": [{"id": id_, "name": name} for id_, name in categories]}
+    )
+
+
+@require_GET
+@gzip_page
+@cache_control(public=True, max_age=API_MAX_AGE)
+@condition(catalogue_etag, catalogue_last_modified)
+def quiz_list(request):
+    """
+    Return a page of quizzes.
+
+    Like the HTML list, quizzes are paginated by ID with a keyset cursor
+    (?after=<id>) and can be filtered by category (?category=<id>).
+
+    Args:
+        request (HttpRequest): The HTTP request object.
+
+    Returns:
+        JsonResponse: {"quizzes": [...], "next_after": <id or null>}, or a
+        400 response if a parameter is not an integer.
+    """
+    quizzes = Quiz.objects.order_by("id")
+    try:
+        if "category" in request.GET:
+            quizzes = quizzes.filter(category_id=int(request.GET["category"]))
+        if "after" in request.GET:
+            quizzes = quizzes.filter(id__gt=int(request.GET["after"]))
+    except ValueError:
+        return _error("category and after must be integers.", 400)
+
+    rows = list(
+        quizzes.values_list(
+            "id", "title", "category_id", "category__name", "image", "thumbnails"
+        )[: API_PAGE_SIZE + 1]
+    )
+    next_after = None
+    if len(rows) > API_PAGE_SIZE:
+        rows = rows[:API_PAGE_SIZE]
+        next_after = rows[-1][0]
+    return _json_response(
+        {
+            "quizzes": [
+                {
+                    "id": id_,
+                    "title": title,
+                    "category_id": category_id,
+                    "category_name": category_name,
+                    "image_url": get_derivative_url_by_name(image, "card", thumbnails),
+                }
+                for id_, title, category_id, category_name, image, thumbnails in rows
+            ],
+            "next_after": next_after,
+        }
+    )
+
+
+@require_GET
+@gzip_page
+@cache_control(public=True, no_cache=True)
+@condition(etag_func=quiz_content_etag)
+def quiz_detail(request, quiz_id):
+    """
+    Return a quiz with its questions and options, without answers.
+
+    Randomized quizzes are drawn like on the take quiz page, and the payload
+    then carries the signed draw to send back with the answers.
+
+    Args:
+        request (HttpRequest): The HTTP request object.
+        quiz_id (int): The ID of the quiz.
+
+    Returns:
+        JsonResponse: The quiz payload also rendered by take_quiz.
+
+    Raises:
+        Http404: If the quiz does not exist.
+    """
+    payload = get_quiz_payload(quiz_id)
+    bank = get_question_bank(quiz_id, payload)
+    if is_randomized(bank):
+        layout = draw_layout(bank)
+        payload = {
+            **payload,
+            "questions": apply_layout(payload["questions"], layout),
+            "draw": sign_layout(quiz_id, layout),
+        }
+    return _json_response(payload)
+
+
+@csrf_exempt
+@require_POST
+@gzip_page
+@never_cache
+def submit_quiz(request, quiz_id):
+    """
+    Grade and save a submission sent as one JSON body.
+
+    The body maps question IDs to answers, see parse_json_answers, and
+    carries the "draw" of quiz_detail for randomized quizzes. It must be
+    sent as application/json, which a cross-site form cannot do, so the view
+    does not need a CSRF token.
+
+    Args:
+        request (HttpRequest): The HTTP request object.
+        quiz_id (int): The ID of the quiz being taken.
+
+    Returns:
+        JsonResponse: The attempt ID, score and per-question results with
+        status 201, or an error with status 400, 404 or 415.
+    """
+    if request.content_type != "application/json":
+        return _error("Expected an application/json body.", 415)
+    if not Quiz.objects.filter(id=quiz_id).exists():
+        return _error("Quiz not found.", 404)
+    try:
+        payload = json.loads(request.body)
+    except ValueError:
+        return _error("Malformed JSON body.", 400)
+    try:
+        attempt, results = save_answers(
+            quiz_id, parse_json_answers(payload), draw=payload.get("draw")
+        )
+    except ValidationError as error:
+        return _error(" ".join(error.messages), 400)
+
+    return _json_response(
+        {
+            "attempt_id": attempt.id,
+            "score": attempt.score,
+            "max_score": attempt.max_score,
+            "results": [
+                {
+                    "question_id": result["question"]["id"],
+                    "is_correct": result["is_correct"],
+                    "selected": result["selected"],
+                    "correct": result["correct"],
+                }
+                for result in results
+            ],
+        },
+        status=201,
+    )
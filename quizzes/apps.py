@@ -18,3 +18,11 @@ class QuizzesConfig(AppConfig):
 
     default_auto_field = "django.db.models.BigAutoField"
     name = "quizzes"
+
+    def ready(self):
+        """
+        Connect the signal handlers of the application.
+        """
+        # pylint: disable=C0415
+        # pylint: disable=W0611
+        from . import signals
@@ -0,0 +1,389 @@
+# pylint: disable=E1101
+"""
+Benchmark module for the quizzes application.
+
+This module defines the following:
+- seed_catalogue: Create a synthetic catalogue of a given size.
+- Scenario: One request path exercised by the benchmark.
+- build_scenarios: Return the scenarios covering the quiz request paths.
+- run_scenario: Drive a scenario with concurrent workers and measure it.
+- run_scenario_async: Drive a scenario through the ASGI handler and measure it.
+- asgi_urlconf: Return a URLconf routing the read views to their async versions.
+- compare_with_baseline: Report the query counts that regressed.
+
+Every request is issued through the Django test client (WSGI) or async test
+client (ASGI) inside collect_metrics, so each measurement records both its
+latency and its number of SQL queries, including those the async ORM runs in
+worker threads.
+"""
+
+import asyncio
+import itertools
+import json
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from http.cookies import SimpleCookie
+from types import ModuleType
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib import admin
+from django.db import connections
+from django.test import AsyncClient, Client
+from django.urls import include, path, reverse
+from .instrumentation import collect_metrics
+from .matching import normalize_answer
+from .urls import build_urlpatterns
+from .models import Category, Quiz, Question, Option
+
+QUESTION_TYPES = ["RADIO", "CHECKBOX", "TEXT"]
+
+
+def seed_catalogue(categories, quizzes, questions, options):
+    """
+    Create a synthetic catalogue of a given size.
+
+    Args:
+        categories (int): The number of categories.
+        quizzes (int): The number of quizzes per category.
+        questions (int): The number of questions per quiz.
+        options (int): The number of options per choice question.
+
+    Returns:
+        list: The IDs of the created quizzes.
+    """
+    category_objs = Category.objects.bulk_create(
+        Category(name=f"Category {i}") for i in range(categories)
+    )
+    quiz_objs = Quiz.objects.bulk_create(
+        Quiz(title=f"Quiz {c.id}-{i}", category=c)
+        for c in category_objs
+        for i in range(quizzes)
+    )
+    question_objs = Question.objects.bulk_create(
+        (
+            Question(
+                quiz=quiz,
+                text=f"Question {i}",
+                question_type=QUESTION_TYPES[i % len(QUESTION_TYPES)],
+            )
+            for quiz in quiz_objs
+            for i in range(questions)
+        ),
+        batch_size=5000,
+    )
+    option_objs = []
+    for question in question_objs:
+        if question.question_type == "TEXT":
+            option_objs.append(
+                Option(
+                    question=question,
+                    text="answer",
+                    is_correct=True,
+                    normalized_text=normalize_answer("answer"),
+                )
+            )
+            continue
+        for i in range(options):
+            option_objs.append(
+                Option(
+                    question=question,
+                    text=f"Option {i}",
+                    is_correct=i == 0,
+                    normalized_text=normalize_answer(f"Option {i}"),
+                )
+            )
+    Option.objects.bulk_create(option_objs, batch_size=5000)
+    return [quiz.id for quiz in quiz_objs]
+
+
+def build_answers(quiz_id):
+    """
+    Return the POST data of a submission selecting the first option everywhere.
+    """
+    data = {}
+    questions = Question.objects.filter(quiz_id=quiz_id).prefetch_related("options")
+    for question in questions:
+        field = f"question_{question.id}"
+        options = list(question.options.all())
+        if question.question_type == "TEXT":
+            data[field] = "answer"
+        elif options:
+            data[field] = str(options[0].id)
+    return data
+
+
+@dataclass
+class Scenario:
+    """
+    One request path exercised by the benchmark.
+
+    Attributes:
+        name (str): The name of the scenario, also the key in the baseline.
+        method (str): The HTTP method, "get" or "post".
+        path (callable): Returns the path to request for an iteration number.
+        data (callable): Returns the request data for an iteration number, or
+            None to send none.
+        on_response (callable): Called with the iteration number and the
+            response after each request, or None.
+        cookies (callable): Returns the cookies to send for an iteration
+            number, or None to send those the client kept.
+    """
+
+    name: str
+    method: str
+    path: object
+    data: object = None
+    on_response: object = None
+    cookies: object = None
+
+    def arguments(self, iteration):
+        """
+        Return the positional arguments of the client call for an iteration.
+        """
+        if self.data is None:
+            return (self.path(iteration),)
+        return (self.path(iteration), self.data(iteration))
+
+    def prepare(self, client, iteration):
+        """
+        Give the client the cookies of an iteration, if the scenario sets any.
+        """
+        if self.cookies is not None:
+            client.cookies = SimpleCookie(self.cookies(iteration))
+
+
+def build_scenarios(quiz_ids):
+    """
+    Return the scenarios covering the quiz request paths.
+
+    Args:
+        quiz_ids (list): The IDs of the seeded quizzes.
+
+    Returns:
+        list: The quiz_list, take_quiz, save_quiz_answers and quiz_result
+        scenarios.
+    """
+    answers = {quiz_id: build_answers(quiz_id) for quiz_id in quiz_ids}
+    results = {}
+    lock = threading.Lock()
+
+    def quiz_id_for(iteration):
+        return quiz_ids[iteration % len(quiz_ids)]
+
+    def save_path(iteration):
+        return reverse("save_quiz_answers", args=[quiz_id_for(iteration)])
+
+    def save_data(iteration):
+        return answers[quiz_id_for(iteration)]
+
+    def saved(iteration, response):
+        # Results are only shown to the session that submitted the attempt.
+        session = response.client.cookies[settings.SESSION_COOKIE_NAME].value
+        with lock:
+            results[quiz_id_for(iteration)] = (response["Location"], session)
+
+    def result(iteration):
+        saved_results = list(results.values())
+        return saved_results[iteration % len(saved_results)]
+
+    return [
+        Scenario("quiz_list", "get", lambda i: reverse("quiz_list")),
+        Scenario(
+            "take_quiz", "get", lambda i: reverse("take_quiz", args=[quiz_id_for(i)])
+        ),
+        Scenario("save_quiz_answers", "post", save_path, save_data, saved),
+        Scenario(
+            "quiz_result",
+            "get",
+            lambda i: result(i)[0],
+            cookies=lambda i: {settings.SESSION_COOKIE_NAME: result(i)[1]},
+        ),
+    ]
+
+
+def asgi_urlconf():
+    """
+    Return a URLconf routing the read views to their async versions.
+
+    It is meant for override_settings(ROOT_URLCONF=...), so that one process
+    can benchmark both serving profiles.
+    """
+    urlconf = ModuleType("quizzes.benchmark.asgi_urls")
+    urlconf.urlpatterns = [
+        path("", include(build_urlpatterns(async_views=True))),
+        path("admin/", admin.site.urls),
+    ]
+    return urlconf
+
+
+def _check_response(scenario, iteration, response):
+    """
+    Fail on an error response and pass the response to the scenario.
+    """
+    if response.status_code >= 400:
+        raise RuntimeError(f"{scenario.name}: unexpected status {response.status_code}")
+    if scenario.on_response is not None:
+        scenario.on_response(iteration, response)
+
+
+def _summarize(requests, wall, samples):
+    """
+    Return the report of a run from its (seconds, queries) samples.
+    """
+    latencies = [elapsed * 1000 for elapsed, _ in samples]
+    queries = [count for _, count in samples]
+    return {
+        "requests": requests,
+        "p50_ms": round(_percentile(latencies, 50), 2),
+        "p90_ms": round(_percentile(latencies, 90), 2),
+        "p99_ms": round(_percentile(latencies, 99), 2),
+        "throughput_rps": round(requests / wall, 1),
+        "queries_median": statistics.median(queries),
+        "queries_max": max(queries),
+    }
+
+
+def _percentile(values, percent):
+    """
+    Return a percentile of a list of values by nearest rank.
+    """
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, round(percent / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def run_scenario(scenario, requests, concurrency):
+    """
+    Drive a scenario with concurrent workers and measure it.
+
+    One warm-up request per worker runs first so that caches are populated.
+
+    Args:
+        scenario (Scenario): The scenario to run.
+        requests (int): The number of measured requests.
+        concurrency (int): The number of concurrent workers.
+
+    Returns:
+        dict: Latency percentiles in milliseconds, throughput in requests per
+        second and the median and maximum number of queries per request.
+    """
+    counter = itertools.count()
+    local = threading.local()
+
+    def issue(_):
+        if not hasattr(local, "client"):
+            local.client = Client()
+        iteration = next(counter)
+        scenario.prepare(local.client, iteration)
+        request = getattr(local.client, scenario.method)
+        with collect_metrics() as request_metrics:
+            start = time.perf_counter()
+            response = request(*scenario.arguments(iteration))
+            elapsed = time.perf_counter() - start
+        _check_response(scenario, iteration, response)
+        return elapsed, request_metrics.query_count
+
+    barrier = threading.Barrier(concurrency)
+
+    def close(_):
+        # The barrier makes every worker thread close its own connection.
+        barrier.wait()
+        connections.close_all()
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(issue, range(concurrency)))
+        start = time.perf_counter()
+        samples = list(executor.map(issue, range(requests)))
+        wall = time.perf_counter() - start
+        list(executor.map(close, range(concurrency)))
+
+    return _summarize(requests, wall, samples)
+
+
+def run_scenario_async(scenario, requests, concurrency):
+    """
+    Drive a scenario through the ASGI handler and measure it.
+
+    Concurrent workers are coroutines sharing one event loop, as under an
+    ASGI server. Arguments and results are those of run_scenario.
+    """
+    counter = itertools.count()
+
+    async def issue(client):
+        iteration = next(counter)
+        scenario.prepare(client, iteration)
+        request = getattr(client, scenario.method)
+        with collect_metrics() as request_metrics:
+            start = time.perf_counter()
+            response = await request(*scenario.arguments(iteration))
+            elapsed = time.perf_counter() - start
+        _check_response(scenario, iteration, response)
+        return elapsed, request_metrics.query_count
+
+    async def worker(count):
+        client = AsyncClient()
+        return [await issue(client) for _ in range(count)]
+
+    async def run():
+        await asyncio.gather(*(worker(1) for _ in range(concurrency)))
+        counts = [
+            requests // concurrency + (i < requests % concurrency)
+            for i in range(concurrency)
+        ]
+        start = time.perf_counter()
+        batches = await asyncio.gather(*(worker(count) for count in counts))
+        wall = time.perf_counter() - start
+        # Sync code of the ASGI handler runs in one shared thread.
+        await sync_to_async(connections.close_all)()
+        return wall, [sample for batch in batches for sample in batch]
+
+    wall, samples = asyncio.run(run())
+    return _summarize(requests, wall, samples)
+
+
+def load_baseline(path):
+    """
+    Return the stored baseline, or an empty one if the file does not exist.
+    """
+    try:
+        with open(path, encoding="utf-8") as stream:
+            return json.load(stream)
+    except FileNotFoundError:
+        return {}
+
+
+def save_baseline(path, report):
+    """
+    Store the query counts of a report as the new baseline.
+    """
+    baseline = {
+        name: {"queries_max": result["queries_max"]} for name, result in report.items()
+    }
+    with open(path, "w", encoding="utf-8") as stream:
+        json.dump(baseline, stream, indent=4, sort_keys=True)
+        stream.write("\n")
+
+
+def compare_with_baseline(report, baseline):
+    """
+    Report the query counts that regressed.
+
+    Args:
+        report (dict): The results of run_scenario, by scenario name.
+        baseline (dict): The stored baseline, by scenario name.
+
+    Returns:
+        list: One message per scenario whose query count went up.
+    """
+    regressions = []
+    for name, result in report.items():
+        expected = baseline.get(name, {}).get("queries_max")
+        if expected is not None and result["queries_max"] > expected:
+            regressions.append(
+                f"{name}: {result['queries_max']} queries per request, "
+                f"baseline is {expected}"
+            )
+    return regressions
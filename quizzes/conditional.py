@@ -0,0 +1,101 @@
+"""
+Conditional GET module for the quizzes application.
+
+This module defines the validator functions passed to Django's condition
+decorator:
+- catalogue_etag: Return the ETag of the quiz list.
+- catalogue_last_modified: Return the modification time of the quiz list.
+- quiz_etag: Return the ETag of the take quiz page.
+- quiz_last_modified: Return the modification time of the take quiz page.
+- quiz_content_etag: Return the ETag of the quiz contents in the JSON API.
+
+Validators are derived from content versions (see quizzes.versions), so
+answering a conditional request with 304 Not Modified costs one cache lookup
+and no database query.
+
+The take quiz page embeds a CSRF token, so its ETag also covers the CSRF
+cookie: a client whose cookie was rotated gets a fresh page and token. It also
+shows the autosaved answers of the taker (see quizzes.drafts), so its
+validators cover the last autosave too, read from the cache once per request.
+
+Randomized quizzes (see quizzes.sampling) are drawn again for every request,
+so their pages get no validators. Neither do quizzes whose question bank is not
+cached yet, since telling them apart would take a query.
+"""
+
+import hashlib
+from django.conf import settings
+from .drafts import get_request_draft
+from .sampling import is_randomized, peek_question_bank
+from .versions import get_catalogue_version, get_quiz_version, version_datetime
+
+
+def _is_stable(quiz_id):
+    """
+    Tell whether a quiz is known to render the same questions every time.
+    """
+    bank = peek_question_bank(quiz_id)
+    return bank is not None and not is_randomized(bank)
+
+
+def _csrf_digest(request):
+    """
+    Return a short digest of the CSRF cookie of a request.
+    """
+    cookie = request.COOKIES.get(settings.CSRF_COOKIE_NAME, "")
+    return hashlib.sha256(cookie.encode()).hexdigest()[:12]
+
+
+def _draft_version(request, quiz_id):
+    """
+    Return when the taker of a request last autosaved a quiz, or 0.
+    """
+    draft = get_request_draft(request, quiz_id)
+    return draft["updated"] if draft else 0
+
+
+# pylint: disable=W0613
+def catalogue_etag(request, *args, **kwargs):
+    """
+    Return the ETag of the quiz list.
+    """
+    return f'"catalogue-{get_catalogue_version()}"'
+
+
+def catalogue_last_modified(request, *args, **kwargs):
+    """
+    Return the modification time of the quiz list.
+    """
+    return version_datetime(get_catalogue_version())
+
+
+def quiz_etag(request, quiz_id, *args, **kwargs):
+    """
+    Return the ETag of the take quiz page.
+    """
+    if not _is_stable(quiz_id):
+        return None
+    return (
+        f'"quiz-{quiz_id}-{get_quiz_version(quiz_id)}-{_csrf_digest(request)}'
+        f'-{_draft_version(request, quiz_id)}"'
+    )
+
+
+def quiz_last_modified(request, quiz_id, *args, **kwargs):
+    """
+    Return the modification time of the take quiz page.
+    """
+    if not _is_stable(quiz_id):
+        return None
+    return version_datetime(
+        max(get_quiz_version(quiz_id), _draft_version(request, quiz_id))
+    )
+
+
+def quiz_content_etag(request, quiz_id, *args, **kwargs):
+    """
+    Return the ETag of the quiz contents in the JSON API.
+    """
+    if not _is_stable(quiz_id):
+        return None
+    return f'"quiz-{quiz_id}-{get_quiz_version(quiz_id)}"'
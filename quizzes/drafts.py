@@ -0,0 +1,231 @@
+"""
+Drafts module for the quizzes application.
+
+This module defines the following functions:
+- get_taker: Return the draft owner of a request.
+- new_taker: Return a new draft owner.
+- set_taker_cookie: Remember the draft owner of a response in a cookie.
+- get_draft: Return the draft of an attempt in progress.
+- aget_draft: Asynchronous version of get_draft.
+- get_request_draft: Return the draft of a request, reading it once per request.
+- aget_request_draft: Asynchronous version of get_request_draft.
+- save_draft: Store the draft of an attempt in progress.
+- asave_draft: Asynchronous version of save_draft.
+- update_draft: Store the answer to one question in a draft.
+- delete_draft: Drop the draft of a submitted attempt.
+- restore_answers: Fill the answers of a draft in the questions of a quiz.
+
+While a quiz is taken, every answer is saved as soon as it changes into a draft
+in the "drafts" cache, and take_quiz restores the draft in one cache read. The
+answers reach the database only with the final submission, in one batch.
+
+A draft is {"draw": token or None, "answers": {question_id: [value, ...]},
+"updated": nanoseconds}, where draw is the signed layout of a randomized quiz
+(see quizzes.sampling), kept so that a reload shows the same questions.
+
+Drafts belong to the random ID of the quizzes_taker cookie rather than to the
+session: autosaving must never write to the database, and creating or
+modifying a database-backed session would.
+"""
+
+import re
+import secrets
+import time
+from django.core.cache import caches
+
+DRAFT_CACHE_ALIAS = "drafts"
+DRAFT_CACHE_KEY = "quizzes:draft:{taker}:{quiz_id}"
+DRAFT_TIMEOUT = 60 * 60 * 24
+# Drafts are read on every take_quiz request; bound them whatever is posted.
+DRAFT_MAX_ANSWERS = 500
+TAKER_COOKIE = "quizzes_taker"
+TAKER_COOKIE_AGE = 60 * 60 * 24 * 365
+TAKER_RE = re.compile(r"^[A-Za-z0-9_-]{24}$")
+
+
+def _cache():
+    return caches[DRAFT_CACHE_ALIAS]
+
+
+def _key(taker, quiz_id):
+    return DRAFT_CACHE_KEY.format(taker=taker, quiz_id=quiz_id)
+
+
+def get_taker(request):
+    """
+    Return the draft owner of a request.
+
+    Args:
+        request (HttpRequest): The HTTP request object.
+
+    Returns:
+        str: The ID from the quizzes_taker cookie, or None if it is missing
+        or malformed.
+    """
+    taker = request.COOKIES.get(TAKER_COOKIE, "")
+    return taker if TAKER_RE.match(taker) else None
+
+
+def new_taker():
+    """
+    Return a new draft owner.
+    """
+    return secrets.token_urlsafe(18)
+
+
+def set_taker_cookie(response, taker):
+    """
+    Remember the draft owner of a response in a cookie.
+
+    Args:
+        response (HttpResponse): The response to set the cookie on.
+        taker (str): The draft owner, see new_taker.
+    """
+    response.set_cookie(
+        TAKER_COOKIE, taker, max_age=TAKER_COOKIE_AGE, httponly=True, samesite="Lax"
+    )
+
+
+def get_draft(taker, quiz_id):
+    """
+    Return the draft of an attempt in progress.
+
+    Args:
+        taker (str): The draft owner, or None.
+        quiz_id (int): The ID of the quiz being taken.
+
+    Returns:
+        dict: The draft, or None if there is none.
+    """
+    if taker is None:
+        return None
+    return _cache().get(_key(taker, quiz_id))
+
+
+async def aget_draft(taker, quiz_id):
+    """
+    Asynchronous version of get_draft.
+    """
+    if taker is None:
+        return None
+    return await _cache().aget(_key(taker, quiz_id))
+
+
+def get_request_draft(request, quiz_id):
+    """
+    Return the draft of a request, reading it once per request.
+
+    The HTTP validators and the view of a page share the result.
+
+    Args:
+        request (HttpRequest): The HTTP request object.
+        quiz_id (int): The ID of the quiz being taken.
+
+    Returns:
+        dict: The draft, or None if there is none.
+    """
+    drafts = request.__dict__.setdefault("_quiz_drafts", {})
+    if quiz_id not in drafts:
+        drafts[quiz_id] = get_draft(get_taker(request), quiz_id)
+    return drafts[quiz_id]
+
+
+async def aget_request_draft(request, quiz_id):
+    """
+    Asynchronous version of get_request_draft.
+    """
+    drafts = request.__dict__.setdefault("_quiz_drafts", {})
+    if quiz_id not in drafts:
+        drafts[quiz_id] = await aget_draft(get_taker(request), quiz_id)
+    return drafts[quiz_id]
+
+
+def _stamp(draft):
+    return {**draft, "updated": time.time_ns()}
+
+
+def save_draft(taker, quiz_id, draft):
+    """
+    Store the draft of an attempt in progress.
+
+    Args:
+        taker (str): The draft owner.
+        quiz_id (int): The ID of the quiz being taken.
+        draft (dict): The draw and answers of the draft.
+    """
+    _cache().set(_key(taker, quiz_id), _stamp(draft), DRAFT_TIMEOUT)
+
+
+async def asave_draft(taker, quiz_id, draft):
+    """
+    Asynchronous version of save_draft.
+    """
+    await _cache().aset(_key(taker, quiz_id), _stamp(draft), DRAFT_TIMEOUT)
+
+
+def update_draft(taker, quiz_id, question_id, values):
+    """
+    Store the answer to one question in a draft.
+
+    The take quiz page sends one autosave at a time, so the read and write of
+    the draft do not race with another autosave of the same taker. The caller
+    checks that the question belongs to the quiz.
+
+    Args:
+        taker (str): The draft owner.
+        quiz_id (int): The ID of the quiz being taken.
+        question_id (int): The ID of the question answered.
+        values (list): The typed text or the selected option IDs, as strings.
+
+    Raises:
+        ValueError: If the draft already holds DRAFT_MAX_ANSWERS other answers.
+    """
+    draft = get_draft(taker, quiz_id) or {"draw": None, "answers": {}}
+    if question_id not in draft["answers"] and (
+        len(draft["answers"]) >= DRAFT_MAX_ANSWERS
+    ):
+        raise ValueError("Too many answers in the draft.")
+    answers = {**draft["answers"], question_id: values}
+    save_draft(taker, quiz_id, {**draft, "answers": answers})
+
+
+def delete_draft(taker, quiz_id):
+    """
+    Drop the draft of a submitted attempt.
+
+    Args:
+        taker (str): The draft owner, or None.
+        quiz_id (int): The ID of the quiz submitted.
+    """
+    if taker is not None:
+        _cache().delete(_key(taker, quiz_id))
+
+
+def restore_answers(questions, answers):
+    """
+    Fill the answers of a draft in the questions of a quiz.
+
+    Args:
+        questions (list): The question dicts of the page.
+        answers (dict): The answers of the draft by question ID.
+
+    Returns:
+        list: Copies of the answered questions with "saved_text" and
+        "saved_ids" set; unanswered questions are returned as they are.
+    """
+    if not answers:
+        return questions
+    restored = []
+    for question in questions:
+        values = answers.get(question["id"])
+        if values is None:
+            restored.append(question)
+            continue
+        restored.append(
+            {
+                **question,
+                "saved_text": values[0] if values else "",
+                "saved_ids": {int(value) for value in values if value.isdigit()},
+            }
+        )
+    return restored
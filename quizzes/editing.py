@@ -0,0 +1,191 @@
+# pylint: disable=E1101
+"""
+Editing module for the quizzes application.
+
+This module defines the following functions:
+- save_quiz: Save a validated quiz form with its nested question formset.
+- copy_quizzes: Copy quizzes with their questions and options.
+
+The submitted tree is diffed against the stored rows: unchanged forms are
+skipped, and the created, changed and deleted questions and options are each
+written with one bulk_create, bulk_update or delete per model, inside one
+transaction. Per-row content signals are suppressed, and the quiz version is
+bumped once when the transaction commits, so saving a large quiz costs a
+constant number of queries. Copying quizzes likewise takes one bulk insert
+per model, whatever the number of quizzes and rows copied.
+"""
+
+from django.db import transaction
+from .matching import normalize_answer
+from .models import Quiz, Question, Option
+from .search import schedule_reindex
+from .signals import suppress_content_signals
+from .versions import bump_catalogue_version, bump_quiz_version
+
+
+def _diff_forms(formset):
+    """
+    Split the forms of a validated model formset by the change they make.
+
+    Returns:
+        tuple: The forms to create, the forms to update, the IDs of the
+        instances to delete and the forms that are kept (created, updated or
+        unchanged).
+    """
+    deleted_forms = set(formset.deleted_forms)
+    created, updated, deleted, kept = [], [], [], []
+    for form in formset.forms:
+        if form in deleted_forms:
+            if form.instance.pk is not None:
+                deleted.append(form.instance.pk)
+            continue
+        if form.instance.pk is None:
+            if form.has_changed():
+                created.append(form)
+                kept.append(form)
+            continue
+        if form.changed_data:
+            updated.append(form)
+        kept.append(form)
+    return created, updated, deleted, kept
+
+
+def _changed_fields(forms):
+    """
+    Return the model fields changed by any of the given forms.
+    """
+    fields = []
+    for form in forms:
+        for name in form.changed_data:
+            if name in form.Meta.fields and name not in fields:
+                fields.append(name)
+    return fields
+
+
+def save_quiz(quiz_form, question_formset):
+    """
+    Save a validated quiz form with its nested question formset.
+
+    Args:
+        quiz_form (QuizForm): The validated quiz form.
+        question_formset (QuestionFormSet): The validated question formset,
+            whose forms carry their option formsets.
+
+    Returns:
+        Quiz: The saved quiz.
+    """
+    with transaction.atomic(), suppress_content_signals():
+        quiz = quiz_form.save()
+
+        created, updated, deleted, kept = _diff_forms(question_formset)
+        if deleted:
+            Question.objects.filter(quiz=quiz, id__in=deleted).delete()
+        for form in created:
+            form.instance.quiz = quiz
+        Question.objects.bulk_create([form.instance for form in created])
+        fields = _changed_fields(updated)
+        if fields:
+            Question.objects.bulk_update([form.instance for form in updated], fields)
+
+        new_options, changed_forms, deleted_options = [], [], []
+        for question_form in kept:
+            option_created, option_updated, option_deleted, _ = _diff_forms(
+                question_form.nested
+            )
+            for form in option_created:
+                form.instance.question = question_form.instance
+                new_options.append(form.instance)
+            changed_forms.extend(option_updated)
+            deleted_options.extend(option_deleted)
+        for option in new_options + [form.instance for form in changed_forms]:
+            option.normalized_text = normalize_answer(option.text)
+        if deleted_options:
+            Option.objects.filter(
+                question__quiz=quiz, id__in=deleted_options
+            ).delete()
+        Option.objects.bulk_create(new_options)
+        fields = _changed_fields(changed_forms)
+        if "text" in fields:
+            fields.append("normalized_text")
+        if fields:
+            Option.objects.bulk_update(
+                [form.instance for form in changed_forms], fields
+            )
+
+        transaction.on_commit(lambda: bump_quiz_version(quiz.id))
+        if quiz_form.has_changed():
+            transaction.on_commit(bump_catalogue_version)
+        schedule_reindex(quiz.id)
+    return quiz
+
+
+def copy_quizzes(quizzes):
+    """
+    Copy quizzes with their questions and options.
+
+    The copies keep the category, image and sampling settings of their
+    originals, and their titles are marked as copies.
+
+    Args:
+        quizzes (iterable): The quizzes to copy.
+
+    Returns:
+        list: The copies, in the order of the originals.
+    """
+    quizzes = list(quizzes)
+    with transaction.atomic(), suppress_content_signals():
+        copies = Quiz.objects.bulk_create(
+            [
+                Quiz(
+                    title=f"{quiz.title} (копия)",
+                    category_id=quiz.category_id,
+                    image=quiz.image,
+                    sample_size=quiz.sample_size,
+                    stratify_sample=quiz.stratify_sample,
+                    shuffle_options=quiz.shuffle_options,
+                )
+                for quiz in quizzes
+            ]
+        )
+        quiz_ids = {quiz.id: copy.id for quiz, copy in zip(quizzes, copies)}
+
+        questions = list(
+            Question.objects.filter(quiz_id__in=quiz_ids)
+            .order_by("id")
+            .values_list("id", "quiz_id", "text", "question_type", "max_edits")
+        )
+        question_copies = Question.objects.bulk_create(
+            [
+                Question(
+                    quiz_id=quiz_ids[quiz_id],
+                    text=text,
+                    question_type=question_type,
+                    max_edits=max_edits,
+                )
+                for _, quiz_id, text, question_type, max_edits in questions
+            ]
+        )
+        question_ids = {
+            row[0]: copy.id for row, copy in zip(questions, question_copies)
+        }
+
+        Option.objects.bulk_create(
+            [
+                Option(
+                    question_id=question_ids[question_id],
+                    text=text,
+                    is_correct=is_correct,
+                    normalized_text=normalized_text,
+                )
+                for question_id, text, is_correct, normalized_text in (
+                    Option.objects.filter(question__quiz_id__in=quiz_ids)
+                    .order_by("id")
+                    .values_list("question_id", "text", "is_correct", "normalized_text")
+                )
+            ]
+        )
+
+        transaction.on_commit(bump_catalogue_version)
+        for copy in copies:
+            schedule_reindex(copy.id)
+    return copies
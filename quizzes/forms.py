@@ -7,13 +7,21 @@ Forms module for the quizzes application.
 This module defines the following forms:
 - QuizForm: Form for creating and editing Quiz instances.
 - QuestionForm: Form for creating and editing Question instances.
+- NestedQuestionForm: Question form carrying the formset of its options.
 - OptionForm: Form for creating and editing Option instances.
 
-It also defines an inline formset for managing questions within a quiz.
+It also defines nested inline formsets for managing the questions of a quiz
+and the options of each question. The formsets validate against rows loaded
+up front (one query for the questions, one for all their options) instead of
+looking up every submitted primary key, so validating a large quiz costs a
+constant number of queries.
 """
 
+from collections import defaultdict
 from django import forms
-from django.forms import inlineformset_factory
+from django.core.exceptions import ValidationError
+from django.forms import BaseInlineFormSet, inlineformset_factory
+from django.forms.formsets import DELETION_FIELD_NAME
 from .models import Quiz, Question, Option
 
 
@@ -26,21 +34,36 @@ class QuizForm(forms.ModelForm):
         fields (list): List of fields to include in the form.
         widgets (dict): Custom widgets for the form fields.
         labels (dict): Custom labels for the form fields.
+        help_texts (dict): Help texts for the form fields.
     """
 
     class Meta:
         model = Quiz
-        fields = ["title", "category", "image"]
+        fields = [
+            "title",
+            "category",
+            "image",
+            "sample_size",
+            "stratify_sample",
+            "shuffle_options",
+        ]
         widgets = {
             "title": forms.TextInput(attrs={"class": "form-control"}),
             "category": forms.Select(attrs={"class": "form-control"}),
             "image": forms.ClearableFileInput(attrs={"class": "form-control-file"}),
+            "sample_size": forms.NumberInput(attrs={"class": "form-control"}),
         }
         labels = {
             "title": "Название",
             "category": "Категория",
             "image": "Изображение",
             "change": "Заменить",
+            "sample_size": "Вопросов в попытке",
+            "stratify_sample": "Сохранять доли типов вопросов",
+            "shuffle_options": "Перемешивать варианты ответа",
+        }
+        help_texts = {
+            "sample_size": "Оставьте пустым, чтобы показывать все вопросы.",
         }
 
 
@@ -52,17 +75,41 @@ class QuestionForm(forms.ModelForm):
         model (Question): The model this form is based on.
         fields (list): List of fields to include in the form.
         labels (dict): Custom labels for the form fields.
+        help_texts (dict): Help texts for the form fields.
     """
 
     class Meta:
         model = Question
-        fields = ["text", "question_type"]
+        fields = ["text", "question_type", "max_edits"]
         labels = {
             "text": "Текст вопроса",
             "question_type": "Тип вопроса",
+            "max_edits": "Допустимые опечатки",
+        }
+        help_texts = {
+            "max_edits": "Для текстовых вопросов: сколько опечаток прощается в ответе.",
         }
 
 
+class NestedQuestionForm(QuestionForm):
+    """
+    Question form carrying the formset of its options.
+
+    Attributes:
+        nested (BaseOptionFormSet): The options of the question, attached by
+            the question formset.
+    """
+
+    nested = None
+
+    def has_changed(self):
+        return super().has_changed() or bool(self.nested and self.nested.has_changed())
+
+    def is_valid(self):
+        valid = super().is_valid()
+        return (self.nested is None or self.nested.is_valid()) and valid
+
+
 class OptionForm(forms.ModelForm):
     """
     Form for creating and editing Option instances.
@@ -82,7 +129,127 @@ class OptionForm(forms.ModelForm):
         }
 
 
-# Inline formset for managing questions within a quiz
+class PreloadedChoiceField(forms.ModelChoiceField):
+    """
+    Primary key field resolving submitted values against preloaded instances.
+    """
+
+    def __init__(self, instances, **kwargs):
+        super().__init__(queryset=None, **kwargs)
+        self.instances = instances
+
+    def to_python(self, value):
+        if value in self.empty_values:
+            return None
+        try:
+            return self.instances[int(value)]
+        except (KeyError, TypeError, ValueError) as error:
+            raise ValidationError(
+                self.error_messages["invalid_choice"], code="invalid_choice"
+            ) from error
+
+
+class PreloadedFormSetMixin:
+    """
+    Model formset mixin validating primary keys against the loaded rows.
+    """
+
+    def preloaded(self):
+        """
+        Return the instances of the formset by primary key.
+        """
+        if not hasattr(self, "_preloaded"):
+            self._preloaded = {obj.pk: obj for obj in self.get_queryset()}
+        return self._preloaded
+
+    def add_fields(self, form, index):
+        super().add_fields(form, index)
+        pk_name = self.model._meta.pk.name
+        field = form.fields[pk_name]
+        form.fields[pk_name] = PreloadedChoiceField(
+            self.preloaded(),
+            initial=field.initial,
+            required=False,
+            widget=field.widget,
+        )
+
+
+class BaseOptionFormSet(PreloadedFormSetMixin, BaseInlineFormSet):
+    """
+    Inline formset for the options of one question.
+
+    Its options are passed in by the question formset rather than queried.
+    """
+
+    def __init__(self, *args, options=(), **kwargs):
+        self.options = list(options)
+        super().__init__(*args, **kwargs)
+
+    def get_queryset(self):
+        return self.options
+
+    def add_fields(self, form, index):
+        super().add_fields(form, index)
+        if DELETION_FIELD_NAME in form.fields:
+            # jquery.formset treats every "*-DELETE" input inside a question
+            # row as the question's own delete flag.
+            form.fields[DELETION_FIELD_NAME].widget.attrs["id"] = (
+                f"id_{form.prefix}-remove"
+            )
+
+
+OptionFormSet = inlineformset_factory(
+    Question,
+    Option,
+    form=OptionForm,
+    formset=BaseOptionFormSet,
+    extra=2,
+    can_delete=True,
+)
+
+
+class BaseQuestionFormSet(PreloadedFormSetMixin, BaseInlineFormSet):
+    """
+    Inline formset for the questions of a quiz, each with its options.
+
+    The options of every question are loaded in one query.
+    """
+
+    def options_by_question(self):
+        """
+        Return the stored options of the quiz grouped by question ID.
+        """
+        if not hasattr(self, "_options"):
+            self._options = defaultdict(list)
+            if self.instance.pk is not None:
+                for option in Option.objects.filter(
+                    question__quiz=self.instance
+                ).order_by("id"):
+                    self._options[option.question_id].append(option)
+        return self._options
+
+    def add_fields(self, form, index):
+        super().add_fields(form, index)
+        question = form.instance
+        form.nested = OptionFormSet(
+            data=form.data if form.is_bound else None,
+            files=form.files if form.is_bound else None,
+            instance=question,
+            prefix=f"{form.prefix}-{OptionFormSet.get_default_prefix()}",
+            options=(
+                self.options_by_question()[question.pk]
+                if question.pk is not None
+                else ()
+            ),
+        )
+
+
+# Inline formset for managing questions, and their options, within a quiz
 QuestionFormSet = inlineformset_factory(
-    Quiz, Question, form=QuestionForm, extra=1, can_delete=True
+    Quiz,
+    Question,
+    form=NestedQuestionForm,
+    formset=BaseQuestionFormSet,
+    extra=1,
+    can_delete=True,
 )
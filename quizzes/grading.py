@@ -0,0 +1,122 @@
+"""
+Grading module for the quizzes application.
+
+This module defines the following functions:
+- get_answer_key: Return the answer key of the current version of a quiz.
+- aget_answer_key: Asynchronous version of get_answer_key.
+- mark_answer: Decide whether one answer is correct.
+- grade: Score a submission against an answer key in memory.
+
+An answer key is part of the snapshot of a quiz version (see
+quizzes.snapshots), so grading a known version costs no query. Attempts are
+graded, and their results displayed, against the snapshot they were taken on,
+so editing a quiz never regrades past attempts. Answer keys are shared between
+requests: do not modify them.
+
+Text answers are matched against every correct option of their question (see
+quizzes.matching) once, when they are submitted; the outcome is stored on the
+Answer and reused when results are displayed.
+"""
+
+from .matching import match_text_answer
+from .snapshots import aget_current_snapshot, get_current_snapshot
+
+
+def get_answer_key(quiz_id):
+    """
+    Return the answer key of the current version of a quiz.
+
+    Args:
+        quiz_id (int): The ID of the quiz.
+
+    Returns:
+        list: One dict per question with its options, the IDs and texts of
+        the correct options, and the normalized accepted text answers.
+
+    Raises:
+        Http404: If the quiz does not exist.
+    """
+    return get_current_snapshot(quiz_id).answer_key
+
+
+async def aget_answer_key(quiz_id):
+    """
+    Asynchronous version of get_answer_key.
+    """
+    return (await aget_current_snapshot(quiz_id)).answer_key
+
+
+def mark_answer(question, selected_option_id, text_answer):
+    """
+    Decide whether one answer is correct.
+
+    Args:
+        question (dict): The answer key entry of the question answered.
+        selected_option_id (int): The selected option, for choice questions.
+        text_answer (str): The typed answer, for text questions.
+
+    Returns:
+        bool: For text questions, whether the answer matches an accepted
+        answer; otherwise whether the selected option is correct.
+    """
+    if question["question_type"] == "TEXT":
+        return match_text_answer(
+            text_answer, question["accepted"], question["max_edits"]
+        )
+    return selected_option_id in question["correct_ids"]
+
+
+def grade(answer_key, answers):
+    """
+    Score a submission against an answer key in memory.
+
+    Args:
+        answer_key (list): The answer key as returned by get_answer_key.
+        answers (iterable): (question_id, selected_option_id, text_answer,
+            is_correct) tuples. Text answers whose is_correct is None are
+            matched again.
+
+    Returns:
+        tuple: The score and a list of per-question results for the template.
+    """
+    selected_ids = {}
+    text_answers = {}
+    for question_id, selected_option_id, text_answer, is_correct in answers:
+        if selected_option_id is not None:
+            selected_ids.setdefault(question_id, set()).add(selected_option_id)
+        else:
+            text_answers.setdefault(question_id, (text_answer or "", is_correct))
+
+    score = 0
+    results = []
+    for question in answer_key:
+        question_result = {
+            "question": question,
+            "is_correct": False,
+            "correct": [],
+            "selected": [],
+            "options": [],
+        }
+        if question["question_type"] == "TEXT":
+            question_result["correct"].extend(question["correct_texts"])
+            user_answer, is_correct = text_answers.get(question["id"], ("", False))
+            question_result["selected"].append(user_answer)
+            if is_correct is None:
+                is_correct = mark_answer(question, None, user_answer)
+            if is_correct:
+                question_result["is_correct"] = True
+                score += 1
+        else:
+            selected = selected_ids.get(question["id"], set())
+            for option in question["options"]:
+                question_result["options"].append(option)
+                if option["is_correct"]:
+                    question_result["correct"].append(option["text"])
+                if option["id"] in selected:
+                    question_result["selected"].append(option["text"])
+            if selected == question["correct_ids"]:
+                question_result["is_correct"] = True
+                score += 1
+        results.append(question_result)
+
+    return score, results
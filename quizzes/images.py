@@ -0,0 +1,162 @@
+"""
+Images module for the quizzes application.
+
+This module defines the following functions:
+- generate_derivatives: Render the WebP derivatives of a stored image.
+- record_derivatives: Store the names of rendered derivatives on their quizzes.
+- queue_derivatives: Queue the rendering of the derivatives of an image.
+- get_derivative_url: Return the URL of a derivative, or of the original.
+- get_derivative_url_by_name: Same as get_derivative_url, for a storage name.
+
+Derivatives are stored next to the original as
+"<name>.<spec>.<hash>.webp", where the hash covers the original content and
+the derivative settings. A derivative URL therefore changes whenever its
+content could, and can be cached forever.
+
+Derivatives are rendered by background workers (see quizzes.tasks), never
+while serving a request. The workers record their names in Quiz.thumbnails,
+which the views read with the quiz: resolving a URL touches neither storage
+nor the database, and until a derivative is recorded for the current image,
+its URL is the URL of the original.
+"""
+
+import hashlib
+import io
+import os
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+from .jobs import enqueue
+from .models import Quiz
+
+# Maximum (width, height) of each derivative; images are never upscaled.
+DERIVATIVE_SPECS = {
+    "card": (640, 480),
+    "header": (320, 320),
+}
+WEBP_QUALITY = 80
+
+
+def _derivative_name(name, spec, content_hash):
+    """
+    Return the storage name of a derivative of the given original.
+    """
+    width, height = DERIVATIVE_SPECS[spec]
+    digest = hashlib.sha256(
+        f"{content_hash}:{width}x{height}:{WEBP_QUALITY}".encode()
+    ).hexdigest()[:12]
+    stem, _ = os.path.splitext(name)
+    return f"{stem}.{spec}.{digest}.webp"
+
+
+def _render(image, spec):
+    """
+    Resize an opened image to a spec and encode it as WebP.
+    """
+    derivative = image.copy()
+    derivative.thumbnail(DERIVATIVE_SPECS[spec], Image.Resampling.LANCZOS)
+    if derivative.mode not in ("RGB", "RGBA"):
+        mode = "RGBA" if "A" in derivative.getbands() else "RGB"
+        derivative = derivative.convert(mode)
+    output = io.BytesIO()
+    derivative.save(output, "WEBP", quality=WEBP_QUALITY, method=4)
+    return output.getvalue()
+
+
+def _read(name):
+    with default_storage.open(name, "rb") as original:
+        return original.read()
+
+
+def generate_derivatives(name, specs=None):
+    """
+    Render the WebP derivatives of a stored image.
+
+    Derivatives that already exist are not rendered again.
+
+    Args:
+        name (str): The storage name of the original image.
+        specs (iterable): The derivative specs to render, or None for all.
+
+    Returns:
+        dict: The storage name of each derivative, by spec.
+
+    Raises:
+        OSError: If the original cannot be read or decoded.
+    """
+    content = _read(name)
+    content_hash = hashlib.sha256(content).hexdigest()
+
+    names = {}
+    image = None
+    for spec in specs or DERIVATIVE_SPECS:
+        derivative = _derivative_name(name, spec, content_hash)
+        if not default_storage.exists(derivative):
+            if image is None:
+                image = ImageOps.exif_transpose(Image.open(io.BytesIO(content)))
+            derivative = default_storage.save(
+                derivative, ContentFile(_render(image, spec))
+            )
+        names[spec] = derivative
+    return names
+
+
+def record_derivatives(name, names):
+    """
+    Store the names of the rendered derivatives of an image on its quizzes.
+
+    The names are recorded with the image they were rendered from, so that a
+    quiz whose image changed since falls back to its new original.
+
+    Args:
+        name (str): The storage name of the original image.
+        names (dict): The storage name of each derivative, by spec, as
+            returned by generate_derivatives.
+
+    Returns:
+        list: The IDs of the quizzes showing the image.
+    """
+    quizzes = Quiz.objects.filter(image=name)
+    quiz_ids = list(quizzes.values_list("id", flat=True))
+    quizzes.update(thumbnails={**names, "image": name})
+    return quiz_ids
+
+
+def queue_derivatives(name):
+    """
+    Queue the rendering of the derivatives of an image, once per image.
+
+    Args:
+        name (str): The storage name of the original image.
+    """
+    enqueue(
+        "quizzes.generate_image_derivatives", {"name": name}, key=f"thumbnails:{name}"
+    )
+
+
+def get_derivative_url(quiz, spec):
+    """
+    Return the URL of a derivative, or of the original until it is rendered.
+
+    Args:
+        quiz (Quiz): The quiz showing the image.
+        spec (str): The derivative spec, a key of DERIVATIVE_SPECS.
+
+    Returns:
+        str: The URL of the derivative, or an empty string if there is no image.
+    """
+    return get_derivative_url_by_name(quiz.image.name, spec, quiz.thumbnails)
+
+
+def get_derivative_url_by_name(name, spec, thumbnails):
+    """
+    Same as get_derivative_url, for the image name and thumbnails of a quiz.
+
+    It serves rows read with .values(), which hold names rather than files.
+    """
+    if not name:
+        return ""
+    derivative = None
+    if thumbnails and thumbnails.get("image") == name:
+        derivative = thumbnails.get(spec)
+    return default_storage.url(derivative or name)
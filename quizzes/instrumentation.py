@@ -0,0 +1,239 @@
+"""
+Instrumentation module for the quizzes application.
+
+This module defines the following:
+- RequestMetrics: Measurements collected while handling one request.
+- collect_metrics: Context manager collecting the metrics of a block of code.
+- count_query: Execute wrapper counting queries into the current metrics.
+- MetricsRegistry: Per-view ring buffers of request measurements.
+- metrics: The registry shared by the process.
+- InstrumentedDjangoTemplates: Template backend that times rendering.
+
+The InstrumentationMiddleware in quizzes.middleware fills RequestMetrics for a
+sample of requests and records them here. Settings are read from the
+QUIZZES_INSTRUMENTATION dict:
+
+    SAMPLE_RATE  Share of requests to measure, from 0 to 1 (default: 1).
+    BUFFER_SIZE  Number of requests kept per view (default: 1000).
+    LOG          Whether to log one structured line per request (default: False).
+
+Queries are attributed through a context variable rather than per-connection
+state, because the async ORM runs them in worker threads that each hold their
+own connection. Context variables follow sync_to_async into those threads.
+"""
+
+import threading
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from django.conf import settings
+from django.template.backends.django import DjangoTemplates, Template
+
+current_metrics = ContextVar("quizzes_current_metrics", default=None)
+
+
+def get_setting(name, default):
+    """
+    Return an entry of the QUIZZES_INSTRUMENTATION setting.
+    """
+    return getattr(settings, "QUIZZES_INSTRUMENTATION", {}).get(name, default)
+
+
+def percentile(values, percent):
+    """
+    Return a percentile of a list of values by nearest rank.
+    """
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, round(percent / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+class RequestMetrics:
+    """
+    Measurements collected while handling one request.
+
+    Attributes:
+        queries (Counter): Number of executed statements per SQL text.
+        aliases (Counter): Number of executed statements per database alias.
+        template_time (float): Seconds spent rendering templates.
+        parent (RequestMetrics): The enclosing metrics, which also receive
+            every query counted here, or None.
+    """
+
+    def __init__(self, parent=None):
+        self.queries = Counter()
+        self.aliases = Counter()
+        self.template_time = 0.0
+        self.parent = parent
+
+    def add_query(self, alias, sql):
+        """
+        Count one executed statement here and in the enclosing metrics.
+        """
+        request_metrics = self
+        while request_metrics is not None:
+            request_metrics.queries[sql] += 1
+            request_metrics.aliases[alias] += 1
+            request_metrics = request_metrics.parent
+
+    @property
+    def query_count(self):
+        """
+        Return the total number of executed statements.
+        """
+        return sum(self.queries.values())
+
+    @property
+    def duplicate_count(self):
+        """
+        Return the number of statements repeating an earlier SQL text.
+
+        Repeated statements that differ only by their parameters are the
+        signature of an N+1 pattern.
+        """
+        return self.query_count - len(self.queries)
+
+
+@contextmanager
+def collect_metrics():
+    """
+    Collect the metrics of the enclosed block of code.
+
+    Blocks can be nested: the queries of an inner block are also counted by
+    the outer ones.
+
+    Yields:
+        RequestMetrics: The metrics filled while the block runs.
+    """
+    request_metrics = RequestMetrics(parent=current_metrics.get())
+    token = current_metrics.set(request_metrics)
+    try:
+        yield request_metrics
+    finally:
+        current_metrics.reset(token)
+
+
+def count_query(execute, sql, params, many, context):
+    """
+    Execute wrapper counting queries into the current metrics, if any.
+
+    It is installed on every connection when the connection is opened.
+    """
+    request_metrics = current_metrics.get()
+    if request_metrics is not None:
+        request_metrics.add_query(context["connection"].alias, sql)
+    return execute(sql, params, many, context)
+
+
+class MetricsRegistry:
+    """
+    Per-view ring buffers of request measurements.
+
+    Each sample is a (duration_ms, queries, duplicates, template_ms) tuple, and
+    only the latest BUFFER_SIZE samples of every view are kept. Queries per
+    database alias are totalled since the last clear, per view and overall,
+    to show how reads are split between the primary and the replicas.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._samples = {}
+        self._aliases = Counter()
+        self._view_aliases = {}
+
+    def record(self, view_name, duration, request_metrics):
+        """
+        Store the measurements of one request.
+
+        Args:
+            view_name (str): The name of the view that handled the request.
+            duration (float): The request duration in seconds.
+            request_metrics (RequestMetrics): The collected measurements.
+        """
+        sample = (
+            duration * 1000,
+            request_metrics.query_count,
+            request_metrics.duplicate_count,
+            request_metrics.template_time * 1000,
+        )
+        with self._lock:
+            samples = self._samples.get(view_name)
+            if samples is None:
+                samples = deque(maxlen=get_setting("BUFFER_SIZE", 1000))
+                self._samples[view_name] = samples
+            samples.append(sample)
+            self._aliases.update(request_metrics.aliases)
+            self._view_aliases.setdefault(view_name, Counter()).update(
+                request_metrics.aliases
+            )
+
+    def report(self):
+        """
+        Summarize the stored samples.
+
+        Returns:
+            dict: Percentiles and averages per view, and the total number of
+            queries per database alias, per view and overall.
+        """
+        with self._lock:
+            snapshot = {name: list(samples) for name, samples in self._samples.items()}
+            aliases = dict(self._aliases)
+            view_aliases = {
+                name: dict(counter) for name, counter in self._view_aliases.items()
+            }
+        views = {}
+        for name, samples in sorted(snapshot.items()):
+            durations, queries, duplicates, templates = zip(*samples)
+            views[name] = {
+                "requests": len(samples),
+                "duration_ms": {
+                    f"p{p}": round(percentile(durations, p), 2) for p in (50, 90, 99)
+                },
+                "template_ms_p50": round(percentile(templates, 50), 2),
+                "queries_avg": round(sum(queries) / len(samples), 2),
+                "queries_max": max(queries),
+                "duplicate_queries_max": max(duplicates),
+                "queries_per_alias": view_aliases.get(name, {}),
+            }
+        return {"views": views, "queries_per_alias": aliases}
+
+    def clear(self):
+        """
+        Drop every stored sample.
+        """
+        with self._lock:
+            self._samples.clear()
+            self._aliases.clear()
+            self._view_aliases.clear()
+
+
+metrics = MetricsRegistry()
+
+
+class TimedTemplate(Template):
+    """
+    Template that adds its render time to the metrics of the current request.
+    """
+
+    def render(self, context=None, request=None):
+        request_metrics = current_metrics.get()
+        if request_metrics is None:
+            return super().render(context, request)
+        start = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            request_metrics.template_time += time.perf_counter() - start
+
+
+class InstrumentedDjangoTemplates(DjangoTemplates):
+    """
+    Django template backend whose templates report their render time.
+    """
+
+    def from_string(self, template_code):
+        return TimedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name).template, self)
@@ -0,0 +1,355 @@
+# pylint: disable=E1101
+"""
+Jobs module for the quizzes application.
+
+This module defines the following functions:
+- get_job_settings: Return the job queue settings.
+- register: Register a function as the handler of a job.
+- enqueue: Add a job to the queue.
+- claim_jobs: Lease the next runnable jobs to a worker.
+- run_jobs: Run claimed jobs and record their outcome.
+- work: Claim and run jobs until stopped.
+- run_worker_process: Entry point of a worker process of run_workers.
+- purge_finished_jobs: Delete jobs done long enough ago.
+
+Slow work that a response does not wait for, such as updating statistics or
+rendering thumbnails, is queued as Job rows and run by the worker processes of
+the run_workers command. The queue lives in the database, so it needs no
+broker, and a job enqueued inside a transaction becomes visible to workers
+only if and when the transaction commits.
+
+Handlers are registered by name in the modules listed in the MODULES setting
+(quizzes.tasks by default). A batch handler receives the payloads of all the
+jobs of its name claimed together, so that many small jobs are coalesced into
+a few queries. Each handler run and the marking of its jobs as done share one
+transaction, so database work is never applied twice: if a job stopped being
+the worker's while it ran (its lease expired and another worker claimed it,
+or a rebuild such as stats.recompute_stats marked it done), the run is rolled
+back. When a batch fails, its jobs are run again one at a time, so only the
+faulty ones are retried.
+
+A failed run is retried after RETRY_DELAY seconds, doubled on every attempt,
+until MAX_ATTEMPTS is reached and the job is marked failed. Jobs whose worker
+died are claimed again once their LEASE expires. A job enqueued with an
+idempotency key is enqueued only once, for as long as it is kept.
+
+Settings are read from the QUIZZES_JOBS setting, see DEFAULT_SETTINGS. With
+EAGER set, jobs are run in-process when the transaction commits instead, which
+suits development without workers.
+"""
+
+import datetime
+import logging
+import signal
+import threading
+import traceback
+import uuid
+from functools import partial
+from importlib import import_module
+import django
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from .models import Job
+
+DEFAULT_SETTINGS = {
+    "EAGER": False,
+    "MODULES": ["quizzes.tasks"],
+    "WORKERS": 2,
+    "BATCH_SIZE": 100,
+    "MAX_ATTEMPTS": 5,
+    "RETRY_DELAY": 10,
+    "LEASE": 300,
+    "POLL_INTERVAL": 1.0,
+    "RETENTION_DAYS": 7,
+}
+
+logger = logging.getLogger(__name__)
+
+_handlers = {}
+
+
+def get_job_settings():
+    """
+    Return the job queue settings.
+
+    Returns:
+        dict: DEFAULT_SETTINGS updated with the QUIZZES_JOBS setting.
+    """
+    return {**DEFAULT_SETTINGS, **getattr(settings, "QUIZZES_JOBS", {})}
+
+
+def register(name, batch=False):
+    """
+    Register a function as the handler of a job.
+
+    Args:
+        name (str): The name jobs are enqueued under.
+        batch (bool): Whether the function takes a list of payloads, so that
+            claimed jobs of the same name are run by one call.
+
+    Returns:
+        function: A decorator registering the function and returning it.
+    """
+
+    def decorator(func):
+        _handlers[name] = (func, batch)
+        return func
+
+    return decorator
+
+
+def _get_handler(name):
+    """
+    Return the (function, batch) handler of a job name, or None.
+    """
+    if name not in _handlers:
+        for module in get_job_settings()["MODULES"]:
+            import_module(module)
+    return _handlers.get(name)
+
+
+def _run_eagerly(name, payload):
+    """
+    Run one job in-process, logging rather than raising its errors.
+    """
+    func, batch = _get_handler(name)
+    try:
+        if batch:
+            func([payload])
+        else:
+            func(payload)
+    # pylint: disable=W0718
+    except Exception:
+        logger.exception("Job %s failed.", name)
+
+
+def enqueue(name, payload=None, key=None, delay=0):
+    """
+    Add a job to the queue.
+
+    Inside a transaction, the job is only run if the transaction commits.
+
+    Args:
+        name (str): The name of the registered handler.
+        payload (object): The JSON-serializable argument of the handler.
+        key (str): An idempotency key; the job is not enqueued if a job with
+            the same key was.
+        delay (float): Seconds to wait before the job may run.
+    """
+    if payload is None:
+        payload = {}
+    if get_job_settings()["EAGER"]:
+        transaction.on_commit(partial(_run_eagerly, name, payload))
+        return
+    run_after = timezone.now() + datetime.timedelta(seconds=delay)
+    Job.objects.bulk_create(
+        [Job(name=name, payload=payload, key=key, run_after=run_after)],
+        ignore_conflicts=True,
+    )
+
+
+def claim_jobs(limit, lease):
+    """
+    Lease the next runnable jobs to a worker.
+
+    Jobs are claimed with a conditional UPDATE, so concurrent workers never
+    claim the same job, on any database.
+
+    Args:
+        limit (int): The maximum number of jobs to claim.
+        lease (float): Seconds before the jobs may be claimed again.
+
+    Returns:
+        list: The claimed jobs, oldest first.
+    """
+    now = timezone.now()
+    runnable = Q(status=Job.PENDING, run_after__lte=now) | Q(
+        status=Job.RUNNING, locked_until__lt=now
+    )
+    ids = list(
+        Job.objects.filter(runnable).order_by("id").values_list("id", flat=True)[
+            :limit
+        ]
+    )
+    if not ids:
+        return []
+    claim = uuid.uuid4().hex
+    Job.objects.filter(runnable, id__in=ids).update(
+        status=Job.RUNNING,
+        locked_by=claim,
+        locked_until=now + datetime.timedelta(seconds=lease),
+        attempts=F("attempts") + 1,
+    )
+    return list(Job.objects.filter(locked_by=claim).order_by("id"))
+
+
+class JobTakenOver(Exception):
+    """
+    A job was claimed by another worker or marked done while it ran.
+    """
+
+
+def _finish(jobs):
+    """
+    Mark jobs as done, unless another worker claimed them since.
+
+    Returns:
+        int: The number of jobs marked as done.
+    """
+    return Job.objects.filter(
+        id__in=[job.id for job in jobs],
+        locked_by=jobs[0].locked_by,
+        status=Job.RUNNING,
+    ).update(
+        status=Job.DONE,
+        finished=timezone.now(),
+        locked_until=None,
+        last_error="",
+    )
+
+
+def _fail(jobs, error, config):
+    """
+    Schedule a retry of failed jobs, or mark them as failed for good.
+    """
+    now = timezone.now()
+    for job in jobs:
+        if job.attempts < config["MAX_ATTEMPTS"]:
+            delay = config["RETRY_DELAY"] * 2 ** (job.attempts - 1)
+            changes = {
+                "status": Job.PENDING,
+                "run_after": now + datetime.timedelta(seconds=delay),
+            }
+        else:
+            changes = {"status": Job.FAILED, "finished": now}
+            logger.error("Job %s failed %d times: %s", job, job.attempts, error)
+        Job.objects.filter(
+            id=job.id, locked_by=job.locked_by, status=Job.RUNNING
+        ).update(locked_until=None, last_error=error, **changes)
+
+
+def _run_unit(func, batch, unit):
+    """
+    Run jobs by one handler call and mark them as done, in one transaction.
+
+    Returns:
+        str: The traceback of the failure, or an empty string on success.
+    """
+    try:
+        with transaction.atomic():
+            if batch:
+                func([job.payload for job in unit])
+            else:
+                func(unit[0].payload)
+            if _finish(unit) != len(unit):
+                raise JobTakenOver(", ".join(str(job) for job in unit))
+    # pylint: disable=W0718
+    except Exception:
+        return traceback.format_exc()
+    return ""
+
+
+def run_jobs(jobs, config=None):
+    """
+    Run claimed jobs and record their outcome.
+
+    Jobs of a batch handler are run by one call per name, and again one at a
+    time if that call fails; other jobs by one call each. Jobs already claimed
+    MAX_ATTEMPTS times, by workers that died running them, are failed without
+    running.
+
+    Args:
+        jobs (list): The jobs as returned by claim_jobs.
+        config (dict): The job queue settings, see get_job_settings.
+    """
+    config = config or get_job_settings()
+    exhausted = [job for job in jobs if job.attempts > config["MAX_ATTEMPTS"]]
+    if exhausted:
+        _fail(exhausted, "The worker running the job stopped.", config)
+    groups = {}
+    for job in jobs:
+        if job.attempts <= config["MAX_ATTEMPTS"]:
+            groups.setdefault(job.name, []).append(job)
+
+    for name, group in groups.items():
+        handler = _get_handler(name)
+        if handler is None:
+            _fail(group, f"No handler is registered for {name}.", {"MAX_ATTEMPTS": 0})
+            continue
+        func, batch = handler
+        if batch and len(group) > 1 and not _run_unit(func, True, group):
+            continue
+        # A failed batch is run again one job at a time, so that one bad
+        # payload does not hold back the others.
+        for job in group:
+            error = _run_unit(func, batch, [job])
+            if error:
+                _fail([job], error, config)
+
+
+def work(stop_event=None, burst=False, config=None):
+    """
+    Claim and run jobs until stopped.
+
+    Args:
+        stop_event (Event): A threading or multiprocessing event set to stop
+            the worker; it is checked between batches.
+        burst (bool): Whether to exit as soon as no job is runnable.
+        config (dict): The job queue settings, see get_job_settings.
+
+    Returns:
+        int: The number of jobs run.
+    """
+    stop_event = stop_event or threading.Event()
+    config = config or get_job_settings()
+    processed = 0
+    while not stop_event.is_set():
+        jobs = claim_jobs(config["BATCH_SIZE"], config["LEASE"])
+        if jobs:
+            run_jobs(jobs, config)
+            processed += len(jobs)
+        elif burst:
+            break
+        else:
+            close_old_connections()
+            stop_event.wait(config["POLL_INTERVAL"])
+    return processed
+
+
+def run_worker_process(stop_event, burst, config):
+    """
+    Entry point of a worker process of run_workers.
+
+    Interrupts go to the parent process, which stops the workers through
+    stop_event once their current batch is done.
+
+    Args:
+        stop_event (Event): A multiprocessing event set to stop the worker.
+        burst (bool): Whether to exit as soon as no job is runnable.
+        config (dict): The job queue settings, see get_job_settings.
+    """
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    django.setup()
+    work(stop_event, burst, config)
+
+
+def purge_finished_jobs(days=None):
+    """
+    Delete jobs done long enough ago.
+
+    Failed jobs are kept for inspection. The idempotency key of a deleted job
+    can be enqueued again.
+
+    Args:
+        days (float): The age of the jobs to delete, RETENTION_DAYS by default.
+
+    Returns:
+        int: The number of deleted jobs.
+    """
+    if days is None:
+        days = get_job_settings()["RETENTION_DAYS"]
+    cutoff = timezone.now() - datetime.timedelta(days=days)
+    deleted, _ = Job.objects.filter(status=Job.DONE, finished__lt=cutoff).delete()
+    return deleted
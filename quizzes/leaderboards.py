@@ -0,0 +1,576 @@
+# pylint: disable=E1101
+"""
+Leaderboards module for the quizzes application.
+
+This module defines the following functions:
+- member_for: Return the leaderboard member an attempt counts for.
+- record_attempt: Add a graded attempt to the leaderboards.
+- record_deferred_score: Apply a leaderboard update deferred by contention.
+- get_top: Return the best members of a leaderboard.
+- get_rank: Return the rank of a member on a leaderboard.
+- rebuild_leaderboards: Rebuild every leaderboard from the stored attempts.
+
+Each quiz has a leaderboard of the best score of every taker, and the global
+leaderboard ranks takers by the sum of their best scores. A taker is identified
+by their session key; attempts without a session count as separate takers.
+
+Leaderboards live in the "leaderboards" cache, which every process shares
+(see CACHES in quiz_site/settings.py), and are updated when an attempt
+commits, so reading them never scans the Attempt table. Every leaderboard is
+stored as:
+- the scores of its members, split into MEMBER_SHARDS entries;
+- a RankTree counting the members per score, split into shards of
+  RankTree.SHARD_SIZE nodes, which gives the rank of any score reading
+  O(log max_score) shards;
+- the TOP_SIZE best members, kept sorted.
+
+Scores on a leaderboard only ever increase, so the top list stays exact as it
+is updated. Updates of one leaderboard are serialized by a lock entry in the
+cache, which needs an atomic add (Redis, or the AtomicFileBasedCache of
+quiz_site/cache.py). An update that cannot get the lock is not dropped: it is
+queued as a job (see quizzes.jobs), retried until the lock is free. The whole
+state is derived from attempts: leaderboards missing from the
+cache are rebuilt on first access, and deleting attempts or quizzes is
+reflected after running the rebuild_leaderboards command.
+"""
+
+import bisect
+import hashlib
+import logging
+import time
+import zlib
+from contextlib import contextmanager
+from django.core.cache import caches
+from .jobs import enqueue
+from .models import Attempt
+
+LEADERBOARD_CACHE_ALIAS = "leaderboards"
+GENERATION_KEY = "quizzes:leaderboard:generation"
+REBUILD_LOCK_KEY = "quizzes:leaderboard:rebuild"
+BOARD_KEY = "quizzes:leaderboard:{generation}:{board}:{part}"
+GLOBAL_BOARD = "global"
+TOP_SIZE = 20
+MEMBER_SHARDS = 64
+LOCK_TIMEOUT = 5
+LOCK_WAIT = 2.0
+REBUILD_LOCK_TIMEOUT = 300
+REBUILD_CHUNK_SIZE = 2000
+DEFERRED_JOB = "quizzes.record_leaderboard_score"
+DEFERRED_DELAY = 1
+
+logger = logging.getLogger(__name__)
+
+
+class RankTree:
+    """
+    Number of members per score of a leaderboard, in a Fenwick tree.
+
+    The nodes are stored in the cache in fixed-size shards of SHARD_SIZE
+    nodes. Adding a member and counting the members above a score follow a
+    path of O(log max_score) nodes, so they read O(log max_score) shards with
+    one get_many, and the shards they change are written back by the caller
+    (see changes). The tree doubles in size when a score exceeds its range;
+    the nodes of a Fenwick tree do not depend on its size, so growing only
+    copies the total into the new root.
+
+    Attributes:
+        size (int): The number of scores in range, a power of two; node
+            score + 1 holds the count of score.
+    """
+
+    SHARD_SIZE = 256
+    INITIAL_SIZE = 64
+
+    def __init__(self, generation, board):
+        self._generation = generation
+        self._board = board
+        self._shards = {}
+        self._changed = set()
+        self.size = _cache().get(self._key("size")) or self.INITIAL_SIZE
+        self._resized = False
+
+    def _key(self, part):
+        return _key(self._generation, self._board, f"ranks:{part}")
+
+    @staticmethod
+    def _path_down(index):
+        path = []
+        while index > 0:
+            path.append(index)
+            index -= index & -index
+        return path
+
+    def _path_up(self, index):
+        path = []
+        while index <= self.size:
+            path.append(index)
+            index += index & -index
+        return path
+
+    def _fetch(self, indexes):
+        numbers = {index // self.SHARD_SIZE for index in indexes} - set(self._shards)
+        keys = {self._key(number): number for number in numbers}
+        found = _cache().get_many(list(keys))
+        for key, number in keys.items():
+            self._shards[number] = found.get(key) or [0] * self.SHARD_SIZE
+
+    def _node(self, index):
+        number, offset = divmod(index, self.SHARD_SIZE)
+        return self._shards[number][offset]
+
+    def _add_node(self, index, count):
+        number, offset = divmod(index, self.SHARD_SIZE)
+        self._shards[number][offset] += count
+        self._changed.add(number)
+
+    def add(self, score, count):
+        """
+        Add a number of members (negative to remove them) with a score.
+        """
+        if score + 1 > self.size:
+            total = self.total()
+            while self.size < score + 1:
+                self.size *= 2
+                self._fetch([self.size])
+                self._add_node(self.size, total)
+            self._resized = True
+        path = self._path_up(score + 1)
+        self._fetch(path)
+        for index in path:
+            self._add_node(index, count)
+
+    def total(self):
+        """
+        Return the number of members.
+        """
+        self._fetch([self.size])
+        return self._node(self.size)
+
+    def count_above(self, score):
+        """
+        Return the number of members with a higher score.
+        """
+        path = self._path_down(min(score + 1, self.size))
+        self._fetch([*path, self.size])
+        return self._node(self.size) - sum(self._node(index) for index in path)
+
+    def changes(self):
+        """
+        Return the cache entries of the shards changed since the tree was read.
+        """
+        entries = {self._key(number): self._shards[number] for number in self._changed}
+        if self._resized:
+            entries[self._key("size")] = self.size
+        return entries
+
+    @classmethod
+    def build(cls, generation, board, scores):
+        """
+        Return the cache entries of the tree of a complete list of scores.
+        """
+        size = cls.INITIAL_SIZE
+        while size < max(scores, default=0) + 1:
+            size *= 2
+        nodes = [0] * (size + 1)
+        for score in scores:
+            nodes[score + 1] += 1
+        for index in range(1, size + 1):
+            parent = index + (index & -index)
+            if parent <= size:
+                nodes[parent] += nodes[index]
+        entries = {_key(generation, board, "ranks:size"): size}
+        for start in range(0, size + 1, cls.SHARD_SIZE):
+            shard = nodes[start : start + cls.SHARD_SIZE]
+            if any(shard):
+                shard += [0] * (cls.SHARD_SIZE - len(shard))
+                key = _key(generation, board, f"ranks:{start // cls.SHARD_SIZE}")
+                entries[key] = shard
+        return entries
+
+
+def _cache():
+    return caches[LEADERBOARD_CACHE_ALIAS]
+
+
+def _board(quiz_id):
+    return GLOBAL_BOARD if quiz_id is None else f"quiz:{quiz_id}"
+
+
+def _key(generation, board, part):
+    return BOARD_KEY.format(generation=generation, board=board, part=part)
+
+
+def _shard(member):
+    return f"members:{zlib.crc32(member.encode()) % MEMBER_SHARDS}"
+
+
+def _generation():
+    """
+    Return the current generation of the leaderboards.
+
+    Leaderboards missing from the cache, after a restart or a flush, are
+    rebuilt by the first process that needs them; the others wait up to
+    LOCK_WAIT seconds for the rebuild and see empty leaderboards meanwhile.
+    """
+    cache = _cache()
+    generation = cache.get(GENERATION_KEY)
+    if generation is not None:
+        return generation
+    if cache.add(REBUILD_LOCK_KEY, 1, REBUILD_LOCK_TIMEOUT):
+        try:
+            rebuild_leaderboards()
+        finally:
+            cache.delete(REBUILD_LOCK_KEY)
+    else:
+        deadline = time.monotonic() + LOCK_WAIT
+        while generation is None and time.monotonic() < deadline:
+            time.sleep(0.05)
+            generation = cache.get(GENERATION_KEY)
+    return cache.get(GENERATION_KEY, 0)
+
+
+@contextmanager
+def _locked(generation, board):
+    """
+    Hold the update lock of a leaderboard, waiting up to LOCK_WAIT seconds.
+
+    Yields:
+        bool: Whether the lock was acquired.
+    """
+    cache = _cache()
+    key = _key(generation, board, "lock")
+    deadline = time.monotonic() + LOCK_WAIT
+    acquired = cache.add(key, 1, LOCK_TIMEOUT)
+    while not acquired and time.monotonic() < deadline:
+        time.sleep(0.005)
+        acquired = cache.add(key, 1, LOCK_TIMEOUT)
+    try:
+        yield acquired
+    finally:
+        if acquired:
+            cache.delete(key)
+
+
+class LeaderboardBusy(Exception):
+    """
+    The update lock of a leaderboard could not be acquired in time.
+    """
+
+
+def _register_board(generation, board):
+    """
+    Add a leaderboard to the index of its generation, the first time only.
+
+    The index lets a rebuild delete every key of the generation it replaces.
+    """
+    cache = _cache()
+    if cache.add(_key(generation, board, "registered"), True, None):
+        count_key = _key(generation, "index", "count")
+        cache.add(count_key, 0, None)
+        cache.set(_key(generation, "index", cache.incr(count_key)), board, None)
+
+
+def _delete_generation(generation):
+    """
+    Delete every key of a replaced generation of the leaderboards.
+    """
+    cache = _cache()
+    count_key = _key(generation, "index", "count")
+    index_keys = [
+        _key(generation, "index", index)
+        for index in range(1, (cache.get(count_key) or 0) + 1)
+    ]
+    keys = [count_key, *index_keys]
+    for board in cache.get_many(index_keys).values():
+        size = cache.get(_key(generation, board, "ranks:size")) or 0
+        keys += [
+            _key(generation, board, part) for part in ("top", "lock", "registered")
+        ]
+        keys += [_key(generation, board, f"members:{n}") for n in range(MEMBER_SHARDS)]
+        keys += [
+            _key(generation, board, f"ranks:{part}")
+            for part in ["size", *range(size // RankTree.SHARD_SIZE + 1)]
+        ]
+    cache.delete_many(keys)
+
+
+def _insert_top(top, member, score, achieved):
+    """
+    Place a member in a sorted top list, dropping entries beyond TOP_SIZE.
+    """
+    top = [entry for entry in top if entry[2] != member]
+    bisect.insort(top, (-score, achieved, member))
+    return top[:TOP_SIZE]
+
+
+def _raise_score(generation, board, member, score, achieved, add):
+    """
+    Raise the score of a member on a leaderboard.
+
+    Args:
+        add (bool): Whether score is added to the member's score (global
+            leaderboard) or replaces it when it is higher (quiz leaderboards).
+
+    Returns:
+        int: How much the member's score increased, or None if the leaderboard
+        did not change.
+
+    Raises:
+        LeaderboardBusy: If the leaderboard stayed locked for LOCK_WAIT.
+    """
+    cache = _cache()
+    with _locked(generation, board) as acquired:
+        if not acquired:
+            raise LeaderboardBusy(board)
+        _register_board(generation, board)
+        shard_key = _key(generation, board, _shard(member))
+        members = cache.get(shard_key) or {}
+        old_score = members[member][0] if member in members else None
+        if add:
+            if old_score is not None and score == 0:
+                return None
+            new_score = (old_score or 0) + score
+        else:
+            if old_score is not None and score <= old_score:
+                return None
+            new_score = score
+
+        members[member] = (new_score, achieved)
+        tree = RankTree(generation, board)
+        if old_score is not None:
+            tree.add(old_score, -1)
+        tree.add(new_score, 1)
+        top_key = _key(generation, board, "top")
+        top = _insert_top(cache.get(top_key) or [], member, new_score, achieved)
+        cache.set_many({shard_key: members, top_key: top, **tree.changes()}, None)
+    return new_score - (old_score or 0)
+
+
+def member_for(session_key, attempt_id):
+    """
+    Return the leaderboard member an attempt counts for.
+
+    Args:
+        session_key (str): The session key of the taker, possibly empty.
+        attempt_id (int): The ID of the attempt.
+
+    Returns:
+        str: The session key, or a member of its own for sessionless attempts.
+    """
+    return session_key or f"attempt:{attempt_id}"
+
+
+def record_attempt(quiz_id, member, score, achieved):
+    """
+    Add a graded attempt to the leaderboards.
+
+    Args:
+        quiz_id (int): The ID of the quiz.
+        member (str): The member the attempt counts for, see member_for.
+        score (int): The score of the attempt.
+        achieved (datetime): When the attempt was made, which breaks ties.
+    """
+    _record(_generation(), quiz_id, member, score, achieved.timestamp())
+
+
+def _defer(generation, quiz_id, member, score, achieved, add):
+    """
+    Queue a leaderboard update that found its leaderboard locked.
+    """
+    logger.info("Leaderboard of quiz %s is locked, update deferred.", quiz_id)
+    payload = {
+        "generation": generation,
+        "quiz": quiz_id,
+        "member": member,
+        "score": score,
+        "achieved": achieved,
+        "add": add,
+    }
+    enqueue(DEFERRED_JOB, payload, delay=DEFERRED_DELAY)
+
+
+def _record(generation, quiz_id, member, score, achieved, retry=False):
+    """
+    Raise the score of a member on a quiz leaderboard, then on the global one.
+
+    A locked leaderboard defers its update to a job, or raises LeaderboardBusy
+    when run by that job (retry), so that the job is retried as a whole.
+    """
+    try:
+        increase = _raise_score(
+            generation, _board(quiz_id), member, score, achieved, add=False
+        )
+    except LeaderboardBusy:
+        if retry:
+            raise
+        _defer(generation, quiz_id, member, score, achieved, add=False)
+        return
+    if increase is not None:
+        _record_total(generation, member, increase, achieved)
+
+
+def _record_total(generation, member, increase, achieved):
+    """
+    Add an increase of a quiz score to the global leaderboard.
+    """
+    try:
+        _raise_score(generation, GLOBAL_BOARD, member, increase, achieved, add=True)
+    except LeaderboardBusy:
+        # The quiz leaderboard is updated already: defer only the total.
+        _defer(generation, None, member, increase, achieved, add=True)
+
+
+def record_deferred_score(payload):
+    """
+    Apply a leaderboard update deferred by contention.
+
+    Updates of a generation replaced since are dropped: the rebuild that
+    replaced it read their attempt from the database.
+
+    Args:
+        payload (dict): The generation, quiz ID (None for the global
+            leaderboard), member, score, time and whether the score is added.
+
+    Raises:
+        LeaderboardBusy: If the leaderboard is still locked.
+    """
+    generation = payload["generation"]
+    if generation != _generation():
+        return
+    member, score, achieved = payload["member"], payload["score"], payload["achieved"]
+    if payload["add"]:
+        _raise_score(generation, GLOBAL_BOARD, member, score, achieved, add=True)
+    else:
+        _record(generation, payload["quiz"], member, score, achieved, retry=True)
+
+
+def _label(member):
+    """
+    Return the public name of a member, which does not reveal its session key.
+    """
+    return "Участник " + hashlib.sha256(member.encode()).hexdigest()[:6]
+
+
+def get_top(quiz_id=None, member=None):
+    """
+    Return the best members of a leaderboard.
+
+    Members with the same score share a rank; among them, the one who reached
+    the score first is listed first.
+
+    Args:
+        quiz_id (int): The ID of the quiz, or None for the global leaderboard.
+        member (str): The member viewing the leaderboard, who is marked.
+
+    Returns:
+        list: Up to TOP_SIZE dicts with the rank, label, score and is_me flag
+        of each member.
+    """
+    top = _cache().get(_key(_generation(), _board(quiz_id), "top")) or []
+    entries = []
+    for index, (negative_score, _, entry_member) in enumerate(top):
+        if index and negative_score == top[index - 1][0]:
+            rank = entries[-1]["rank"]
+        else:
+            rank = index + 1
+        entries.append(
+            {
+                "rank": rank,
+                "label": _label(entry_member),
+                "score": -negative_score,
+                "is_me": entry_member == member,
+            }
+        )
+    return entries
+
+
+def get_rank(member, quiz_id=None):
+    """
+    Return the rank of a member on a leaderboard.
+
+    Args:
+        member (str): The member, see member_for.
+        quiz_id (int): The ID of the quiz, or None for the global leaderboard.
+
+    Returns:
+        dict: The rank, score and total number of members, or None if the
+        member is not on the leaderboard.
+    """
+    cache = _cache()
+    generation = _generation()
+    board = _board(quiz_id)
+    members = cache.get(_key(generation, board, _shard(member))) or {}
+    if member not in members:
+        return None
+    score = members[member][0]
+    tree = RankTree(generation, board)
+    return {
+        "rank": tree.count_above(score) + 1,
+        "score": score,
+        "total": tree.total(),
+    }
+
+
+def _write_board(generation, board, members):
+    """
+    Store a complete leaderboard built in memory.
+    """
+    shards = RankTree.build(
+        generation, board, [score for score, _ in members.values()]
+    )
+    for member, (score, achieved) in members.items():
+        shards.setdefault(_key(generation, board, _shard(member)), {})[member] = (
+            score,
+            achieved,
+        )
+    top = sorted(
+        (-score, achieved, member) for member, (score, achieved) in members.items()
+    )[:TOP_SIZE]
+    shards[_key(generation, board, "top")] = top
+    _cache().set_many(shards, None)
+    _register_board(generation, board)
+
+
+def rebuild_leaderboards():
+    """
+    Rebuild every leaderboard from the stored attempts.
+
+    The leaderboards are written under a new generation, named after the
+    time of the rebuild, which replaces the current one once they are
+    complete, so readers never see a partial rebuild and never the leftovers
+    of an earlier one. The replaced generation is then deleted. Attempts
+    recorded while the rebuild runs are lost and need another rebuild.
+
+    Returns:
+        dict: The number of quiz leaderboards and of global members written.
+    """
+    attempts = Attempt.objects.order_by("quiz_id", "created", "id").values_list(
+        "id", "quiz_id", "session_key", "score", "created"
+    )
+    boards = {}
+    for attempt_id, quiz_id, session_key, score, created in attempts.iterator(
+        chunk_size=REBUILD_CHUNK_SIZE
+    ):
+        members = boards.setdefault(quiz_id, {})
+        member = member_for(session_key, attempt_id)
+        if member not in members or score > members[member][0]:
+            members[member] = (score, created.timestamp())
+
+    totals = {}
+    for members in boards.values():
+        for member, (score, achieved) in members.items():
+            total, last = totals.get(member, (0, achieved))
+            totals[member] = (total + score, max(last, achieved))
+
+    cache = _cache()
+    replaced = cache.get(GENERATION_KEY)
+    generation = time.time_ns()
+    for quiz_id, members in boards.items():
+        _write_board(generation, _board(quiz_id), members)
+    _write_board(generation, GLOBAL_BOARD, totals)
+    cache.set(GENERATION_KEY, generation, None)
+    _delete_generation(replaced or 0)
+    if replaced:
+        # Updates made while a first rebuild was running went to generation 0.
+        _delete_generation(0)
+    return {"quizzes": len(boards), "members": len(totals)}
@@ -0,0 +1,162 @@
+"""
+Management command that benchmarks the quiz request paths.
+"""
+
+import json
+import os
+import tempfile
+from django.conf import settings
+from django.core.cache import caches
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import (
+    override_settings,
+    setup_test_environment,
+    teardown_test_environment,
+)
+from quizzes.benchmark import (
+    asgi_urlconf,
+    build_scenarios,
+    compare_with_baseline,
+    load_baseline,
+    run_scenario,
+    run_scenario_async,
+    save_baseline,
+    seed_catalogue,
+)
+from quizzes.snapshots import snapshot_cache
+
+DEFAULT_BASELINE = os.path.join(settings.BASE_DIR, "benchmarks", "baseline.json")
+# Every profile starts from empty caches of its own, whatever the configured
+# backends hold from earlier runs or from the running site.
+BENCH_CACHES = {
+    alias: {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": f"bench-{alias}",
+    }
+    for alias in settings.CACHES
+}
+
+
+class Command(BaseCommand):
+    """
+    Seed a throwaway database, drive the quiz views and report their cost.
+
+    Fails when a scenario needs more queries per request than the baseline.
+    With --server asgi the requests go through the ASGI handler and the async
+    read views; --server both runs the two profiles for comparison.
+    """
+
+    help = "Benchmark quiz_list, take_quiz, save_quiz_answers and quiz_result."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--categories", type=int, default=5)
+        parser.add_argument("--quizzes", type=int, default=20)
+        parser.add_argument("--questions", type=int, default=50)
+        parser.add_argument("--options", type=int, default=4)
+        parser.add_argument("--requests", type=int, default=200)
+        parser.add_argument("--concurrency", type=int, default=4)
+        parser.add_argument(
+            "--server",
+            choices=["wsgi", "asgi", "both"],
+            default="wsgi",
+            help="Serving profile to benchmark.",
+        )
+        parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+        parser.add_argument(
+            "--update-baseline",
+            action="store_true",
+            help="Store the measured query counts as the new baseline.",
+        )
+        parser.add_argument(
+            "--json", action="store_true", help="Print the report as JSON."
+        )
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        if connection.vendor == "sqlite":
+            # Concurrent workers need a file: shared in-memory databases lock.
+            test_settings = connection.settings_dict.setdefault("TEST", {})
+            if not test_settings.get("NAME"):
+                test_settings["NAME"] = os.path.join(
+                    tempfile.gettempdir(), "quizzes_bench.sqlite3"
+                )
+        old_name = connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, serialize=False
+        )
+        try:
+            quiz_ids = seed_catalogue(
+                options["categories"],
+                options["quizzes"],
+                options["questions"],
+                options["options"],
+            )
+            servers = (
+                ["wsgi", "asgi"] if options["server"] == "both" else [options["server"]]
+            )
+            reports = {
+                server: self.run_profile(server, quiz_ids, options)
+                for server in servers
+            }
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        if options["json"]:
+            self.stdout.write(json.dumps(reports, indent=4))
+        else:
+            for server, report in reports.items():
+                self.stdout.write(server.upper())
+                self.write_table(report)
+
+        if options["update_baseline"]:
+            save_baseline(options["baseline"], reports[servers[0]])
+            self.stdout.write(
+                self.style.SUCCESS(f"Baseline saved to {options['baseline']}.")
+            )
+            return
+        baseline = load_baseline(options["baseline"])
+        regressions = [
+            f"{server} {message}"
+            for server, report in reports.items()
+            for message in compare_with_baseline(report, baseline)
+        ]
+        if regressions:
+            raise CommandError("Query count regressions:\n" + "\n".join(regressions))
+
+    def run_profile(self, server, quiz_ids, options):
+        """
+        Run every scenario under a serving profile and return the report.
+        """
+        if server == "wsgi":
+            runner, urlconf = run_scenario, settings.ROOT_URLCONF
+        else:
+            runner, urlconf = run_scenario_async, asgi_urlconf()
+        with override_settings(ROOT_URLCONF=urlconf, CACHES=BENCH_CACHES):
+            for cache in caches.all():
+                cache.clear()
+            snapshot_cache.clear()
+            return {
+                scenario.name: runner(
+                    scenario, options["requests"], options["concurrency"]
+                )
+                for scenario in build_scenarios(quiz_ids)
+            }
+
+    def write_table(self, report):
+        """
+        Print the report as an aligned table.
+        """
+        columns = [
+            "p50_ms",
+            "p90_ms",
+            "p99_ms",
+            "throughput_rps",
+            "queries_median",
+            "queries_max",
+        ]
+        self.stdout.write(f"{'scenario':<20}" + "".join(f"{c:>16}" for c in columns))
+        for name, result in report.items():
+            self.stdout.write(
+                f"{name:<20}" + "".join(f"{result[c]:>16}" for c in columns)
+            )
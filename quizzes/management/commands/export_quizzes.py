@@ -0,0 +1,35 @@
+"""
+Management command that exports the quiz catalogue as JSONL or CSV.
+"""
+
+import sys
+from django.core.management.base import BaseCommand
+from quizzes.transfer import CHUNK_SIZE, iter_export_records, write_records
+
+
+class Command(BaseCommand):
+    """
+    Stream every category, quiz, question and option to a file or stdout.
+    """
+
+    help = "Export the quiz catalogue as JSONL or CSV."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help='Output file, or "-" for stdout.')
+        parser.add_argument(
+            "--format",
+            choices=["jsonl", "csv"],
+            help="Output format (default: guessed from the file extension).",
+        )
+        parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        fmt = options["format"] or ("csv" if path.endswith(".csv") else "jsonl")
+        records = iter_export_records(chunk_size=options["chunk_size"])
+        if path == "-":
+            count = write_records(records, sys.stdout, fmt)
+        else:
+            with open(path, "w", encoding="utf-8", newline="") as stream:
+                count = write_records(records, stream, fmt)
+        self.stderr.write(self.style.SUCCESS(f"Exported {count} records."))
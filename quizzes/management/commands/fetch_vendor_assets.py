@@ -0,0 +1,54 @@
+"""
+Management command that downloads the vendor libraries into static/vendor.
+"""
+
+import base64
+import hashlib
+import os
+import re
+import urllib.request
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from quizzes.vendor import VENDOR_ASSETS
+
+# Source maps are not vendored, and collectstatic fails on missing references.
+SOURCE_MAP_RE = re.compile(rb"\n?(//|/\*)# sourceMappingURL=[^\n]*?(\*/)?\s*$")
+
+
+class Command(BaseCommand):
+    """
+    Download the pinned vendor libraries to the first STATICFILES_DIRS entry.
+
+    Commit the downloaded files, so deployments never depend on a CDN.
+    """
+
+    help = "Download the pinned front-end libraries into static/vendor."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="Download libraries that are already present again.",
+        )
+
+    def handle(self, *args, **options):
+        root = settings.STATICFILES_DIRS[0]
+        for name, (path, url) in VENDOR_ASSETS.items():
+            target = os.path.join(root, path)
+            if os.path.exists(target) and not options["force"]:
+                self.stdout.write(f"{name}: already present.")
+                continue
+            try:
+                with urllib.request.urlopen(url, timeout=30) as response:
+                    content = response.read()
+            except OSError as error:
+                raise CommandError(f"Cannot download {url}: {error}") from error
+            content = SOURCE_MAP_RE.sub(b"\n", content)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            with open(target, "wb") as output:
+                output.write(content)
+            digest = base64.b64encode(hashlib.sha384(content).digest()).decode()
+            self.stdout.write(f"{name}: {path} ({len(content)} bytes, sha384-{digest})")
+        self.stdout.write(
+            self.style.SUCCESS("Vendor libraries are in place; run collectstatic.")
+        )
@@ -0,0 +1,62 @@
+# pylint: disable=E1101
+"""
+Management command that backfills the quiz image derivatives.
+
+The names of the rendered derivatives are recorded on their quizzes, whose
+content versions are bumped so that the next requests show the thumbnails.
+"""
+
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from django.core.management.base import BaseCommand
+from django.db import connections
+from quizzes.images import generate_derivatives, record_derivatives
+from quizzes.models import Quiz
+from quizzes.versions import bump_catalogue_version, bump_quiz_version
+
+
+class Command(BaseCommand):
+    """
+    Render the missing derivatives of every quiz image with a process pool.
+    """
+
+    help = "Generate the missing WebP derivatives of quiz images."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=None,
+            help="Number of worker processes (default: number of CPUs).",
+        )
+
+    def handle(self, *args, **options):
+        names = list(
+            Quiz.objects.exclude(image="")
+            .exclude(image__isnull=True)
+            .values_list("image", flat=True)
+            .distinct()
+        )
+        # Worker processes must not inherit open database connections.
+        connections.close_all()
+
+        failed = 0
+        with ProcessPoolExecutor(max_workers=options["workers"]) as executor:
+            futures = {
+                executor.submit(generate_derivatives, name): name for name in names
+            }
+            for future in as_completed(futures):
+                try:
+                    derivatives = future.result()
+                except OSError as error:
+                    failed += 1
+                    self.stderr.write(f"{futures[future]}: {error}")
+                    continue
+                for quiz_id in record_derivatives(futures[future], derivatives):
+                    bump_quiz_version(quiz_id)
+        if failed < len(names):
+            bump_catalogue_version()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Processed {len(names) - failed} images, {failed} failed."
+            )
+        )
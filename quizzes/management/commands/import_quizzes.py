@@ -0,0 +1,51 @@
+"""
+Management command that imports a quiz catalogue from JSONL or CSV.
+"""
+
+import sys
+from django.core.management.base import BaseCommand, CommandError
+from quizzes.search import rebuild_index
+from quizzes.transfer import CHUNK_SIZE, import_records, read_records
+
+
+class Command(BaseCommand):
+    """
+    Stream categories, quizzes, questions and options from a file or stdin.
+    """
+
+    help = "Import a quiz catalogue exported with export_quizzes."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help='Input file, or "-" for stdin.')
+        parser.add_argument(
+            "--format",
+            choices=["jsonl", "csv"],
+            help="Input format (default: guessed from the file extension).",
+        )
+        parser.add_argument("--batch-size", type=int, default=CHUNK_SIZE)
+        parser.add_argument(
+            "--no-reindex",
+            action="store_true",
+            help="Do not rebuild the search index after the import.",
+        )
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        fmt = options["format"] or ("csv" if path.endswith(".csv") else "jsonl")
+        try:
+            if path == "-":
+                counts = import_records(
+                    read_records(sys.stdin, fmt), options["batch_size"]
+                )
+            else:
+                with open(path, encoding="utf-8", newline="") as stream:
+                    counts = import_records(
+                        read_records(stream, fmt), options["batch_size"]
+                    )
+        except (OSError, ValueError) as error:
+            raise CommandError(str(error)) from error
+
+        if counts["quiz"] and not options["no_reindex"]:
+            rebuild_index()
+        summary = ", ".join(f"{count} {name}" for name, count in counts.items())
+        self.stdout.write(self.style.SUCCESS(f"Imported {summary}."))
@@ -0,0 +1,23 @@
+"""
+Management command that rebuilds the quiz leaderboards.
+"""
+
+from django.core.management.base import BaseCommand
+from quizzes.leaderboards import rebuild_leaderboards
+
+
+class Command(BaseCommand):
+    """
+    Rebuild every leaderboard from the stored attempts.
+    """
+
+    help = "Rebuild the quiz leaderboards from the stored attempts."
+
+    def handle(self, *args, **options):
+        counts = rebuild_leaderboards()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Rebuilt {counts['quizzes']} quiz leaderboards "
+                f"and the global leaderboard of {counts['members']} members."
+            )
+        )
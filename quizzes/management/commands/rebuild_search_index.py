@@ -0,0 +1,18 @@
+"""
+Management command that rebuilds the quiz search index.
+"""
+
+from django.core.management.base import BaseCommand
+from quizzes.search import rebuild_index
+
+
+class Command(BaseCommand):
+    """
+    Rebuild the quiz search index from the database in bulk.
+    """
+
+    help = "Rebuild the quiz search index from the database."
+
+    def handle(self, *args, **options):
+        count = rebuild_index()
+        self.stdout.write(self.style.SUCCESS(f"Indexed {count} quizzes."))
@@ -0,0 +1,19 @@
+"""
+Management command that recomputes the quiz statistics summaries.
+"""
+
+from django.core.management.base import BaseCommand
+from quizzes.stats import recompute_stats
+
+
+class Command(BaseCommand):
+    """
+    Rebuild every statistics summary table from the stored attempts.
+    """
+
+    help = "Recompute the quiz statistics summaries from the stored attempts."
+
+    def handle(self, *args, **options):
+        counts = recompute_stats()
+        summary = ", ".join(f"{count} {name}" for name, count in counts.items())
+        self.stdout.write(self.style.SUCCESS(f"Recomputed {summary}."))
@@ -0,0 +1,92 @@
+"""
+Management command that runs the background job workers.
+"""
+
+import multiprocessing
+import signal
+import time
+from django.core.management.base import BaseCommand
+from django.db import connections
+from quizzes.jobs import get_job_settings, purge_finished_jobs, run_worker_process
+
+PURGE_INTERVAL = 60 * 60
+
+
+class Command(BaseCommand):
+    """
+    Run a pool of worker processes claiming jobs from the database queue.
+
+    Workers that exit unexpectedly are restarted. SIGINT or SIGTERM stops the
+    workers once their current batch is done.
+    """
+
+    help = "Run the background job workers."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=None,
+            help="Number of worker processes (default: QUIZZES_JOBS['WORKERS']).",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=None,
+            help="Jobs claimed at once (default: QUIZZES_JOBS['BATCH_SIZE']).",
+        )
+        parser.add_argument(
+            "--burst",
+            action="store_true",
+            help="Exit once no job is runnable instead of waiting for more.",
+        )
+
+    def _start(self, stop_event, burst, config):
+        process = multiprocessing.Process(
+            target=run_worker_process, args=(stop_event, burst, config), daemon=True
+        )
+        process.start()
+        return process
+
+    def handle(self, *args, **options):
+        config = get_job_settings()
+        if options["workers"] is not None:
+            config["WORKERS"] = options["workers"]
+        if options["batch_size"] is not None:
+            config["BATCH_SIZE"] = options["batch_size"]
+        burst = options["burst"]
+
+        purged = purge_finished_jobs(config["RETENTION_DAYS"])
+        last_purge = time.monotonic()
+        # Worker processes must not inherit open database connections.
+        connections.close_all()
+
+        stop_event = multiprocessing.Event()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(signum, lambda *_: stop_event.set())
+        workers = [
+            self._start(stop_event, burst, config) for _ in range(config["WORKERS"])
+        ]
+        self.stdout.write(
+            f"Started {len(workers)} workers, purged {purged} finished jobs."
+        )
+
+        while workers:
+            for index, process in enumerate(workers):
+                process.join(timeout=1)
+                if process.is_alive():
+                    continue
+                if process.exitcode != 0 and not stop_event.is_set():
+                    self.stderr.write(
+                        f"Worker {process.pid} exited with code {process.exitcode},"
+                        " restarting it."
+                    )
+                    workers[index] = self._start(stop_event, burst, config)
+                else:
+                    workers[index] = None
+            workers = [process for process in workers if process is not None]
+            if not burst and time.monotonic() - last_purge > PURGE_INTERVAL:
+                purge_finished_jobs(config["RETENTION_DAYS"])
+                connections.close_all()
+                last_purge = time.monotonic()
+        self.stdout.write(self.style.SUCCESS("Workers stopped."))
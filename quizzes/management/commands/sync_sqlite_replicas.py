@@ -0,0 +1,66 @@
+"""
+Management command that copies the SQLite primary database to its replicas.
+"""
+
+import sqlite3
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS
+
+
+class Command(BaseCommand):
+    """
+    Copy the primary SQLite database to every replica of QUIZ_DB_REPLICAS.
+
+    It stands in for replication when developing with SQLite. Copies use the
+    online backup API, so the primary stays writable and replicas readable
+    while they are refreshed. With --interval the copy is repeated, which
+    gives replicas a lag similar to real replication.
+    """
+
+    help = "Copy the primary SQLite database to its read replicas."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=None,
+            help="Repeat the copy every this many seconds until interrupted.",
+        )
+
+    def _sync(self, primary, replicas):
+        start = time.perf_counter()
+        with sqlite3.connect(primary) as source:
+            for alias, name in replicas.items():
+                with sqlite3.connect(name) as target:
+                    source.backup(target)
+                target.close()
+                self.stdout.write(f"Copied the primary to {alias} ({name}).")
+        source.close()
+        return time.perf_counter() - start
+
+    def handle(self, *args, **options):
+        primary = settings.DATABASES[DEFAULT_DB_ALIAS]
+        if primary["ENGINE"] != "django.db.backends.sqlite3":
+            raise CommandError(
+                "Only SQLite replicas are copied; use the replication of the "
+                "database server for the others."
+            )
+        replicas = {
+            alias: settings.DATABASES[alias]["NAME"]
+            for alias in settings.DATABASE_REPLICAS
+        }
+        if not replicas:
+            raise CommandError("No replica is configured, see QUIZ_DB_REPLICAS.")
+
+        interval = options["interval"]
+        try:
+            while True:
+                duration = self._sync(primary["NAME"], replicas)
+                if interval is None:
+                    break
+                time.sleep(max(0.0, interval - duration))
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(self.style.SUCCESS("Replicas are up to date."))
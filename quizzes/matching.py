@@ -0,0 +1,108 @@
+"""
+Text answer matching module for the quizzes application.
+
+This module defines the following functions:
+- normalize_answer: Reduce a text answer to the form it is compared in.
+- within_edit_distance: Check whether two texts are at most a given number of edits apart.
+- match_text_answer: Check a text answer against the accepted answers of a question.
+
+Answers are compared in normalized form: Unicode NFKC, casefolded, with "ё"
+folded to "е", punctuation replaced by spaces and runs of whitespace collapsed.
+The normalized forms of accepted answers are stored on Option, so only the
+submitted answer is normalized at grading time.
+"""
+
+import unicodedata
+
+# One tolerated edit per this many characters of the accepted answer, so that
+# short answers still have to match exactly.
+CHARS_PER_EDIT = 4
+
+
+def normalize_answer(text):
+    """
+    Reduce a text answer to the form it is compared in.
+
+    Args:
+        text (str): The answer as typed.
+
+    Returns:
+        str: The normalized answer, e.g. "Санкт-Петербург!" -> "санкт петербург".
+    """
+    text = unicodedata.normalize("NFKC", text or "").casefold().replace("ё", "е")
+    return " ".join(
+        "".join(
+            " " if unicodedata.category(char).startswith("P") else char
+            for char in text
+        ).split()
+    )
+
+
+def within_edit_distance(first, second, limit):
+    """
+    Check whether two texts are at most a given number of edits apart.
+
+    The Levenshtein distance is computed on a band of 2 * limit + 1 cells
+    around the diagonal, and the computation stops as soon as every cell of a
+    row exceeds the limit, so the cost is O(len * limit) at most.
+
+    Args:
+        first (str): The first text.
+        second (str): The second text.
+        limit (int): The maximum number of insertions, deletions and
+            substitutions.
+
+    Returns:
+        bool: True if the distance is at most limit.
+    """
+    if abs(len(first) - len(second)) > limit:
+        return False
+    if limit == 0 or first == second:
+        return first == second
+    if len(first) > len(second):
+        first, second = second, first
+
+    over = limit + 1
+    previous = [j if j <= limit else over for j in range(len(second) + 1)]
+    for i in range(1, len(first) + 1):
+        current = [over] * (len(second) + 1)
+        if i <= limit:
+            current[0] = i
+        low, high = max(1, i - limit), min(len(second), i + limit)
+        for j in range(low, high + 1):
+            current[j] = min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (first[i - 1] != second[j - 1]),
+                over,
+            )
+        if min(current[low - 1 : high + 1]) > limit:
+            return False
+        previous = current
+    return previous[len(second)] <= limit
+
+
+def match_text_answer(text, accepted, max_edits=0):
+    """
+    Check a text answer against the accepted answers of a question.
+
+    Args:
+        text (str): The answer as typed.
+        accepted (iterable): The normalized accepted answers.
+        max_edits (int): The number of typos tolerated. It is further capped at
+            one per CHARS_PER_EDIT characters of each accepted answer.
+
+    Returns:
+        bool: True if the answer matches one of the accepted answers.
+    """
+    answer = normalize_answer(text)
+    if not answer:
+        return False
+    accepted = list(accepted)
+    if answer in accepted:
+        return True
+    for candidate in accepted:
+        limit = min(max_edits, len(candidate) // CHARS_PER_EDIT)
+        if limit and within_edit_distance(answer, candidate, limit):
+            return True
+    return False
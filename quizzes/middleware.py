@@ -0,0 +1,83 @@
+"""
+Middleware module for the quizzes application.
+
+This module defines the following middleware:
+- InstrumentationMiddleware: Measure duration, queries and template time per view.
+"""
+
+import json
+import logging
+import random
+import time
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from .instrumentation import collect_metrics, get_setting, metrics
+
+logger = logging.getLogger("quizzes.instrumentation")
+
+
+class InstrumentationMiddleware:
+    """
+    Measure duration, queries and template time per view.
+
+    A share of requests given by the SAMPLE_RATE instrumentation setting is
+    measured; the others pass through untouched. Queries are counted by the
+    count_query execute wrapper, so DEBUG does not need to be enabled.
+
+    The middleware supports both WSGI and ASGI, so async views are not pushed
+    back into a thread by the handler.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if random.random() >= get_setting("SAMPLE_RATE", 1.0):
+            return self.get_response(request)
+
+        with collect_metrics() as request_metrics:
+            start = time.perf_counter()
+            response = self.get_response(request)
+            duration = time.perf_counter() - start
+        self.record(request, response, duration, request_metrics)
+        return response
+
+    async def __acall__(self, request):
+        if random.random() >= get_setting("SAMPLE_RATE", 1.0):
+            return await self.get_response(request)
+
+        with collect_metrics() as request_metrics:
+            start = time.perf_counter()
+            response = await self.get_response(request)
+            duration = time.perf_counter() - start
+        self.record(request, response, duration, request_metrics)
+        return response
+
+    def record(self, request, response, duration, request_metrics):
+        """
+        Store the measurements of a request and log them.
+        """
+        match = getattr(request, "resolver_match", None)
+        view_name = match.view_name if match else "<unresolved>"
+        metrics.record(view_name, duration, request_metrics)
+        if get_setting("LOG", False):
+            logger.info(
+                json.dumps(
+                    {
+                        "view": view_name,
+                        "method": request.method,
+                        "status": response.status_code,
+                        "duration_ms": round(duration * 1000, 2),
+                        "queries": request_metrics.query_count,
+                        "duplicate_queries": request_metrics.duplicate_count,
+                        "template_ms": round(request_metrics.template_time * 1000, 2),
+                        "queries_per_alias": dict(request_metrics.aliases),
+                    }
+                )
+            )
@@ -0,0 +1,27 @@
+# Generated by Django 5.0.6 on 2026-10-17 18:42
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quizzes', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='category',
+            options={'verbose_name_plural': 'Categories'},
+        ),
+        migrations.AlterModelOptions(
+            name='quiz',
+            options={'verbose_name_plural': 'Quizzes'},
+        ),
+        migrations.AddField(
+            model_name='quiz',
+            name='category',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='quizzes', to='quizzes.category'),
+        ),
+    ]
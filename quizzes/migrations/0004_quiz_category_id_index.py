@@ -0,0 +1,17 @@
+# Generated by Django 5.0.6 on 2026-10-17 18:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quizzes', '0003_attempt'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='quiz',
+            index=models.Index(fields=['category', 'id'], name='quizzes_qui_categor_b35903_idx'),
+        ),
+    ]
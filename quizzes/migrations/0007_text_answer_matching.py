@@ -0,0 +1,39 @@
+# Generated by Django 5.0.6 on 2026-10-17 18:42
+
+from django.db import migrations, models
+
+from quizzes.matching import normalize_answer
+
+
+def fill_normalized_text(apps, schema_editor):
+    Option = apps.get_model('quizzes', 'Option')
+    options = list(Option.objects.only('id', 'text'))
+    for option in options:
+        option.normalized_text = normalize_answer(option.text)
+    Option.objects.bulk_update(options, ['normalized_text'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quizzes', '0006_lookup_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='answer',
+            name='is_correct',
+            field=models.BooleanField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='option',
+            name='normalized_text',
+            field=models.CharField(blank=True, editable=False, max_length=200),
+        ),
+        migrations.AddField(
+            model_name='question',
+            name='max_edits',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.RunPython(fill_normalized_text, migrations.RunPython.noop),
+    ]
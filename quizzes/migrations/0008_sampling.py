@@ -0,0 +1,34 @@
+# Generated by Django 5.0.6 on 2026-10-17 18:42
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quizzes', '0007_text_answer_matching'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='attempt',
+            name='layout',
+            field=models.JSONField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='quiz',
+            name='sample_size',
+            field=models.PositiveIntegerField(blank=True, null=True, validators=[django.core.validators.MinValueValidator(1)]),
+        ),
+        migrations.AddField(
+            model_name='quiz',
+            name='shuffle_options',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='quiz',
+            name='stratify_sample',
+            field=models.BooleanField(default=False),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.0.6 on 2026-10-17 19:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quizzes', '0011_quiz_thumbnails'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='attempt',
+            index=models.Index(fields=['session_key', 'quiz', 'created'], name='quizzes_att_session_be7240_idx'),
+        ),
+    ]
@@ -0,0 +1,43 @@
+from django.db import OperationalError, migrations
+
+from quizzes.search import REBUILD_BATCH_SIZE, FTS5Index, iter_documents
+
+
+def create_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        try:
+            FTS5Index.create_table(cursor)
+        except OperationalError:
+            # SQLite without FTS5: the search uses the in-process index.
+            return
+    index = FTS5Index(connection.alias)
+    batch = []
+    for document in iter_documents(
+        quiz_model=apps.get_model('quizzes', 'Quiz'),
+        question_model=apps.get_model('quizzes', 'Question'),
+    ):
+        batch.append(document)
+        if len(batch) == REBUILD_BATCH_SIZE:
+            index.update(batch)
+            batch = []
+    index.update(batch)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        with schema_editor.connection.cursor() as cursor:
+            cursor.execute(f'DROP TABLE IF EXISTS {FTS5Index.table}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quizzes', '0012_attempt_session_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -6,10 +6,18 @@ This module defines the following models:
 - Quiz: Represents a quiz belonging to a category.
 - Question: Represents a question within a quiz.
 - Option: Represents an option for a question.
+- QuizSnapshot: Represents the compiled content of one version of a quiz.
+- Attempt: Represents one submission of a quiz by a taker.
 - Answer: Represents an answer to a question.
+- QuizStats: Summary statistics of the attempts at a quiz.
+- ScoreBucket: Number of attempts at a quiz with a given score.
+- OptionStats: Number of times an option was selected.
+- Job: Represents a unit of background work, see quizzes.jobs.
 """
 
+from django.core.validators import MinValueValidator
 from django.db import models
+from .matching import normalize_answer
 
 
 class Category(models.Model):
@@ -20,7 +28,7 @@ class Category(models.Model):
         name (str): The name of the category.
     """
 
-    name = models.CharField(max_length=100)
+    name = models.CharField(max_length=100, db_index=True)
 
     def __str__(self):
         return str(self.name)
@@ -39,6 +47,15 @@ class Quiz(models.Model):
         title (str): The title of the quiz.
         category (Category): The category the quiz belongs to.
         image (ImageField): An optional image for the quiz.
+        thumbnails (dict): The storage names of the rendered derivatives of
+            the image by spec, and under "image" the image they were rendered
+            from (see quizzes.images).
+        sample_size (int): The number of questions drawn at random for every
+            attempt, or None to show every question.
+        stratify_sample (bool): Whether draws keep the proportions of question
+            types of the quiz.
+        shuffle_options (bool): Whether the options of every question are
+            shown in random order.
     """
 
     title = models.CharField(max_length=200)
@@ -50,6 +67,12 @@ class Quiz(models.Model):
         null=True,
     )
     image = models.ImageField(upload_to="quiz_images/", blank=True, null=True)
+    thumbnails = models.JSONField(default=dict, blank=True, editable=False)
+    sample_size = models.PositiveIntegerField(
+        blank=True, null=True, validators=[MinValueValidator(1)]
+    )
+    stratify_sample = models.BooleanField(default=False)
+    shuffle_options = models.BooleanField(default=False)
 
     def __str__(self):
         return str(self.title)
@@ -58,6 +81,7 @@ class Quiz(models.Model):
     # pylint: disable=R0903
     class Meta:
         verbose_name_plural = "Quizzes"
+        indexes = [models.Index(fields=["category", "id"])]
 
 
 class Question(models.Model):
@@ -68,6 +92,7 @@ class Question(models.Model):
         quiz (Quiz): The quiz the question belongs to.
         text (str): The text of the question.
         question_type (str): The type of the question (e.g., text, radio button, checkbox).
+        max_edits (int): The number of typos tolerated in text answers.
     """
 
     QUESTION_TYPES = [
@@ -80,10 +105,16 @@ class Question(models.Model):
     question_type = models.CharField(
         max_length=8, choices=QUESTION_TYPES, default="TEXT"
     )
+    max_edits = models.PositiveSmallIntegerField(default=0)
 
     def __str__(self):
         return str(self.text)
 
+    # pylint: disable=C0115
+    # pylint: disable=R0903
+    class Meta:
+        indexes = [models.Index(fields=["quiz", "id"])]
+
 
 class Option(models.Model):
     """
@@ -93,6 +124,9 @@ class Option(models.Model):
         question (Question): The question the option belongs to.
         text (str): The text of the option.
         is_correct (bool): Indicates whether the option is correct.
+        normalized_text (str): The text as compared with text answers, see
+            quizzes.matching.normalize_answer. It is kept up to date by save();
+            code creating options in bulk must fill it in.
     """
 
     question = models.ForeignKey(
@@ -100,27 +134,256 @@ class Option(models.Model):
     )
     text = models.CharField(max_length=200)
     is_correct = models.BooleanField(default=False)
+    normalized_text = models.CharField(max_length=200, blank=True, editable=False)
 
     def __str__(self):
         return str(self.text)
 
+    def save(self, *args, **kwargs):
+        self.normalized_text = normalize_answer(self.text)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and "text" in update_fields:
+            kwargs["update_fields"] = {*update_fields, "normalized_text"}
+        super().save(*args, **kwargs)
+
+
+class QuizSnapshot(models.Model):
+    """
+    Represents the compiled content of one version of a quiz.
+
+    Snapshots are never modified, see quizzes.snapshots.
+
+    Attributes:
+        quiz (Quiz): The quiz the snapshot was compiled from.
+        digest (str): The SHA-256 digest of the uncompressed content, which
+            identifies the snapshot among those of its quiz.
+        data (bytes): The zlib-compressed JSON content.
+        created (datetime): When the snapshot was compiled.
+    """
+
+    quiz = models.ForeignKey(Quiz, on_delete=models.CASCADE, related_name="snapshots")
+    digest = models.CharField(max_length=64)
+    data = models.BinaryField()
+    created = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.quiz_id} @{self.digest[:12]}"
+
+    # pylint: disable=C0115
+    # pylint: disable=R0903
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["quiz", "digest"], name="unique_quiz_snapshot"
+            )
+        ]
+
+
+class Attempt(models.Model):
+    """
+    Represents one submission of a quiz by a taker.
+
+    Attributes:
+        quiz (Quiz): The quiz that was taken.
+        session_key (str): The session key of the taker, if any.
+        created (datetime): When the attempt was submitted.
+        score (int): The number of correctly answered questions.
+        max_score (int): The number of questions of the quiz when it was taken.
+        layout (list): The questions drawn for the attempt and the order of
+            their options, [[question_id, [option_id, ...]], ...], or None if
+            every question was shown in order.
+        snapshot (QuizSnapshot): The version of the quiz the attempt was
+            graded against, or None for attempts saved before snapshots.
+    """
+
+    quiz = models.ForeignKey(Quiz, on_delete=models.CASCADE, related_name="attempts")
+    session_key = models.CharField(max_length=40, blank=True)
+    created = models.DateTimeField(auto_now_add=True)
+    score = models.PositiveIntegerField(default=0)
+    max_score = models.PositiveIntegerField(default=0)
+    layout = models.JSONField(blank=True, null=True)
+    snapshot = models.ForeignKey(
+        QuizSnapshot,
+        on_delete=models.RESTRICT,
+        related_name="attempts",
+        blank=True,
+        null=True,
+    )
+
+    # pylint: disable=E1101
+    def __str__(self):
+        return f"{self.quiz_id} #{self.id}"
+
+    # pylint: disable=C0115
+    # pylint: disable=R0903
+    class Meta:
+        indexes = [
+            models.Index(fields=["quiz", "created"]),
+            models.Index(fields=["session_key", "quiz", "created"]),
+        ]
+
 
 class Answer(models.Model):
     """
     Represents an answer to a question.
 
     Attributes:
+        attempt (Attempt): The attempt the answer was submitted with.
         question (Question): The question being answered.
         selected_option (Option): The selected option for the question (if applicable).
         text_answer (str): The text answer for the question (if applicable).
+        is_correct (bool): Whether the text answer or the selected option is
+            correct, decided when the answer is submitted. None for answers
+            saved before it was recorded.
     """
 
+    attempt = models.ForeignKey(
+        Attempt,
+        on_delete=models.CASCADE,
+        related_name="answers",
+        null=True,
+        blank=True,
+    )
     question = models.ForeignKey(Question, on_delete=models.CASCADE)
     selected_option = models.ForeignKey(
         Option, on_delete=models.CASCADE, null=True, blank=True
     )
     text_answer = models.CharField(max_length=200, blank=True)
+    is_correct = models.BooleanField(null=True, blank=True)
 
     # pylint: disable=E1101
     def __str__(self):
         return str(self.question.text)
+
+
+class QuizStats(models.Model):
+    """
+    Summary statistics of the attempts at a quiz.
+
+    Attributes:
+        quiz (Quiz): The quiz the statistics describe.
+        attempts (int): The number of attempts.
+        passed (int): The number of attempts that reached the pass mark.
+        score_sum (int): The sum of the scores of all attempts.
+    """
+
+    quiz = models.OneToOneField(
+        Quiz, on_delete=models.CASCADE, primary_key=True, related_name="stats"
+    )
+    attempts = models.PositiveIntegerField(default=0)
+    passed = models.PositiveIntegerField(default=0)
+    score_sum = models.PositiveBigIntegerField(default=0)
+
+    def __str__(self):
+        return str(self.quiz)
+
+    # pylint: disable=C0115
+    # pylint: disable=R0903
+    class Meta:
+        verbose_name_plural = "Quiz stats"
+
+
+class ScoreBucket(models.Model):
+    """
+    Number of attempts at a quiz with a given score.
+
+    Attributes:
+        quiz (Quiz): The quiz the bucket belongs to.
+        score (int): The score of the attempts counted in the bucket.
+        attempts (int): The number of attempts with that score.
+    """
+
+    quiz = models.ForeignKey(
+        Quiz, on_delete=models.CASCADE, related_name="score_buckets"
+    )
+    score = models.PositiveIntegerField()
+    attempts = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.quiz}: {self.score}"
+
+    # pylint: disable=C0115
+    # pylint: disable=R0903
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["quiz", "score"], name="unique_score_bucket"
+            )
+        ]
+
+
+class OptionStats(models.Model):
+    """
+    Number of times an option was selected.
+
+    Attributes:
+        option (Option): The option the statistics describe.
+        selections (int): The number of answers that selected the option.
+    """
+
+    option = models.OneToOneField(
+        Option, on_delete=models.CASCADE, primary_key=True, related_name="stats"
+    )
+    selections = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return str(self.option)
+
+    # pylint: disable=C0115
+    # pylint: disable=R0903
+    class Meta:
+        verbose_name_plural = "Option stats"
+
+
+class Job(models.Model):
+    """
+    Represents a unit of background work, see quizzes.jobs.
+
+    Attributes:
+        name (str): The name the handler of the job is registered under.
+        payload (object): The JSON argument of the handler.
+        key (str): An idempotency key: a job with the same key is enqueued
+            only once. None for jobs that may repeat.
+        status (str): Whether the job is pending, running, done or failed.
+        attempts (int): The number of times the job was claimed by a worker.
+        run_after (datetime): The job is not run before this time.
+        locked_by (str): The claim of the worker running the job.
+        locked_until (datetime): When the claim expires and the job may be
+            claimed again, in case its worker died.
+        last_error (str): The traceback of the last failed run.
+        created (datetime): When the job was enqueued.
+        finished (datetime): When the job was done or failed for good.
+    """
+
+    PENDING = "PENDING"
+    RUNNING = "RUNNING"
+    DONE = "DONE"
+    FAILED = "FAILED"
+    STATUSES = [
+        (PENDING, "Pending"),
+        (RUNNING, "Running"),
+        (DONE, "Done"),
+        (FAILED, "Failed"),
+    ]
+    name = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict, blank=True)
+    key = models.CharField(max_length=200, unique=True, null=True, blank=True)
+    status = models.CharField(max_length=7, choices=STATUSES, default=PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    run_after = models.DateTimeField()
+    locked_by = models.CharField(max_length=32, blank=True)
+    locked_until = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created = models.DateTimeField(auto_now_add=True)
+    finished = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.name} #{self.id}"
+
+    # pylint: disable=C0115
+    # pylint: disable=R0903
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "run_after"]),
+            models.Index(fields=["status", "finished"]),
+        ]
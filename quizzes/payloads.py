@@ -0,0 +1,38 @@
+"""
+Payloads module for the quizzes application.
+
+This module defines the following functions:
+- get_quiz_payload: Return the serialized current version of a quiz.
+- aget_quiz_payload: Asynchronous version of get_quiz_payload.
+
+The payload holds everything take_quiz renders. It is part of the snapshot of
+the quiz version (see quizzes.snapshots), so a known quiz is served without
+touching the database. Payloads are shared between requests: do not modify
+them.
+"""
+
+from .snapshots import aget_current_snapshot, get_current_snapshot
+
+
+def get_quiz_payload(quiz_id):
+    """
+    Return the serialized current version of a quiz.
+
+    Args:
+        quiz_id (int): The ID of the quiz.
+
+    Returns:
+        dict: The quiz fields, its sampling settings and a list of questions
+        with their options.
+
+    Raises:
+        Http404: If the quiz does not exist.
+    """
+    return get_current_snapshot(quiz_id).payload
+
+
+async def aget_quiz_payload(quiz_id):
+    """
+    Asynchronous version of get_quiz_payload.
+    """
+    return (await aget_current_snapshot(quiz_id)).payload
@@ -0,0 +1,261 @@
+"""
+Sampling module for the quizzes application.
+
+This module defines the following functions:
+- build_question_bank: Extract the question bank of a quiz from its payload.
+- get_question_bank: Return the question bank of a quiz, using the cache when possible.
+- aget_question_bank: Asynchronous version of get_question_bank.
+- peek_question_bank: Return the cached question bank of a quiz, if any.
+- is_randomized: Tell whether every attempt at a quiz gets its own draw.
+- draw_layout: Draw the questions and option orders of an attempt.
+- apply_layout: Select and order questions as drawn for an attempt.
+- sign_layout: Encode a layout for the taker to send back with the answers.
+- load_layout: Decode and verify a layout sent back with the answers.
+
+A quiz with a sample size shows every attempt that many questions drawn at
+random from its questions, optionally in the same proportions of question types
+as the whole quiz, and may shuffle the options of every question.
+
+Draws are made in memory from the question bank: the IDs and types of the
+questions and the IDs of their options, cached per content version. A draw is
+a layout, [[question_id, [option_id, ...]], ...], which the take quiz page
+sends back signed with the answers and which is stored on the attempt, so
+results are graded and displayed without drawing again.
+"""
+
+import random
+from django.core import signing
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from .payloads import aget_quiz_payload, get_quiz_payload
+from .versions import aget_quiz_version, get_quiz_version
+
+QUESTION_BANK_CACHE_KEY = "quizzes:bank:{quiz_id}:{version}"
+QUESTION_BANK_TIMEOUT = 60 * 60 * 24
+LAYOUT_SALT = "quizzes.sampling.layout"
+# Seconds a draw stays valid, so that a taker cannot keep the easiest draw.
+LAYOUT_MAX_AGE = 60 * 60 * 3
+
+
+def build_question_bank(payload):
+    """
+    Extract the question bank of a quiz from its payload.
+
+    Args:
+        payload (dict): The quiz payload, see quizzes.payloads.
+
+    Returns:
+        dict: The sampling settings, the (ID, type) pairs of the questions and
+        the option IDs of every question.
+    """
+    return {
+        "sample_size": payload["sample_size"],
+        "stratify_sample": payload["stratify_sample"],
+        "shuffle_options": payload["shuffle_options"],
+        "questions": [
+            (question["id"], question["question_type"])
+            for question in payload["questions"]
+        ],
+        "options": {
+            question["id"]: [option["id"] for option in question["options"]]
+            for question in payload["questions"]
+        },
+    }
+
+
+def get_question_bank(quiz_id, payload=None):
+    """
+    Return the question bank of a quiz, using the cache when possible.
+
+    Args:
+        quiz_id (int): The ID of the quiz.
+        payload (dict): The quiz payload, if the caller already has it.
+
+    Returns:
+        dict: The question bank as returned by build_question_bank.
+    """
+    key = QUESTION_BANK_CACHE_KEY.format(
+        quiz_id=quiz_id, version=get_quiz_version(quiz_id)
+    )
+    bank = cache.get(key)
+    if bank is None:
+        bank = build_question_bank(payload or get_quiz_payload(quiz_id))
+        cache.set(key, bank, QUESTION_BANK_TIMEOUT)
+    return bank
+
+
+async def aget_question_bank(quiz_id, payload=None):
+    """
+    Asynchronous version of get_question_bank.
+    """
+    key = QUESTION_BANK_CACHE_KEY.format(
+        quiz_id=quiz_id, version=await aget_quiz_version(quiz_id)
+    )
+    bank = await cache.aget(key)
+    if bank is None:
+        bank = build_question_bank(payload or await aget_quiz_payload(quiz_id))
+        await cache.aset(key, bank, QUESTION_BANK_TIMEOUT)
+    return bank
+
+
+def peek_question_bank(quiz_id):
+    """
+    Return the cached question bank of a quiz, if any.
+
+    Unlike get_question_bank, this never queries the database, so it is safe
+    to call from HTTP validators of asynchronous views.
+
+    Args:
+        quiz_id (int): The ID of the quiz.
+
+    Returns:
+        dict: The question bank, or None if it is not cached.
+    """
+    return cache.get(
+        QUESTION_BANK_CACHE_KEY.format(
+            quiz_id=quiz_id, version=get_quiz_version(quiz_id)
+        )
+    )
+
+
+def is_randomized(bank):
+    """
+    Tell whether every attempt at a quiz gets its own draw.
+
+    Args:
+        bank (dict): The question bank of the quiz.
+
+    Returns:
+        bool: True if the quiz samples its questions or shuffles its options.
+    """
+    return bank["sample_size"] is not None or bank["shuffle_options"]
+
+
+def _quotas(sizes, count, rng):
+    """
+    Split a sample size across strata in proportion to their sizes.
+
+    Every stratum gets the integer part of its share, and the remaining
+    questions go to the largest fractional parts, ties broken at random.
+    """
+    total = sum(sizes.values())
+    shares = {stratum: count * size / total for stratum, size in sizes.items()}
+    quotas = {stratum: int(share) for stratum, share in shares.items()}
+    remaining = count - sum(quotas.values())
+    ranked = sorted(
+        sizes, key=lambda stratum: (shares[stratum] - quotas[stratum], rng.random())
+    )
+    for stratum in ranked[len(ranked) - remaining :]:
+        quotas[stratum] += 1
+    return quotas
+
+
+def draw_layout(bank, rng=random):
+    """
+    Draw the questions and option orders of an attempt.
+
+    Args:
+        bank (dict): The question bank of the quiz.
+        rng (Random): The source of randomness.
+
+    Returns:
+        list: The layout, [[question_id, [option_id, ...]], ...], in the order
+        the questions are shown.
+    """
+    questions = bank["questions"]
+    if bank["sample_size"] is None:
+        drawn = [question_id for question_id, _ in questions]
+    else:
+        count = min(bank["sample_size"], len(questions))
+        if bank["stratify_sample"] and count:
+            strata = {}
+            for question_id, question_type in questions:
+                strata.setdefault(question_type, []).append(question_id)
+            quotas = _quotas(
+                {stratum: len(ids) for stratum, ids in strata.items()}, count, rng
+            )
+            drawn = []
+            for stratum, ids in strata.items():
+                drawn.extend(rng.sample(ids, quotas[stratum]))
+            rng.shuffle(drawn)
+        else:
+            drawn = rng.sample([question_id for question_id, _ in questions], count)
+
+    layout = []
+    for question_id in drawn:
+        option_ids = list(bank["options"][question_id])
+        if bank["shuffle_options"]:
+            rng.shuffle(option_ids)
+        layout.append([question_id, option_ids])
+    return layout
+
+
+def apply_layout(questions, layout):
+    """
+    Select and order questions as drawn for an attempt.
+
+    Questions deleted since the draw are skipped, and options added since the
+    draw are shown after the drawn ones. The given questions are not modified.
+
+    Args:
+        questions (list): Question dicts with "id" and "options", such as the
+            questions of a payload or an answer key.
+        layout (list): The layout as returned by draw_layout.
+
+    Returns:
+        list: Copies of the drawn questions with their options in drawn order.
+    """
+    by_id = {question["id"]: question for question in questions}
+    drawn = []
+    for question_id, option_ids in layout:
+        question = by_id.get(question_id)
+        if question is None:
+            continue
+        position = {option_id: index for index, option_id in enumerate(option_ids)}
+        options = sorted(
+            question["options"],
+            key=lambda option: position.get(option["id"], len(position)),
+        )
+        drawn.append({**question, "options": options})
+    return drawn
+
+
+def sign_layout(quiz_id, layout):
+    """
+    Encode a layout for the taker to send back with the answers.
+
+    Args:
+        quiz_id (int): The ID of the quiz.
+        layout (list): The layout as returned by draw_layout.
+
+    Returns:
+        str: A signed, compressed token.
+    """
+    return signing.dumps([quiz_id, layout], salt=LAYOUT_SALT, compress=True)
+
+
+def load_layout(quiz_id, token):
+    """
+    Decode and verify a layout sent back with the answers.
+
+    Args:
+        quiz_id (int): The ID of the quiz being taken.
+        token (str): The token as returned by sign_layout.
+
+    Returns:
+        list: The layout.
+
+    Raises:
+        ValidationError: If the token is forged, expired or for another quiz.
+    """
+    try:
+        token_quiz_id, layout = signing.loads(
+            token, salt=LAYOUT_SALT, max_age=LAYOUT_MAX_AGE
+        )
+    except (signing.BadSignature, TypeError, ValueError) as error:
+        raise ValidationError(
+            "Invalid or expired draw.", code="invalid_draw"
+        ) from error
+    if token_quiz_id != quiz_id:
+        raise ValidationError("The draw is for another quiz.", code="invalid_draw")
+    return layout
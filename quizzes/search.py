@@ -0,0 +1,402 @@
+# pylint: disable=E1101
+"""
+Search module for the quizzes application.
+
+This module defines the following:
+- FTS5Index: Search index stored in an SQLite FTS5 virtual table.
+- InvertedIndex: In-process inverted index used when FTS5 is unavailable.
+- get_index: Return the search index configured for the project.
+- schedule_reindex: Reindex a quiz once the current transaction commits.
+- rebuild_index: Rebuild the search index from the database in bulk.
+- search_quizzes: Return the quizzes matching a query, best matches first.
+
+Every quiz is indexed as one document made of its title, the name of its
+category and the text of its questions. Texts are casefolded and "ё" is folded
+to "е" on both sides, and every query term matches as a prefix.
+
+The backend is chosen with the QUIZZES_SEARCH_BACKEND setting: "fts5",
+"memory" or "auto" (the default), which uses FTS5 when the database has the
+FTS5 table. The table is created and filled by the quizzes migrations, so no
+request ever changes the schema.
+"""
+
+import bisect
+import math
+import re
+import threading
+from django.conf import settings
+from django.db import connections, transaction
+from .models import Quiz, Question
+
+TOKEN_RE = re.compile(r"\w+")
+REBUILD_BATCH_SIZE = 1000
+# Relative weights of the title, category and questions columns.
+COLUMN_WEIGHTS = (5.0, 2.0, 1.0)
+
+
+def normalize(text):
+    """
+    Casefold a text and fold "ё" to "е" so that both spellings match.
+    """
+    return (text or "").casefold().replace("ё", "е")
+
+
+def tokenize(text):
+    """
+    Split a text into normalized search terms.
+    """
+    return TOKEN_RE.findall(normalize(text))
+
+
+def iter_documents(quiz_ids=None, quiz_model=Quiz, question_model=Question):
+    """
+    Yield the search documents of quizzes, streaming question texts.
+
+    Args:
+        quiz_ids (iterable): The IDs of the quizzes to yield, or None for all.
+        quiz_model (type): The Quiz model; migrations pass its historical version.
+        question_model (type): The Question model, likewise.
+
+    Yields:
+        tuple: (quiz_id, title, category name, question texts).
+    """
+    quizzes = quiz_model.objects.order_by("id").values_list(
+        "id", "title", "category__name"
+    )
+    questions = question_model.objects.order_by("quiz_id", "id").values_list(
+        "quiz_id", "text"
+    )
+    if quiz_ids is not None:
+        quiz_ids = list(quiz_ids)
+        quizzes = quizzes.filter(id__in=quiz_ids)
+        questions = questions.filter(quiz_id__in=quiz_ids)
+
+    question_rows = questions.iterator(chunk_size=REBUILD_BATCH_SIZE)
+    pending = next(question_rows, None)
+    for quiz_id, title, category in quizzes.iterator(chunk_size=REBUILD_BATCH_SIZE):
+        texts = []
+        while pending is not None and pending[0] <= quiz_id:
+            if pending[0] == quiz_id:
+                texts.append(pending[1])
+            pending = next(question_rows, None)
+        yield quiz_id, title, category or "", "\n".join(texts)
+
+
+class FTS5Index:
+    """
+    Search index stored in an SQLite FTS5 virtual table.
+
+    The table is keyed by quiz ID (its rowid). It is created by a migration
+    (see create_table), on SQLite builds that include FTS5.
+    """
+
+    table = "quizzes_search"
+
+    def __init__(self, using="default"):
+        self.using = using
+
+    @classmethod
+    def create_table(cls, cursor):
+        """
+        Create the virtual table if it does not exist yet.
+
+        Args:
+            cursor (CursorWrapper): A cursor of the SQLite database.
+
+        Raises:
+            OperationalError: If SQLite was built without FTS5.
+        """
+        cursor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {cls.table} "
+            "USING fts5(title, category, questions, tokenize='unicode61')"
+        )
+
+    @classmethod
+    def is_supported(cls, using="default"):
+        """
+        Return whether the database has the FTS5 table.
+        """
+        connection = connections[using]
+        if connection.vendor != "sqlite":
+            return False
+        with connection.cursor() as cursor:
+            return cls.table in connection.introspection.table_names(cursor)
+
+    def update(self, documents):
+        """
+        Insert or replace documents in the index.
+        """
+        rows = [
+            (quiz_id, normalize(title), normalize(category), normalize(questions))
+            for quiz_id, title, category, questions in documents
+        ]
+        if not rows:
+            return
+        with connections[self.using].cursor() as cursor:
+            cursor.executemany(
+                f"DELETE FROM {self.table} WHERE rowid = %s",
+                [(row[0],) for row in rows],
+            )
+            cursor.executemany(
+                f"INSERT INTO {self.table} (rowid, title, category, questions) "
+                "VALUES (%s, %s, %s, %s)",
+                rows,
+            )
+
+    def remove(self, quiz_ids):
+        """
+        Remove documents from the index.
+        """
+        with connections[self.using].cursor() as cursor:
+            cursor.executemany(
+                f"DELETE FROM {self.table} WHERE rowid = %s",
+                [(quiz_id,) for quiz_id in quiz_ids],
+            )
+
+    def clear(self):
+        """
+        Remove every document from the index.
+        """
+        with connections[self.using].cursor() as cursor:
+            cursor.execute(f"DELETE FROM {self.table}")
+
+    def search(self, query, limit):
+        """
+        Return the IDs of the best matching quizzes.
+        """
+        terms = tokenize(query)
+        if not terms:
+            return []
+        match = " ".join(f'"{term}"*' for term in terms)
+        with connections[self.using].cursor() as cursor:
+            cursor.execute(
+                f"SELECT rowid FROM {self.table} WHERE {self.table} MATCH %s "
+                f"ORDER BY bm25({self.table}, %s, %s, %s) LIMIT %s",
+                [match, *COLUMN_WEIGHTS, limit],
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+
+class InvertedIndex:
+    """
+    In-process inverted index used when FTS5 is unavailable.
+
+    Postings map every term to the weighted term frequency of each quiz, and a
+    sorted list of terms serves prefix lookups by bisection. The index is built
+    from the database on first search and then kept up to date by signals.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._postings = {}
+        self._terms = []
+        self._documents = {}
+        self._built = False
+
+    def _remove(self, quiz_id):
+        """
+        Remove a document without taking the lock.
+        """
+        for term in self._documents.pop(quiz_id, ()):
+            postings = self._postings[term]
+            del postings[quiz_id]
+            if not postings:
+                del self._postings[term]
+                del self._terms[bisect.bisect_left(self._terms, term)]
+
+    def _add(self, quiz_id, title, category, questions):
+        """
+        Add a document without taking the lock.
+        """
+        weights = {}
+        for text, weight in zip((title, category, questions), COLUMN_WEIGHTS):
+            for term in tokenize(text):
+                weights[term] = weights.get(term, 0.0) + weight
+        for term, weight in weights.items():
+            postings = self._postings.get(term)
+            if postings is None:
+                postings = self._postings[term] = {}
+                bisect.insort(self._terms, term)
+            postings[quiz_id] = weight
+        self._documents[quiz_id] = tuple(weights)
+
+    def update(self, documents):
+        """
+        Insert or replace documents in the index.
+        """
+        with self._lock:
+            if not self._built:
+                return
+            for document in documents:
+                self._remove(document[0])
+                self._add(*document)
+
+    def remove(self, quiz_ids):
+        """
+        Remove documents from the index.
+        """
+        with self._lock:
+            for quiz_id in quiz_ids:
+                self._remove(quiz_id)
+
+    def clear(self):
+        """
+        Remove every document from the index.
+        """
+        with self._lock:
+            self._postings, self._terms, self._documents = {}, [], {}
+            self._built = True
+
+    def build(self, documents):
+        """
+        Replace the whole index with the given documents.
+        """
+        with self._lock:
+            self._postings, self._terms, self._documents = {}, [], {}
+            for document in documents:
+                self._add(*document)
+            self._built = True
+
+    def _match(self, term):
+        """
+        Return the scores of the quizzes with a term starting with the given one.
+        """
+        total = len(self._documents) or 1
+        scores = {}
+        start = bisect.bisect_left(self._terms, term)
+        for candidate in self._terms[start:]:
+            if not candidate.startswith(term):
+                break
+            postings = self._postings[candidate]
+            idf = math.log(1 + total / len(postings))
+            for quiz_id, weight in postings.items():
+                scores[quiz_id] = scores.get(quiz_id, 0.0) + weight * idf
+        return scores
+
+    def search(self, query, limit):
+        """
+        Return the IDs of the best matching quizzes.
+        """
+        terms = tokenize(query)
+        if not terms:
+            return []
+        if not self._built:
+            self.build(iter_documents())
+        with self._lock:
+            scores = None
+            for term in terms:
+                matches = self._match(term)
+                if scores is None:
+                    scores = matches
+                else:
+                    scores = {
+                        quiz_id: score + matches[quiz_id]
+                        for quiz_id, score in scores.items()
+                        if quiz_id in matches
+                    }
+                if not scores:
+                    return []
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+        return [quiz_id for quiz_id, _ in ranked[:limit]]
+
+
+_index = None
+_pending = threading.local()
+
+
+def get_index():
+    """
+    Return the search index configured for the project.
+    """
+    global _index  # pylint: disable=W0603
+    if _index is None:
+        backend = getattr(settings, "QUIZZES_SEARCH_BACKEND", "auto")
+        if backend == "fts5" or (backend == "auto" and FTS5Index.is_supported()):
+            _index = FTS5Index()
+        else:
+            _index = InvertedIndex()
+    return _index
+
+
+def reindex_quizzes(quiz_ids):
+    """
+    Reindex the given quizzes, dropping the ones that no longer exist.
+
+    Args:
+        quiz_ids (iterable): The IDs of the quizzes to reindex.
+    """
+    quiz_ids = set(quiz_ids)
+    documents = list(iter_documents(quiz_ids))
+    index = get_index()
+    index.remove(quiz_ids - {document[0] for document in documents})
+    index.update(documents)
+
+
+def schedule_reindex(quiz_id):
+    """
+    Reindex a quiz once the current transaction commits.
+
+    Changes to several quizzes, or several changes to the same quiz, inside one
+    transaction (such as the cascade of questions of a deleted quiz) are
+    reindexed together by a single callback.
+
+    Args:
+        quiz_id (int): The ID of the quiz.
+    """
+    connection = transaction.get_connection()
+    batch = getattr(_pending, "batch", None)
+    if (
+        batch is not None
+        and connection.in_atomic_block
+        and any(entry[1] is batch[1] for entry in connection.run_on_commit)
+    ):
+        batch[0].add(quiz_id)
+        return
+
+    quiz_ids = {quiz_id}
+    _pending.batch = (quiz_ids, lambda: reindex_quizzes(quiz_ids))
+    transaction.on_commit(_pending.batch[1])
+
+
+def rebuild_index():
+    """
+    Rebuild the search index from the database in bulk.
+
+    Returns:
+        int: The number of indexed quizzes.
+    """
+    index = get_index()
+    count = 0
+    if isinstance(index, InvertedIndex):
+        documents = list(iter_documents())
+        index.build(documents)
+        return len(documents)
+
+    with transaction.atomic():
+        index.clear()
+        batch = []
+        for document in iter_documents():
+            batch.append(document)
+            if len(batch) == REBUILD_BATCH_SIZE:
+                index.update(batch)
+                count += len(batch)
+                batch = []
+        index.update(batch)
+        count += len(batch)
+    return count
+
+
+def search_quizzes(query, limit=50):
+    """
+    Return the quizzes matching a query, best matches first.
+
+    Args:
+        query (str): The search query.
+        limit (int): The maximum number of quizzes to return.
+
+    Returns:
+        list: The matching Quiz instances with their category.
+    """
+    quiz_ids = get_index().search(query, limit)
+    quizzes = Quiz.objects.select_related("category").in_bulk(quiz_ids)
+    return [quizzes[quiz_id] for quiz_id in quiz_ids if quiz_id in quizzes]
@@ -0,0 +1,209 @@
+# pylint: disable=E1101
+# pylint: disable=W0613
+"""
+Signals module for the quizzes application.
+
+This module keeps derived data in sync with quiz content:
+- bump_quiz_content_version: Bump the version when a quiz changes.
+- bump_question_content_version: Bump the version when a question changes.
+- bump_option_content_version: Bump the version when an option changes.
+- bump_category_catalogue_version: Bump the catalogue version when a category changes.
+- reindex_category_quizzes: Reindex the quizzes of a renamed category.
+- remember_quiz_image: Remember the image a quiz was loaded with.
+- generate_quiz_image_derivatives: Queue the rendering of the thumbnails of a quiz image.
+- install_query_counter: Count the queries of new connections for instrumentation.
+- suppress_content_signals: Skip version bumps and reindexing within a block.
+
+Bumping the content version of a quiz makes the next request compile a new
+snapshot of it (see quizzes.snapshots). Quiz and question changes also
+schedule the quiz for reindexing in the search index. Quiz and category
+changes bump the catalogue version, which validates the quiz list.
+
+Versions are bumped when the transaction of the change commits: bumped any
+earlier, a concurrent request could cache the old, still committed content
+under the new version. The changes of one transaction are bumped together.
+
+Bulk editors that write many rows at once suppress these receivers and bump
+the affected versions themselves, once, when their transaction commits.
+"""
+
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+from .instrumentation import count_query
+from .images import queue_derivatives
+from .models import Category, Quiz, Question, Option
+from .search import schedule_reindex
+from .versions import bump_catalogue_version, bump_quiz_version
+
+_suppressed = ContextVar("quizzes_content_signals_suppressed", default=False)
+_pending = threading.local()
+
+
+class _PendingBumps:
+    """
+    Versions to bump when the current transaction commits.
+    """
+
+    def __init__(self):
+        self.quiz_ids = set()
+        self.catalogue = False
+
+    def __call__(self):
+        for quiz_id in self.quiz_ids:
+            bump_quiz_version(quiz_id)
+        if self.catalogue:
+            bump_catalogue_version()
+
+
+def _bump_on_commit(quiz_id=None, catalogue=False):
+    """
+    Bump the version of a quiz or of the catalogue once the transaction commits.
+    """
+    pending = _PendingBumps()
+    connection = transaction.get_connection()
+    if connection.in_atomic_block:
+        current = getattr(_pending, "bumps", None)
+        if current is not None and any(
+            entry[1] is current for entry in connection.run_on_commit
+        ):
+            pending = current
+        else:
+            _pending.bumps = pending
+            transaction.on_commit(pending)
+    if quiz_id is not None:
+        pending.quiz_ids.add(quiz_id)
+    pending.catalogue = pending.catalogue or catalogue
+    if not connection.in_atomic_block:
+        pending()
+
+
+@contextmanager
+def suppress_content_signals():
+    """
+    Skip the version bumps and reindexing of content signals within a block.
+
+    The caller is responsible for bumping versions and scheduling reindexing
+    for everything it changed.
+    """
+    token = _suppressed.set(True)
+    try:
+        yield
+    finally:
+        _suppressed.reset(token)
+
+
+@receiver(post_save, sender=Quiz)
+@receiver(post_delete, sender=Quiz)
+def bump_quiz_content_version(sender, instance, **kwargs):
+    """
+    Bump the content version of a saved or deleted quiz and of the catalogue.
+    """
+    if _suppressed.get():
+        return
+    _bump_on_commit(instance.id, catalogue=True)
+    schedule_reindex(instance.id)
+
+
+@receiver(post_save, sender=Question)
+@receiver(post_delete, sender=Question)
+def bump_question_content_version(sender, instance, **kwargs):
+    """
+    Bump the content version of the quiz a saved or deleted question belongs to.
+    """
+    if _suppressed.get():
+        return
+    _bump_on_commit(instance.quiz_id)
+    schedule_reindex(instance.quiz_id)
+
+
+@receiver(post_save, sender=Option)
+@receiver(post_delete, sender=Option)
+def bump_option_content_version(sender, instance, **kwargs):
+    """
+    Bump the content version of the quiz a saved or deleted option belongs to.
+    """
+    if _suppressed.get():
+        return
+    if Option.question.is_cached(instance):
+        quiz_id = instance.question.quiz_id
+    else:
+        quiz_id = (
+            Question.objects.filter(id=instance.question_id)
+            .values_list("quiz_id", flat=True)
+            .first()
+        )
+    if quiz_id is not None:
+        _bump_on_commit(quiz_id)
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def bump_category_catalogue_version(sender, instance, **kwargs):
+    """
+    Bump the catalogue version when a category is saved or deleted.
+    """
+    if _suppressed.get():
+        return
+    _bump_on_commit(catalogue=True)
+
+
+@receiver(post_save, sender=Category)
+def reindex_category_quizzes(sender, instance, created, **kwargs):
+    """
+    Reindex the quizzes of a saved category, whose name they are indexed by.
+    """
+    if not created and not _suppressed.get():
+        for quiz_id in instance.quizzes.values_list("id", flat=True):
+            schedule_reindex(quiz_id)
+
+
+def _image_name(instance):
+    """
+    Return the image name held by a quiz, or None if the field is deferred.
+    """
+    if "image" not in instance.__dict__:
+        return None
+    value = instance.__dict__["image"]
+    return getattr(value, "name", value) or ""
+
+
+@receiver(post_init, sender=Quiz)
+def remember_quiz_image(sender, instance, **kwargs):
+    """
+    Remember the image name a quiz was loaded with, to detect a new image.
+    """
+    instance._loaded_image_name = _image_name(instance)
+
+
+@receiver(post_save, sender=Quiz)
+def generate_quiz_image_derivatives(
+    sender, instance, created, update_fields=None, **kwargs
+):
+    """
+    Queue the rendering of the thumbnails of a quiz image that changed.
+    """
+    if update_fields is not None and "image" not in update_fields:
+        return
+    name = _image_name(instance)
+    loaded = None if created else getattr(instance, "_loaded_image_name", None)
+    if name and name != loaded:
+        queue_derivatives(name)
+    instance._loaded_image_name = name
+
+
+@receiver(connection_created)
+def install_query_counter(sender, connection, **kwargs):
+    """
+    Count the queries of a new connection into the current request metrics.
+
+    A connection object is reused when it reconnects, so the wrapper is only
+    added once. It goes first so that execute_wrapper blocks already open on
+    the connection still pop their own wrapper when they exit.
+    """
+    if count_query not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, count_query)
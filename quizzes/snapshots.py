@@ -0,0 +1,383 @@
+# pylint: disable=E1101
+"""
+Snapshots module for the quizzes application.
+
+This module defines the following classes and functions:
+- Snapshot: The decoded content of one version of a quiz.
+- SnapshotCache: In-process LRU cache of decoded snapshots, bounded in bytes.
+- compile_snapshot: Serialize the current content of a quiz.
+- acompile_snapshot: Asynchronous version of compile_snapshot.
+- get_snapshot: Return a snapshot by ID.
+- aget_snapshot: Asynchronous version of get_snapshot.
+- get_current_snapshot: Return the snapshot of the current version of a quiz.
+- aget_current_snapshot: Asynchronous version of get_current_snapshot.
+
+A snapshot holds everything needed to render a quiz and to grade and display
+attempts at it: the quiz fields, its questions in order, their options in
+order with their correctness, and the normalized text of every option (see
+quizzes.matching). It is compiled from the database the first time a content
+version of the quiz is used (see quizzes.versions) and stored as compressed
+JSON in a QuizSnapshot row, identified by the digest of its content, so that
+versions with the same content share one snapshot.
+
+Snapshots are never modified. Every attempt references the snapshot it was
+graded against, and its results are shown from that snapshot whatever edits
+the quiz went through since. Decoded snapshots are kept in process memory, so
+serving a known version takes no query. A snapshot not yet copied to the read
+replica is read from the primary.
+"""
+
+import hashlib
+import json
+import threading
+import zlib
+from collections import OrderedDict
+from django.conf import settings
+from django.core.cache import cache
+from django.db import router
+from django.http import Http404
+from .images import get_derivative_url_by_name
+from .matching import normalize_answer
+from .models import Option, Quiz, QuizSnapshot
+from .versions import aget_quiz_version, get_quiz_version
+
+CURRENT_SNAPSHOT_CACHE_KEY = "quizzes:snapshot:{quiz_id}:{version}"
+CURRENT_SNAPSHOT_TIMEOUT = 60 * 60 * 24
+DEFAULT_CACHE_BYTES = 64 * 1024 * 1024
+QUIZ_FIELDS = (
+    "id",
+    "title",
+    "image",
+    "thumbnails",
+    "sample_size",
+    "stratify_sample",
+    "shuffle_options",
+)
+SNAPSHOT_FORMAT = 1
+
+
+class Snapshot:
+    """
+    The decoded content of one version of a quiz.
+
+    Attributes:
+        id (int): The ID of the QuizSnapshot row.
+        quiz_id (int): The ID of the quiz.
+        size (int): The size of the uncompressed content in bytes.
+        payload (dict): The quiz fields and questions with their options,
+            without answers, as rendered by take_quiz and the JSON API.
+        answer_key (list): One dict per question with its options, the IDs
+            and texts of the correct options, and the normalized accepted text
+            answers, as used for grading.
+        question_ids (frozenset): The IDs of the questions of the quiz.
+    """
+
+    def __init__(self, snapshot_id, raw):
+        content = json.loads(raw)
+        quiz = content["quiz"]
+        self.id = snapshot_id
+        self.quiz_id = quiz["id"]
+        self.size = len(raw)
+        self.payload = {**quiz, "questions": []}
+        self.answer_key = []
+        for question_id, text, question_type, max_edits, options in content[
+            "questions"
+        ]:
+            self.payload["questions"].append(
+                {
+                    "id": question_id,
+                    "text": text,
+                    "question_type": question_type,
+                    "options": [
+                        {"id": option_id, "text": option_text}
+                        for option_id, option_text, _, _ in options
+                    ],
+                }
+            )
+            correct = [option for option in options if option[2]]
+            self.answer_key.append(
+                {
+                    "id": question_id,
+                    "text": text,
+                    "question_type": question_type,
+                    "max_edits": max_edits,
+                    "options": [
+                        {"id": option_id, "text": option_text, "is_correct": is_correct}
+                        for option_id, option_text, is_correct, _ in options
+                    ],
+                    "correct_ids": {option[0] for option in correct},
+                    "correct_texts": [option[1] for option in correct],
+                    "accepted": list(
+                        dict.fromkeys(option[3] for option in correct if option[3])
+                    ),
+                }
+            )
+        self.question_ids = frozenset(question["id"] for question in self.answer_key)
+
+
+class SnapshotCache:
+    """
+    In-process LRU cache of decoded snapshots, bounded in bytes.
+
+    The bound applies to the uncompressed size of the snapshots, which is
+    proportional to the memory their decoded form takes. Snapshots never
+    change, so entries are only ever evicted, never invalidated.
+
+    Attributes:
+        max_bytes (int): The total size beyond which the least recently used
+            snapshots are evicted.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, snapshot_id):
+        """
+        Return a cached snapshot and mark it as recently used, or None.
+        """
+        with self._lock:
+            snapshot = self._entries.get(snapshot_id)
+            if snapshot is not None:
+                self._entries.move_to_end(snapshot_id)
+            return snapshot
+
+    def put(self, snapshot):
+        """
+        Cache a snapshot, evicting the least recently used ones to make room.
+        """
+        if snapshot.size > self.max_bytes:
+            return
+        with self._lock:
+            if snapshot.id in self._entries:
+                return
+            self._entries[snapshot.id] = snapshot
+            self._size += snapshot.size
+            while self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= evicted.size
+
+    def clear(self):
+        """
+        Drop every cached snapshot.
+        """
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+
+snapshot_cache = SnapshotCache(
+    getattr(settings, "QUIZZES_SNAPSHOT_CACHE_BYTES", DEFAULT_CACHE_BYTES)
+)
+
+
+# Snapshots are compiled from the primary database: a lagging read replica
+# would store stale content under the new version for good.
+
+
+def _quiz_rows(quiz_id):
+    # One row per question, the quiz fields repeated; a quiz without questions
+    # has a single row whose question columns are None.
+    return (
+        Quiz.objects.using(router.db_for_write(Quiz))
+        .filter(id=quiz_id)
+        .order_by("questions__id")
+        .values_list(
+            *QUIZ_FIELDS,
+            "questions__id",
+            "questions__text",
+            "questions__question_type",
+            "questions__max_edits",
+        )
+    )
+
+
+def _option_rows(quiz_id):
+    return (
+        Option.objects.using(router.db_for_write(Option))
+        .filter(question__quiz_id=quiz_id)
+        .order_by("id")
+        .values_list("question_id", "id", "text", "is_correct", "normalized_text")
+    )
+
+
+def _serialize(quiz_rows, option_rows):
+    """
+    Encode the rows of a quiz as the compact JSON content of a snapshot.
+    """
+    quiz = dict(zip(QUIZ_FIELDS, quiz_rows[0]))
+    question_rows = [
+        row[len(QUIZ_FIELDS) :] for row in quiz_rows if row[len(QUIZ_FIELDS)]
+    ]
+    options = {}
+    for question_id, option_id, text, is_correct, normalized_text in option_rows:
+        options.setdefault(question_id, []).append(
+            [option_id, text, is_correct, normalized_text or normalize_answer(text)]
+        )
+    content = {
+        "format": SNAPSHOT_FORMAT,
+        "quiz": {
+            "id": quiz["id"],
+            "title": quiz["title"],
+            "image_url": get_derivative_url_by_name(
+                quiz["image"], "header", quiz["thumbnails"]
+            ),
+            "sample_size": quiz["sample_size"],
+            "stratify_sample": quiz["stratify_sample"],
+            "shuffle_options": quiz["shuffle_options"],
+        },
+        "questions": [
+            [*question, options.get(question[0], [])] for question in question_rows
+        ],
+    }
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def compile_snapshot(quiz_id):
+    """
+    Serialize the current content of a quiz.
+
+    Args:
+        quiz_id (int): The ID of the quiz.
+
+    Returns:
+        bytes: The uncompressed JSON content of the snapshot.
+
+    Raises:
+        Http404: If the quiz does not exist.
+    """
+    quiz_rows = list(_quiz_rows(quiz_id))
+    if not quiz_rows:
+        raise Http404("No Quiz matches the given query.")
+    return _serialize(quiz_rows, _option_rows(quiz_id))
+
+
+async def acompile_snapshot(quiz_id):
+    """
+    Asynchronous version of compile_snapshot.
+    """
+    quiz_rows = [row async for row in _quiz_rows(quiz_id)]
+    if not quiz_rows:
+        raise Http404("No Quiz matches the given query.")
+    option_rows = [row async for row in _option_rows(quiz_id)]
+    return _serialize(quiz_rows, option_rows)
+
+
+def _snapshot_lookup(quiz_id, raw):
+    """
+    Return the get_or_create arguments of the snapshot of some content.
+
+    get_or_create reads the database rows are written to, not a replica, so
+    content already stored is matched without a write.
+    """
+    return {
+        "quiz_id": quiz_id,
+        "digest": hashlib.sha256(raw).hexdigest(),
+        "defaults": {"data": zlib.compress(raw, 9)},
+    }
+
+
+def _snapshot_data(snapshot_id, primary=False):
+    """
+    Return the query of the compressed content of a snapshot.
+
+    Args:
+        snapshot_id (int): The ID of the QuizSnapshot row.
+        primary (bool): Whether to read the database rows are written to, for
+            snapshots too recent to have reached a read replica.
+    """
+    snapshots = QuizSnapshot.objects.filter(id=snapshot_id)
+    if primary:
+        snapshots = snapshots.using(router.db_for_write(QuizSnapshot))
+    return snapshots.values_list("data", flat=True)
+
+
+def get_snapshot(snapshot_id):
+    """
+    Return a snapshot by ID.
+
+    Args:
+        snapshot_id (int): The ID of the QuizSnapshot row.
+
+    Returns:
+        Snapshot: The decoded snapshot.
+
+    Raises:
+        QuizSnapshot.DoesNotExist: If there is no such snapshot.
+    """
+    snapshot = snapshot_cache.get(snapshot_id)
+    if snapshot is None:
+        data = _snapshot_data(snapshot_id).first()
+        if data is None:
+            data = _snapshot_data(snapshot_id, primary=True).get()
+        snapshot = Snapshot(snapshot_id, zlib.decompress(data))
+        snapshot_cache.put(snapshot)
+    return snapshot
+
+
+async def aget_snapshot(snapshot_id):
+    """
+    Asynchronous version of get_snapshot.
+    """
+    snapshot = snapshot_cache.get(snapshot_id)
+    if snapshot is None:
+        data = await _snapshot_data(snapshot_id).afirst()
+        if data is None:
+            data = await _snapshot_data(snapshot_id, primary=True).aget()
+        snapshot = Snapshot(snapshot_id, zlib.decompress(data))
+        snapshot_cache.put(snapshot)
+    return snapshot
+
+
+def get_current_snapshot(quiz_id):
+    """
+    Return the snapshot of the current version of a quiz.
+
+    The snapshot ID of every content version is cached; an unknown version is
+    compiled and stored, or matched to the stored snapshot of the same content.
+
+    Args:
+        quiz_id (int): The ID of the quiz.
+
+    Returns:
+        Snapshot: The decoded snapshot.
+
+    Raises:
+        Http404: If the quiz does not exist.
+    """
+    key = CURRENT_SNAPSHOT_CACHE_KEY.format(
+        quiz_id=quiz_id, version=get_quiz_version(quiz_id)
+    )
+    snapshot_id = cache.get(key)
+    if snapshot_id is not None:
+        return get_snapshot(snapshot_id)
+    raw = compile_snapshot(quiz_id)
+    row, _ = QuizSnapshot.objects.only("id").get_or_create(
+        **_snapshot_lookup(quiz_id, raw)
+    )
+    snapshot = Snapshot(row.id, raw)
+    snapshot_cache.put(snapshot)
+    cache.set(key, snapshot.id, CURRENT_SNAPSHOT_TIMEOUT)
+    return snapshot
+
+
+async def aget_current_snapshot(quiz_id):
+    """
+    Asynchronous version of get_current_snapshot.
+    """
+    key = CURRENT_SNAPSHOT_CACHE_KEY.format(
+        quiz_id=quiz_id, version=await aget_quiz_version(quiz_id)
+    )
+    snapshot_id = await cache.aget(key)
+    if snapshot_id is not None:
+        return await aget_snapshot(snapshot_id)
+    raw = await acompile_snapshot(quiz_id)
+    row, _ = await QuizSnapshot.objects.only("id").aget_or_create(
+        **_snapshot_lookup(quiz_id, raw)
+    )
+    snapshot = Snapshot(row.id, raw)
+    snapshot_cache.put(snapshot)
+    await cache.aset(key, snapshot.id, CURRENT_SNAPSHOT_TIMEOUT)
+    return snapshot
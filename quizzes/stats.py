@@ -0,0 +1,272 @@
+# pylint: disable=E1101
+"""
+Statistics module for the quizzes application.
+
+This module defines the following functions:
+- is_passed: Tell whether a score reaches the pass mark.
+- record_attempts: Add graded attempts to the summary tables.
+- recompute_stats: Rebuild every summary table from the stored attempts.
+- get_quiz_stats: Read the summaries of a quiz for display.
+
+Summaries are updated incrementally with F() expressions by a background job
+queued with every submission (see quizzes.tasks), so reading them never scans
+the Attempt or Answer tables. A rebuild takes over the jobs of the attempts it
+counts, so that no attempt is counted twice. The pass
+mark is the QUIZZES_PASS_RATIO setting (0.5 by default) times the number of
+questions of the quiz.
+"""
+
+from collections import Counter
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Max, Q, Sum
+from django.utils import timezone
+from .models import (
+    Attempt,
+    Answer,
+    Job,
+    Option,
+    OptionStats,
+    Quiz,
+    QuizStats,
+    ScoreBucket,
+)
+
+STATS_JOB = "quizzes.record_attempt_stats"
+
+
+def get_pass_ratio():
+    """
+    Return the share of correct answers needed to pass a quiz.
+    """
+    return getattr(settings, "QUIZZES_PASS_RATIO", 0.5)
+
+
+def is_passed(score, max_score):
+    """
+    Tell whether a score reaches the pass mark.
+
+    Args:
+        score (int): The number of correctly answered questions.
+        max_score (int): The number of questions.
+
+    Returns:
+        bool: True if the attempt passed.
+    """
+    return score >= max_score * get_pass_ratio()
+
+
+def record_attempts(attempts):
+    """
+    Add graded attempts to the summary tables.
+
+    The attempts are summed in memory first, so a batch costs a few queries
+    per quiz and score rather than per attempt. Missing summary rows are
+    created with ignore_conflicts and then every row is incremented in place,
+    so concurrent updates never lose counts. Quizzes and options deleted
+    since the attempts were made are skipped.
+
+    Args:
+        attempts (iterable): (quiz_id, score, max_score, selected_option_ids)
+            tuples, one per attempt.
+    """
+    quizzes = {}
+    buckets = Counter()
+    options = Counter()
+    for quiz_id, score, max_score, selected_option_ids in attempts:
+        totals = quizzes.setdefault(quiz_id, Counter())
+        totals.update(
+            attempts=1, passed=int(is_passed(score, max_score)), score_sum=score
+        )
+        buckets[quiz_id, score] += 1
+        options.update(set(selected_option_ids))
+
+    with transaction.atomic():
+        live_quizzes = set(
+            Quiz.objects.filter(id__in=quizzes).values_list("id", flat=True)
+        )
+        live_options = set(
+            Option.objects.filter(id__in=options).values_list("id", flat=True)
+        )
+        quizzes = {
+            quiz_id: totals
+            for quiz_id, totals in quizzes.items()
+            if quiz_id in live_quizzes
+        }
+        buckets = {
+            bucket: count
+            for bucket, count in buckets.items()
+            if bucket[0] in live_quizzes
+        }
+        by_count = {}
+        for option_id, count in options.items():
+            if option_id in live_options:
+                by_count.setdefault(count, []).append(option_id)
+
+        QuizStats.objects.bulk_create(
+            [QuizStats(quiz_id=quiz_id) for quiz_id in quizzes],
+            ignore_conflicts=True,
+        )
+        for quiz_id, totals in quizzes.items():
+            QuizStats.objects.filter(quiz_id=quiz_id).update(
+                attempts=F("attempts") + totals["attempts"],
+                passed=F("passed") + totals["passed"],
+                score_sum=F("score_sum") + totals["score_sum"],
+            )
+        ScoreBucket.objects.bulk_create(
+            [
+                ScoreBucket(quiz_id=quiz_id, score=score)
+                for quiz_id, score in buckets
+            ],
+            ignore_conflicts=True,
+        )
+        for (quiz_id, score), count in buckets.items():
+            ScoreBucket.objects.filter(quiz_id=quiz_id, score=score).update(
+                attempts=F("attempts") + count
+            )
+        if by_count:
+            OptionStats.objects.bulk_create(
+                [
+                    OptionStats(option_id=option_id)
+                    for option_ids in by_count.values()
+                    for option_id in option_ids
+                ],
+                ignore_conflicts=True,
+            )
+        for count, option_ids in by_count.items():
+            OptionStats.objects.filter(option_id__in=option_ids).update(
+                selections=F("selections") + count
+            )
+
+
+def _take_over_stats_jobs(last_attempt_id):
+    """
+    Mark the pending and running stats jobs of attempts up to an ID as done.
+
+    A running job whose worker commits afterwards is rolled back by the job
+    queue, see quizzes.jobs.
+    """
+    jobs = Job.objects.filter(
+        name=STATS_JOB, status__in=[Job.PENDING, Job.RUNNING]
+    ).values_list("id", "key")
+    covered = [
+        job_id
+        for job_id, key in jobs
+        if key and int(key.rpartition(":")[2]) <= last_attempt_id
+    ]
+    Job.objects.filter(id__in=covered).update(
+        status=Job.DONE, finished=timezone.now(), locked_until=None
+    )
+
+
+def recompute_stats():
+    """
+    Rebuild every summary table from the stored attempts.
+
+    Each table is computed by one grouped aggregate query and written back
+    with bulk_create, all inside one transaction. The rebuild counts the
+    attempts up to the last one stored when it starts, and marks their
+    pending stats jobs as done in the same transaction.
+
+    Returns:
+        dict: The number of rows written per summary table.
+    """
+    pass_mark = Q(score__gte=F("max_score") * get_pass_ratio())
+
+    with transaction.atomic():
+        last_attempt_id = Attempt.objects.aggregate(last=Max("id"))["last"] or 0
+        _take_over_stats_jobs(last_attempt_id)
+        attempts = Attempt.objects.filter(id__lte=last_attempt_id)
+        quiz_rows = attempts.values("quiz_id").annotate(
+            total=Count("id"),
+            passed_total=Count("id", filter=pass_mark),
+            sum=Sum("score"),
+        )
+        bucket_rows = attempts.values("quiz_id", "score").annotate(
+            total=Count("id")
+        )
+        option_rows = (
+            Answer.objects.filter(
+                attempt_id__lte=last_attempt_id, selected_option__isnull=False
+            )
+            .values("selected_option_id")
+            .annotate(total=Count("id"))
+        )
+        QuizStats.objects.all().delete()
+        ScoreBucket.objects.all().delete()
+        OptionStats.objects.all().delete()
+        quizzes = QuizStats.objects.bulk_create(
+            QuizStats(
+                quiz_id=row["quiz_id"],
+                attempts=row["total"],
+                passed=row["passed_total"],
+                score_sum=row["sum"] or 0,
+            )
+            for row in quiz_rows
+        )
+        buckets = ScoreBucket.objects.bulk_create(
+            ScoreBucket(
+                quiz_id=row["quiz_id"], score=row["score"], attempts=row["total"]
+            )
+            for row in bucket_rows
+        )
+        options = OptionStats.objects.bulk_create(
+            OptionStats(option_id=row["selected_option_id"], selections=row["total"])
+            for row in option_rows
+        )
+    return {
+        "quizzes": len(quizzes),
+        "score_buckets": len(buckets),
+        "options": len(options),
+    }
+
+
+def get_quiz_stats(quiz_id, answer_key):
+    """
+    Read the summaries of a quiz for display.
+
+    Args:
+        quiz_id (int): The ID of the quiz.
+        answer_key (list): The answer key of the quiz, used for labels.
+
+    Returns:
+        dict: The attempt count, pass rate, average score, score histogram and
+        per-question option selection counts.
+    """
+    stats = QuizStats.objects.filter(quiz_id=quiz_id).first() or QuizStats()
+    buckets = dict(
+        ScoreBucket.objects.filter(quiz_id=quiz_id).values_list("score", "attempts")
+    )
+    option_ids = [
+        option["id"] for question in answer_key for option in question["options"]
+    ]
+    selections = dict(
+        OptionStats.objects.filter(option_id__in=option_ids).values_list(
+            "option_id", "selections"
+        )
+    )
+
+    max_score = max([len(answer_key), *buckets])
+    histogram = [
+        {"score": score, "attempts": buckets.get(score, 0)}
+        for score in range(max_score + 1)
+    ]
+    questions = [
+        {
+            "question": question,
+            "options": [
+                {**option, "selections": selections.get(option["id"], 0)}
+                for option in question["options"]
+            ],
+        }
+        for question in answer_key
+        if question["options"]
+    ]
+    attempts = stats.attempts
+    return {
+        "attempts": attempts,
+        "pass_rate": stats.passed / attempts if attempts else 0,
+        "average_score": stats.score_sum / attempts if attempts else 0,
+        "histogram": histogram,
+        "questions": questions,
+    }
@@ -0,0 +1,213 @@
+# pylint: disable=E1101
+"""
+Submissions module for the quizzes application.
+
+This module defines the following functions:
+- parse_json_answers: Convert a JSON submission to the posted form layout.
+- build_answers: Validate posted answers and build unsaved Answer instances.
+- save_answers: Store a submission as a new attempt in one transaction.
+
+Posted option IDs are checked against the quiz answer key, so a submission is
+validated without one query per selected option, and every invalid ID is
+reported at once. Every submission gets its own Attempt, so concurrent takers
+never touch each other's rows. Attempts are graded when they are saved, with
+the correctness of every answer stored on it, against the snapshot of the
+current quiz version, which the attempt references (see quizzes.snapshots).
+The statistics summaries are updated by a background job queued in the same
+transaction (see quizzes.jobs), and the leaderboards once the transaction
+commits.
+"""
+
+from functools import partial
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.utils.datastructures import MultiValueDict
+from . import leaderboards
+from .grading import grade, mark_answer
+from .jobs import enqueue
+from .models import Answer, Attempt
+from .sampling import apply_layout, load_layout
+from .snapshots import get_current_snapshot
+from .stats import STATS_JOB
+
+
+def _parse_option_ids(values):
+    """
+    Convert posted option IDs to integers, keeping the unparsable ones apart.
+    """
+    option_ids, invalid = [], []
+    for value in values:
+        try:
+            option_ids.append(int(value))
+        except (TypeError, ValueError):
+            invalid.append(value)
+    return option_ids, invalid
+
+
+def parse_json_answers(payload):
+    """
+    Convert a JSON submission to the posted form layout.
+
+    The submission maps question IDs to a list of option IDs, a single option
+    ID or, for text questions, a string:
+
+        {"answers": {"12": [34, 35], "13": 40, "14": "Paris"}}
+
+    Args:
+        payload (object): The decoded JSON body.
+
+    Returns:
+        MultiValueDict: The answers keyed like the take quiz form fields.
+
+    Raises:
+        ValidationError: If the submission is not shaped as above.
+    """
+    answers = payload.get("answers") if isinstance(payload, dict) else None
+    if not isinstance(answers, dict):
+        raise ValidationError(
+            'Expected an object with an "answers" object.', code="invalid_body"
+        )
+    data = MultiValueDict()
+    for question_id, value in answers.items():
+        values = value if isinstance(value, list) else [value]
+        if not all(isinstance(item, (int, str)) for item in values):
+            raise ValidationError(
+                "Invalid answer to question %(question)s.",
+                code="invalid_answer",
+                params={"question": question_id},
+            )
+        data.setlist(f"question_{question_id}", [str(item) for item in values])
+    return data
+
+
+def build_answers(answer_key, data):
+    """
+    Validate posted answers and build unsaved Answer instances.
+
+    Args:
+        answer_key (list): The answer key of the quiz being taken.
+        data (QueryDict): The posted form data.
+
+    Returns:
+        list: The unsaved Answer instances, marked correct or not.
+
+    Raises:
+        ValidationError: If any posted option does not belong to its question.
+    """
+    answers = []
+    invalid = []
+    for question in answer_key:
+        field = f"question_{question['id']}"
+        if question["question_type"] == "TEXT":
+            text_answer = data.get(field) or ""
+            answers.append(
+                Answer(
+                    question_id=question["id"],
+                    text_answer=text_answer,
+                    is_correct=mark_answer(question, None, text_answer),
+                )
+            )
+            continue
+
+        if question["question_type"] == "RADIO":
+            values = [data[field]] if data.get(field) else []
+        else:
+            values = data.getlist(field)
+        option_ids, unparsable = _parse_option_ids(values)
+        invalid.extend(unparsable)
+        valid_ids = {option["id"] for option in question["options"]}
+        for option_id in dict.fromkeys(option_ids):
+            if option_id in valid_ids:
+                answers.append(
+                    Answer(
+                        question_id=question["id"],
+                        selected_option_id=option_id,
+                        is_correct=mark_answer(question, option_id, None),
+                    )
+                )
+            else:
+                invalid.append(option_id)
+
+    if invalid:
+        raise ValidationError(
+            "Invalid options: %(options)s",
+            code="invalid_option",
+            params={"options": ", ".join(str(option_id) for option_id in invalid)},
+        )
+    return answers
+
+
+def save_answers(quiz_id, data, session_key="", draw=None):
+    """
+    Store a submission as a new attempt in one transaction.
+
+    Args:
+        quiz_id (int): The ID of the quiz being taken.
+        data (QueryDict): The posted form data.
+        session_key (str): The session key of the taker, if any.
+        draw (str): The signed layout of a randomized quiz, see
+            quizzes.sampling. Only the drawn questions are graded. It is
+            required for quizzes with a sample size.
+
+    Returns:
+        tuple: The saved attempt and its per-question results, as returned
+        by grade.
+
+    Raises:
+        ValidationError: If any posted option does not belong to its question,
+        or the draw is invalid, or missing for a quiz with a sample size.
+    """
+    snapshot = get_current_snapshot(quiz_id)
+    answer_key = snapshot.answer_key
+    layout = None
+    if draw:
+        layout = load_layout(quiz_id, draw)
+        answer_key = apply_layout(answer_key, layout)
+    elif snapshot.payload["sample_size"] is not None:
+        # Grading the whole bank would let a submission skip the sample.
+        raise ValidationError(
+            "This quiz requires the draw it was taken with.", code="missing_draw"
+        )
+    answers = build_answers(answer_key, data)
+    score, results = grade(
+        answer_key,
+        [
+            (a.question_id, a.selected_option_id, a.text_answer, a.is_correct)
+            for a in answers
+        ],
+    )
+    selected_option_ids = [
+        a.selected_option_id for a in answers if a.selected_option_id is not None
+    ]
+    with transaction.atomic():
+        attempt = Attempt.objects.create(
+            quiz_id=quiz_id,
+            session_key=session_key,
+            score=score,
+            max_score=len(answer_key),
+            layout=layout,
+            snapshot_id=snapshot.id,
+        )
+        for answer in answers:
+            answer.attempt = attempt
+        Answer.objects.bulk_create(answers)
+        enqueue(
+            STATS_JOB,
+            {
+                "quiz": quiz_id,
+                "score": score,
+                "max_score": len(answer_key),
+                "options": selected_option_ids,
+            },
+            key=f"attempt-stats:{attempt.id}",
+        )
+        transaction.on_commit(
+            partial(
+                leaderboards.record_attempt,
+                quiz_id,
+                leaderboards.member_for(session_key, attempt.id),
+                score,
+                attempt.created,
+            )
+        )
+    return attempt, results
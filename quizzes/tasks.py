@@ -0,0 +1,81 @@
+"""
+Tasks module for the quizzes application.
+
+This module defines the handlers of background jobs (see quizzes.jobs):
+- record_attempt_stats: Add submitted attempts to the statistics summaries.
+- generate_image_derivatives: Render the thumbnails of quiz images.
+- record_leaderboard_score: Apply a leaderboard update deferred by contention.
+
+The first two are batch handlers: a worker passes them the payloads of every
+job of their name it claimed at once.
+"""
+
+import logging
+from django.db import transaction
+from .images import generate_derivatives, record_derivatives
+from .jobs import register
+from .leaderboards import DEFERRED_JOB, record_deferred_score
+from .stats import STATS_JOB, record_attempts
+from .versions import bump_catalogue_version, bump_quiz_version
+
+logger = logging.getLogger(__name__)
+
+
+@register(STATS_JOB, batch=True)
+def record_attempt_stats(payloads):
+    """
+    Add submitted attempts to the statistics summaries.
+
+    Args:
+        payloads (list): Dicts with the quiz ID, score, max score and
+            selected option IDs of each attempt.
+    """
+    record_attempts(
+        (payload["quiz"], payload["score"], payload["max_score"], payload["options"])
+        for payload in payloads
+    )
+
+
+@register("quizzes.generate_image_derivatives", batch=True)
+def generate_image_derivatives(payloads):
+    """
+    Render the thumbnails of quiz images, once per image.
+
+    Images that cannot be read or decoded are logged and skipped: retrying
+    would not help, and their pages fall back to the original. The quizzes
+    showing a rendered image record its thumbnails and get new content
+    versions when the job commits, so that snapshots and pages built with the
+    original pick them up.
+
+    Args:
+        payloads (list): Dicts with the storage name of each image.
+    """
+    quiz_ids = []
+    for name in dict.fromkeys(payload["name"] for payload in payloads):
+        try:
+            names = generate_derivatives(name)
+        except OSError as error:
+            logger.warning("Cannot render the thumbnails of %s: %s", name, error)
+            continue
+        quiz_ids.extend(record_derivatives(name, names))
+
+    def bump_versions():
+        for quiz_id in quiz_ids:
+            bump_quiz_version(quiz_id)
+        if quiz_ids:
+            bump_catalogue_version()
+
+    transaction.on_commit(bump_versions)
+
+
+@register(DEFERRED_JOB)
+def record_leaderboard_score(payload):
+    """
+    Apply a leaderboard update deferred because its leaderboard was locked.
+
+    The job fails, and is retried later, while the leaderboard stays locked.
+
+    Args:
+        payload (dict): The update, see leaderboards.record_deferred_score.
+    """
+    record_deferred_score(payload)
@@ -0,0 +1,26 @@
+"""
+Template helpers for front-end libraries.
+
+Usage:
+    {% load quiz_assets %}
+    <script src="{% vendor_url 'jquery.js' %}"></script>
+"""
+
+from django import template
+from quizzes import vendor
+
+register = template.Library()
+
+
+@register.simple_tag
+def vendor_url(name):
+    """
+    Return the URL a vendor library is loaded from, see quizzes.vendor.
+
+    Args:
+        name (str): The name of the library, such as "jquery.js".
+
+    Returns:
+        str: The URL of the library.
+    """
+    return vendor.vendor_url(name)
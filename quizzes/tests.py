@@ -0,0 +1,642 @@
+# pylint: disable=E1101
+"""
+Tests module for the quizzes application.
+
+This module defines the following test cases:
+- SampledSubmissionTests: Submissions of quizzes with a sample size.
+- LeaderboardTests: Ranks kept in the sharded cache and their rebuild.
+- DraftTests: Autosaved answers restored by take_quiz.
+- VersionTests: Content versions bumped atomically.
+- StatsTests: Summaries updated by jobs and rebuilt.
+- ThumbnailTests: Image derivatives rendered by jobs and read by the views.
+- ResultAccessTests: Results shown only to the session that submitted them.
+- ReplicaPinTests: Clients pinned to the primary after writing only.
+- SearchTests: The FTS5 index created by the migrations.
+- ConditionalGetTests: Validators of the quiz pages and their 304 responses.
+- GradingTests: Text matching and graded submissions.
+- NestedFormsetTests: Questions edited with their options in one form.
+"""
+
+import io
+import json
+import random
+import tempfile
+import threading
+from unittest import mock
+from asgiref.sync import async_to_sync
+from django.core.cache import caches
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from PIL import Image
+from quiz_site.cache import AtomicFileBasedCache
+from quiz_site.replicas import PIN_COOKIE_NAME
+from . import drafts, leaderboards, versions
+from .benchmark import asgi_urlconf
+from .forms import QuestionFormSet
+from .jobs import claim_jobs, run_jobs
+from .matching import match_text_answer, normalize_answer
+from .models import Answer, Attempt, Job, Option, Question, Quiz, QuizStats
+from .search import FTS5Index, get_index, search_quizzes
+from .snapshots import snapshot_cache
+from .stats import recompute_stats
+
+LOCAL_CACHES = {
+    alias: {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+    for alias in ("default", "versions", "leaderboards", "drafts")
+}
+
+
+@override_settings(CACHES=LOCAL_CACHES, QUIZZES_JOBS={"EAGER": True})
+class SampledSubmissionTests(TestCase):
+    """
+    Submissions of quizzes with a sample size are graded on their draw only.
+    """
+
+    def setUp(self):
+        for cache in caches.all():
+            cache.clear()
+        snapshot_cache.clear()
+        self.quiz = Quiz.objects.create(title="Sampled", sample_size=1)
+        self.answers = {}
+        for index in range(5):
+            question = Question.objects.create(
+                quiz=self.quiz, text=f"Question {index}", question_type="RADIO"
+            )
+            correct = Option.objects.create(
+                question=question, text="Right", is_correct=True
+            )
+            Option.objects.create(question=question, text="Wrong")
+            self.answers[f"question_{question.id}"] = str(correct.id)
+
+    def test_form_submission_without_draw_is_rejected(self):
+        response = self.client.post(f"/{self.quiz.id}/save/", self.answers)
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Attempt.objects.exists())
+
+    def test_api_submission_without_draw_is_rejected(self):
+        answers = {key.split("_")[1]: value for key, value in self.answers.items()}
+        response = self.client.post(
+            f"/api/quizzes/{self.quiz.id}/submit/",
+            json.dumps({"answers": answers}),
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Attempt.objects.exists())
+
+    def test_submission_is_graded_on_its_draw(self):
+        draw = self.client.get(f"/{self.quiz.id}/take/").context["draw"]
+        response = self.client.post(
+            f"/{self.quiz.id}/save/", {**self.answers, "draw": draw}
+        )
+        self.assertEqual(response.status_code, 302)
+        attempt = Attempt.objects.get()
+        self.assertEqual((attempt.score, attempt.max_score), (1, 1))
+
+
+@override_settings(CACHES=LOCAL_CACHES)
+class LeaderboardTests(TestCase):
+    """
+    Leaderboards are rebuilt when missing and rank members across tree shards.
+    """
+
+    def setUp(self):
+        for cache in caches.all():
+            cache.clear()
+        self.quiz = Quiz.objects.create(title="Ranked")
+
+    def test_missing_leaderboards_are_rebuilt_on_access(self):
+        for index in range(6):
+            Attempt.objects.create(
+                quiz=self.quiz, session_key=f"s{index % 3}", score=index, max_score=9
+            )
+        self.assertEqual(
+            leaderboards.get_rank("s0", self.quiz.id),
+            {"rank": 3, "score": 3, "total": 3},
+        )
+        self.assertEqual(leaderboards.get_top()[0]["score"], 5)
+
+    def test_ranks_span_tree_shards(self):
+        rng = random.Random(0)
+        scores = {}
+        for _ in range(300):
+            member = f"m{rng.randrange(100)}"
+            score = rng.randrange(3000)
+            scores[member] = max(score, scores.get(member, 0))
+            leaderboards.record_attempt(self.quiz.id, member, score, timezone.now())
+        for member, score in scores.items():
+            higher = sum(other > score for other in scores.values())
+            self.assertEqual(
+                leaderboards.get_rank(member, self.quiz.id),
+                {"rank": higher + 1, "score": score, "total": len(scores)},
+            )
+
+    def test_locked_leaderboard_defers_the_update(self):
+        cache = caches["leaderboards"]
+        generation = leaderboards._generation()
+        lock = leaderboards._key(generation, f"quiz:{self.quiz.id}", "lock")
+        cache.add(lock, 1)
+        with mock.patch.object(leaderboards, "LOCK_WAIT", 0):
+            leaderboards.record_attempt(self.quiz.id, "m", 7, timezone.now())
+            self.assertIsNone(leaderboards.get_rank("m", self.quiz.id))
+            # Still locked: the job fails and stays queued for a retry.
+            run_jobs(claim_jobs(10, 60))
+            self.assertEqual(Job.objects.get().status, Job.PENDING)
+        cache.delete(lock)
+        Job.objects.update(run_after=timezone.now())
+        run_jobs(claim_jobs(10, 60))
+        self.assertEqual(Job.objects.get().status, Job.DONE)
+        self.assertEqual(leaderboards.get_rank("m", self.quiz.id)["score"], 7)
+        self.assertEqual(leaderboards.get_rank("m")["score"], 7)
+
+    def test_rebuild_deletes_the_replaced_generation(self):
+        leaderboards.record_attempt(self.quiz.id, "m", 3, timezone.now())
+        replaced = leaderboards._generation()
+        board = leaderboards._key(replaced, f"quiz:{self.quiz.id}", "top")
+        self.assertIsNotNone(caches["leaderboards"].get(board))
+        leaderboards.rebuild_leaderboards()
+        prefix = f"quizzes:leaderboard:{replaced}:"
+        self.assertFalse(
+            [key for key in caches["leaderboards"]._cache if prefix in key]
+        )
+
+
+@override_settings(CACHES=LOCAL_CACHES)
+class DraftTests(TestCase):
+    """
+    Autosaved answers are kept per taker and only for questions of the quiz.
+    """
+
+    def setUp(self):
+        for cache in caches.all():
+            cache.clear()
+        snapshot_cache.clear()
+        self.quiz = Quiz.objects.create(title="Drafted")
+        self.question = Question.objects.create(
+            quiz=self.quiz, text="Capital of France?", question_type="TEXT"
+        )
+        other = Quiz.objects.create(title="Other")
+        self.foreign = Question.objects.create(quiz=other, text="Elsewhere?")
+        # The take page hands out the draft cookie.
+        self.client.get(f"/{self.quiz.id}/take/")
+
+    def autosave(self, question_id, value):
+        return self.client.post(
+            f"/{self.quiz.id}/autosave/", {"question": question_id, "value": value}
+        )
+
+    def test_autosaved_answer_is_restored(self):
+        self.assertEqual(self.autosave(self.question.id, "Paris").status_code, 204)
+        response = self.client.get(f"/{self.quiz.id}/take/")
+        self.assertContains(response, "Paris")
+
+    def test_autosave_writes_nothing_to_the_database(self):
+        self.autosave(self.question.id, "Paris")
+        with self.assertNumQueries(0):
+            self.assertEqual(self.autosave(self.question.id, "Lyon").status_code, 204)
+
+    def test_questions_of_other_quizzes_are_rejected(self):
+        for question_id in (self.foreign.id, self.question.id + 10000):
+            self.assertEqual(self.autosave(question_id, "x").status_code, 400)
+        taker = self.client.cookies[drafts.TAKER_COOKIE].value
+        self.assertIsNone(drafts.get_draft(taker, self.quiz.id))
+
+    def test_draft_answers_are_capped(self):
+        taker = drafts.new_taker()
+        for question_id in range(drafts.DRAFT_MAX_ANSWERS):
+            drafts.update_draft(taker, self.quiz.id, question_id, ["x"])
+        drafts.update_draft(taker, self.quiz.id, 0, ["y"])
+        with self.assertRaises(ValueError):
+            drafts.update_draft(taker, self.quiz.id, -1, ["x"])
+
+
+class VersionTests(TestCase):
+    """
+    Racing bumps of a content version all yield distinct, larger versions.
+    """
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.cache = AtomicFileBasedCache(directory.name, {})
+
+    def test_concurrent_incr_loses_no_update(self):
+        self.cache.set("counter", 0, None)
+
+        def bump():
+            for _ in range(50):
+                self.cache.incr("counter")
+
+        threads = [threading.Thread(target=bump) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(self.cache.get("counter"), 400)
+
+    def test_concurrent_add_succeeds_once(self):
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(self.cache.add("k", 1)))
+            for _ in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results.count(True), 1)
+
+    def test_bump_yields_a_larger_version(self):
+        with override_settings(CACHES=LOCAL_CACHES):
+            caches["versions"].clear()
+            version = versions.get_quiz_version(1)
+            versions.bump_quiz_version(1)
+            versions.bump_quiz_version(1)
+            self.assertGreater(versions.get_quiz_version(1), version)
+
+
+@override_settings(CACHES=LOCAL_CACHES, QUIZZES_JOBS={"EAGER": False})
+class StatsTests(TestCase):
+    """
+    Every attempt is counted once, by its job or by a rebuild.
+    """
+
+    def setUp(self):
+        for cache in caches.all():
+            cache.clear()
+        snapshot_cache.clear()
+        self.quiz = Quiz.objects.create(title="Counted")
+        question = Question.objects.create(
+            quiz=self.quiz, text="Pick", question_type="RADIO"
+        )
+        self.option = Option.objects.create(
+            question=question, text="Right", is_correct=True
+        )
+        self.answers = {f"question_{question.id}": str(self.option.id)}
+
+    def submit(self):
+        response = self.client.post(f"/{self.quiz.id}/save/", self.answers)
+        self.assertEqual(response.status_code, 302)
+
+    def attempts_counted(self):
+        return QuizStats.objects.get(quiz=self.quiz).attempts
+
+    def test_job_updates_the_summaries(self):
+        self.submit()
+        self.assertFalse(QuizStats.objects.exists())
+        run_jobs(claim_jobs(10, 60))
+        self.assertEqual(self.attempts_counted(), 1)
+        self.assertEqual(self.option.stats.selections, 1)
+
+    def test_recompute_takes_over_a_pending_job(self):
+        self.submit()
+        recompute_stats()
+        self.assertEqual(Job.objects.get().status, Job.DONE)
+        run_jobs(claim_jobs(10, 60))
+        self.assertEqual(self.attempts_counted(), 1)
+
+    def test_recompute_rolls_back_a_running_job(self):
+        self.submit()
+        claimed = claim_jobs(10, 60)
+        recompute_stats()
+        run_jobs(claimed)
+        self.assertEqual(self.attempts_counted(), 1)
+        self.assertEqual(Job.objects.get().status, Job.DONE)
+
+
+@override_settings(CACHES=LOCAL_CACHES, QUIZZES_JOBS={"EAGER": False})
+class ThumbnailTests(TestCase):
+    """
+    Thumbnails are rendered by jobs; pages only read their recorded names.
+    """
+
+    def setUp(self):
+        for cache in caches.all():
+            cache.clear()
+        snapshot_cache.clear()
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media.name))
+        content = io.BytesIO()
+        Image.new("RGB", (800, 600), "red").save(content, "PNG")
+        self.quiz = Quiz.objects.create(
+            title="Pictured",
+            image=SimpleUploadedFile("picture.png", content.getvalue()),
+        )
+
+    def test_pages_never_queue_jobs(self):
+        Job.objects.all().delete()
+        with override_settings(ROOT_URLCONF=asgi_urlconf()):
+            response = async_to_sync(self.async_client.get)("/")
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, self.quiz.image.url)
+        self.assertEqual(self.client.get(f"/{self.quiz.id}/take/").status_code, 200)
+        self.assertEqual(self.client.get("/api/quizzes/").status_code, 200)
+        self.assertFalse(Job.objects.exists())
+
+    def test_rendered_thumbnails_replace_the_original(self):
+        run_jobs(claim_jobs(10, 60))
+        self.quiz.refresh_from_db()
+        self.assertEqual(self.quiz.thumbnails["image"], self.quiz.image.name)
+        card = self.quiz.thumbnails["card"]
+        self.assertTrue(card.endswith(".webp"))
+        self.assertContains(self.client.get("/"), card)
+        image_url = self.client.get("/api/quizzes/").json()["quizzes"][0]["image_url"]
+        self.assertTrue(image_url.endswith(card))
+
+
+@override_settings(CACHES=LOCAL_CACHES, QUIZZES_JOBS={"EAGER": True})
+class ResultAccessTests(TestCase):
+    """
+    Results are shown only to the session that submitted the attempt.
+    """
+
+    def setUp(self):
+        for cache in caches.all():
+            cache.clear()
+        snapshot_cache.clear()
+        self.quiz = Quiz.objects.create(title="Private")
+        question = Question.objects.create(
+            quiz=self.quiz, text="Pick", question_type="RADIO"
+        )
+        option = Option.objects.create(question=question, text="Right", is_correct=True)
+        response = self.client.post(
+            f"/{self.quiz.id}/save/", {f"question_{question.id}": str(option.id)}
+        )
+        self.result_url = response["Location"]
+        self.other = Client()
+        self.other.post(f"/{self.quiz.id}/save/", {})
+
+    def test_result_is_shown_to_its_session_only(self):
+        self.assertEqual(self.client.get(self.result_url).status_code, 200)
+        self.assertEqual(self.other.get(self.result_url).status_code, 404)
+        self.assertEqual(Client().get(self.result_url).status_code, 404)
+
+    def test_async_result_is_shown_to_its_session_only(self):
+        with override_settings(ROOT_URLCONF=asgi_urlconf()):
+            other = async_to_sync(self.async_client.get)(self.result_url)
+            self.async_client.cookies = self.client.cookies
+            own = async_to_sync(self.async_client.get)(self.result_url)
+        self.assertEqual(own.status_code, 200)
+        self.assertEqual(other.status_code, 404)
+
+    def test_latest_result_is_the_latest_of_the_session(self):
+        latest_url = f"/{self.quiz.id}/results/"
+        self.assertRedirects(self.client.get(latest_url), self.result_url)
+        other_attempt = Attempt.objects.latest("id")
+        self.assertRedirects(
+            self.other.get(latest_url),
+            f"/{self.quiz.id}/results/{other_attempt.id}/",
+        )
+        self.assertEqual(Client().get(latest_url).status_code, 404)
+
+
+@override_settings(
+    CACHES=LOCAL_CACHES, QUIZZES_JOBS={"EAGER": True}, DATABASE_REPLICAS=["default"]
+)
+class ReplicaPinTests(TestCase):
+    """
+    Clients are pinned to the primary after requests that write only.
+    """
+
+    def setUp(self):
+        for cache in caches.all():
+            cache.clear()
+        snapshot_cache.clear()
+        self.quiz = Quiz.objects.create(title="Replicated")
+        self.question = Question.objects.create(
+            quiz=self.quiz, text="Capital of France?", question_type="TEXT"
+        )
+        self.client.get(f"/{self.quiz.id}/take/")
+
+    def test_autosave_does_not_pin(self):
+        response = self.client.post(
+            f"/{self.quiz.id}/autosave/",
+            {"question": self.question.id, "value": "Paris"},
+        )
+        self.assertEqual(response.status_code, 204)
+        self.assertNotIn(PIN_COOKIE_NAME, response.cookies)
+
+    def test_submission_pins(self):
+        response = self.client.post(
+            f"/{self.quiz.id}/save/", {f"question_{self.question.id}": "Paris"}
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assertIn(PIN_COOKIE_NAME, response.cookies)
+
+
+@override_settings(CACHES=LOCAL_CACHES)
+class SearchTests(TestCase):
+    """
+    The FTS5 table comes from the migrations and follows quiz changes.
+    """
+
+    def test_saved_quiz_is_found(self):
+        self.assertIsInstance(get_index(), FTS5Index)
+        with self.captureOnCommitCallbacks(execute=True):
+            quiz = Quiz.objects.create(title="Столицы Европы")
+            Question.objects.create(quiz=quiz, text="Столица Франции?")
+        self.assertEqual(search_quizzes("стол фран"), [quiz])
+        self.assertEqual(search_quizzes("ёлка"), [])
+
+
+@override_settings(CACHES=LOCAL_CACHES)
+class ConditionalGetTests(TransactionTestCase):
+    """
+    Unchanged pages are answered with 304 and no query; changes show.
+
+    Content versions are bumped when edits commit, so edits are committed.
+    """
+
+    def setUp(self):
+        for cache in caches.all():
+            cache.clear()
+        snapshot_cache.clear()
+        self.quiz = Quiz.objects.create(title="Cached")
+        self.question = Question.objects.create(
+            quiz=self.quiz, text="Capital of France?", question_type="TEXT"
+        )
+        self.url = f"/{self.quiz.id}/take/"
+        # The first visit caches the question bank the validators need.
+        self.client.get(self.url)
+
+    def etag(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response["ETag"]
+
+    def test_unchanged_pages_cost_no_query(self):
+        for url in (self.url, "/"):
+            etag = self.etag(url)
+            with self.assertNumQueries(0):
+                response = self.client.get(url, headers={"if-none-match": etag})
+            self.assertEqual(response.status_code, 304)
+
+    def test_edit_changes_the_etag(self):
+        etag = self.etag(self.url)
+        self.quiz.title = "Edited"
+        self.quiz.save()
+        response = self.client.get(self.url, headers={"if-none-match": etag})
+        self.assertContains(response, "Edited")
+        self.assertNotEqual(self.etag(self.url), etag)
+
+    def test_autosave_changes_the_etag(self):
+        etag = self.etag(self.url)
+        self.client.post(
+            f"/{self.quiz.id}/autosave/",
+            {"question": self.question.id, "value": "Paris"},
+        )
+        response = self.client.get(self.url, headers={"if-none-match": etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+
+@override_settings(CACHES=LOCAL_CACHES, QUIZZES_JOBS={"EAGER": True})
+class GradingTests(TestCase):
+    """
+    Answers are matched and graded once, when they are submitted.
+    """
+
+    def setUp(self):
+        for cache in caches.all():
+            cache.clear()
+        snapshot_cache.clear()
+        self.quiz = Quiz.objects.create(title="Graded")
+        self.radio = Question.objects.create(
+            quiz=self.quiz, text="Pick one", question_type="RADIO"
+        )
+        self.radio_right = Option.objects.create(
+            question=self.radio, text="Right", is_correct=True
+        )
+        self.checkbox = Question.objects.create(
+            quiz=self.quiz, text="Pick all", question_type="CHECKBOX"
+        )
+        self.checkbox_right = [
+            Option.objects.create(question=self.checkbox, text=text, is_correct=True)
+            for text in ("First", "Second")
+        ]
+        self.text = Question.objects.create(
+            quiz=self.quiz, text="Capital?", question_type="TEXT", max_edits=1
+        )
+        Option.objects.create(question=self.text, text="Париж", is_correct=True)
+
+    def submit(self, answers):
+        return self.client.post(
+            f"/api/quizzes/{self.quiz.id}/submit/",
+            json.dumps({"answers": answers}),
+            content_type="application/json",
+        )
+
+    def test_answers_are_normalized(self):
+        self.assertEqual(normalize_answer(" Санкт-Петербург! "), "санкт петербург")
+        self.assertEqual(normalize_answer("Ёлка"), "елка")
+
+    def test_typos_are_tolerated_by_answer_length(self):
+        self.assertTrue(match_text_answer("ПАРИЖЖ", ["париж"], 1))
+        self.assertFalse(match_text_answer("Парижжж", ["париж"], 1))
+        self.assertFalse(match_text_answer("Рима", ["рим"], 1))
+        self.assertFalse(match_text_answer("", ["париж"], 2))
+
+    def test_submission_is_graded_and_saved(self):
+        response = self.submit(
+            {
+                str(self.radio.id): self.radio_right.id,
+                str(self.checkbox.id): [self.checkbox_right[0].id],
+                str(self.text.id): "парижж",
+            }
+        )
+        self.assertEqual(response.status_code, 201)
+        result = response.json()
+        self.assertEqual((result["score"], result["max_score"]), (2, 3))
+        self.assertEqual(
+            [item["is_correct"] for item in result["results"]], [True, False, True]
+        )
+        attempt = Attempt.objects.get(id=result["attempt_id"])
+        self.assertEqual(attempt.score, 2)
+        self.assertTrue(Answer.objects.get(question=self.text).is_correct)
+
+    def test_option_of_another_question_is_rejected(self):
+        response = self.submit({str(self.radio.id): self.checkbox_right[0].id})
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Attempt.objects.exists())
+
+
+@override_settings(CACHES=LOCAL_CACHES)
+class NestedFormsetTests(TestCase):
+    """
+    The edit form saves questions and their options together.
+    """
+
+    def setUp(self):
+        self.quiz = Quiz.objects.create(title="Edited")
+        self.questions = [
+            Question.objects.create(
+                quiz=self.quiz, text=f"Question {index}", question_type="RADIO"
+            )
+            for index in range(2)
+        ]
+        self.options = [
+            [
+                Option.objects.create(question=question, text=f"Option {index}")
+                for index in range(2)
+            ]
+            for question in self.questions
+        ]
+
+    def form_data(self):
+        data = {
+            "title": self.quiz.title,
+            "questions-TOTAL_FORMS": len(self.questions),
+            "questions-INITIAL_FORMS": len(self.questions),
+        }
+        for index, question in enumerate(self.questions):
+            prefix = f"questions-{index}"
+            data.update(
+                {
+                    f"{prefix}-id": question.id,
+                    f"{prefix}-text": question.text,
+                    f"{prefix}-question_type": question.question_type,
+                    f"{prefix}-max_edits": question.max_edits,
+                    f"{prefix}-options-TOTAL_FORMS": 2,
+                    f"{prefix}-options-INITIAL_FORMS": 2,
+                }
+            )
+            for position, option in enumerate(self.options[index]):
+                data[f"{prefix}-options-{position}-id"] = option.id
+                data[f"{prefix}-options-{position}-text"] = option.text
+        return data
+
+    def test_validation_costs_two_queries(self):
+        with self.assertNumQueries(2):
+            formset = QuestionFormSet(self.form_data(), instance=self.quiz)
+            self.assertTrue(formset.is_valid())
+
+    def test_options_are_saved_with_their_questions(self):
+        data = self.form_data()
+        data["questions-0-options-0-text"] = "Renamed"
+        data["questions-0-options-0-is_correct"] = "on"
+        data["questions-1-options-1-DELETE"] = "on"
+        data["questions-1-options-TOTAL_FORMS"] = 3
+        data["questions-1-options-2-text"] = "Added"
+        response = self.client.post(f"/{self.quiz.id}/edit/", data)
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(
+            list(
+                self.questions[0].options.order_by("id").values_list(
+                    "text", "is_correct"
+                )
+            ),
+            [("Renamed", True), ("Option 1", False)],
+        )
+        self.assertEqual(
+            list(
+                self.questions[1].options.order_by("id").values_list("text", flat=True)
+            ),
+            ["Option 0", "Added"],
+        )
+
+    def test_option_of_another_question_is_rejected(self):
+        data = self.form_data()
+        data["questions-0-options-0-id"] = self.options[1][0].id
+        formset = QuestionFormSet(data, instance=self.quiz)
+        self.assertFalse(formset.is_valid())
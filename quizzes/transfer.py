@@ -0,0 +1,272 @@
+# pylint: disable=E1101
+"""
+Transfer module for the quizzes application.
+
+This module defines the following functions:
+- iter_export_records: Stream the whole catalogue as flat records.
+- write_records: Write records as JSONL or CSV.
+- read_records: Read records from JSONL or CSV.
+- import_records: Create the catalogue described by a stream of records.
+
+A record is a flat dict with the fields listed in RECORD_FIELDS. Its "type" is
+one of "category", "quiz", "question" or "option", and "parent" holds the ID
+of the category, quiz or question it belongs to in the same stream. Parents
+always come before their children, so a stream can be imported in one pass.
+"""
+
+import csv
+import json
+from django.db import transaction
+from .matching import normalize_answer
+from .models import Category, Quiz, Question, Option
+from .versions import bump_catalogue_version
+
+RECORD_FIELDS = [
+    "type",
+    "id",
+    "parent",
+    "text",
+    "question_type",
+    "max_edits",
+    "is_correct",
+    "image",
+    "sample_size",
+    "stratify_sample",
+    "shuffle_options",
+]
+RECORD_TYPES = ["category", "quiz", "question", "option"]
+CHUNK_SIZE = 5000
+
+
+def iter_export_records(chunk_size=CHUNK_SIZE):
+    """
+    Stream the whole catalogue as flat records.
+
+    Args:
+        chunk_size (int): The number of rows fetched from the database at once.
+
+    Yields:
+        dict: One record per category, quiz, question and option.
+    """
+    categories = Category.objects.order_by("id").values_list("id", "name")
+    for category_id, name in categories.iterator(chunk_size=chunk_size):
+        yield {"type": "category", "id": category_id, "text": name}
+
+    quizzes = Quiz.objects.order_by("id").values_list(
+        "id",
+        "category_id",
+        "title",
+        "image",
+        "sample_size",
+        "stratify_sample",
+        "shuffle_options",
+    )
+    for (
+        quiz_id,
+        category_id,
+        title,
+        image,
+        sample_size,
+        stratify_sample,
+        shuffle_options,
+    ) in quizzes.iterator(chunk_size=chunk_size):
+        yield {
+            "type": "quiz",
+            "id": quiz_id,
+            "parent": category_id,
+            "text": title,
+            "image": image or "",
+            "sample_size": sample_size,
+            "stratify_sample": stratify_sample,
+            "shuffle_options": shuffle_options,
+        }
+
+    questions = Question.objects.order_by("id").values_list(
+        "id", "quiz_id", "text", "question_type", "max_edits"
+    )
+    for question_id, quiz_id, text, question_type, max_edits in questions.iterator(
+        chunk_size=chunk_size
+    ):
+        yield {
+            "type": "question",
+            "id": question_id,
+            "parent": quiz_id,
+            "text": text,
+            "question_type": question_type,
+            "max_edits": max_edits,
+        }
+
+    options = Option.objects.order_by("id").values_list(
+        "id", "question_id", "text", "is_correct"
+    )
+    for option_id, question_id, text, is_correct in options.iterator(
+        chunk_size=chunk_size
+    ):
+        yield {
+            "type": "option",
+            "id": option_id,
+            "parent": question_id,
+            "text": text,
+            "is_correct": is_correct,
+        }
+
+
+def write_records(records, stream, fmt):
+    """
+    Write records as JSONL or CSV.
+
+    Args:
+        records (iterable): The records to write.
+        stream (file): The text stream to write to.
+        fmt (str): "jsonl" or "csv".
+
+    Returns:
+        int: The number of records written.
+    """
+    count = 0
+    if fmt == "csv":
+        writer = csv.DictWriter(stream, fieldnames=RECORD_FIELDS)
+        writer.writeheader()
+        for record in records:
+            writer.writerow(record)
+            count += 1
+    else:
+        for record in records:
+            stream.write(json.dumps(record, ensure_ascii=False) + "\n")
+            count += 1
+    return count
+
+
+def read_records(stream, fmt):
+    """
+    Read records from JSONL or CSV.
+
+    Args:
+        stream (file): The text stream to read from.
+        fmt (str): "jsonl" or "csv".
+
+    Yields:
+        dict: The records, with "id", "parent" and "sample_size" as integers
+        or None and the flags as booleans.
+    """
+    if fmt == "csv":
+        rows = csv.DictReader(stream)
+    else:
+        rows = (json.loads(line) for line in stream if line.strip())
+    for row in rows:
+        for field in ("id", "parent", "sample_size"):
+            value = row.get(field)
+            row[field] = int(value) if value not in (None, "") else None
+        for field in ("is_correct", "stratify_sample", "shuffle_options"):
+            if isinstance(row.get(field), str):
+                row[field] = row[field].lower() in ("true", "1")
+        yield row
+
+
+def _build_instance(record, id_maps):
+    """
+    Build the unsaved model instance described by a record.
+
+    Raises:
+        ValueError: If the record has an unknown type or an unknown parent.
+    """
+    record_type = record.get("type")
+    parent = record.get("parent")
+    if record_type == "category":
+        return Category(name=record["text"])
+    if record_type == "quiz":
+        category_id = id_maps["category"][parent] if parent is not None else None
+        sample_size = record.get("sample_size")
+        if sample_size is not None and sample_size < 1:
+            raise ValueError(f"sample_size must be positive, got {sample_size}")
+        return Quiz(
+            title=record["text"],
+            category_id=category_id,
+            image=record.get("image") or None,
+            sample_size=sample_size,
+            stratify_sample=bool(record.get("stratify_sample")),
+            shuffle_options=bool(record.get("shuffle_options")),
+        )
+    if record_type == "question":
+        return Question(
+            quiz_id=id_maps["quiz"][parent],
+            text=record["text"],
+            question_type=record.get("question_type") or "TEXT",
+            max_edits=int(record.get("max_edits") or 0),
+        )
+    if record_type == "option":
+        return Option(
+            question_id=id_maps["question"][parent],
+            text=record["text"],
+            is_correct=bool(record.get("is_correct")),
+            normalized_text=normalize_answer(record["text"]),
+        )
+    raise ValueError(f"Unknown record type: {record_type!r}")
+
+
+def _flush(record_type, instances, source_ids, id_maps):
+    """
+    Save a batch of instances of one type in one transaction and remap their IDs.
+    """
+    model = {
+        "category": Category,
+        "quiz": Quiz,
+        "question": Question,
+        "option": Option,
+    }[record_type]
+    with transaction.atomic():
+        created = model.objects.bulk_create(instances)
+    if record_type in id_maps:
+        for source_id, instance in zip(source_ids, created):
+            if source_id is not None:
+                id_maps[record_type][source_id] = instance.id
+
+
+def import_records(records, batch_size=CHUNK_SIZE):
+    """
+    Create the catalogue described by a stream of records.
+
+    Records are buffered per type and written with bulk_create, one batch per
+    transaction. Only the ID maps of categories, quizzes and questions are
+    kept in memory, since options are never referenced.
+
+    Args:
+        records (iterable): The records to import.
+        batch_size (int): The number of rows written per batch.
+
+    Returns:
+        dict: The number of imported rows per record type.
+
+    Raises:
+        ValueError: If a record is malformed or references an unknown parent.
+    """
+    id_maps = {"category": {}, "quiz": {}, "question": {}}
+    counts = dict.fromkeys(RECORD_TYPES, 0)
+    batch_type, instances, source_ids = None, [], []
+    try:
+        for line, record in enumerate(records, start=1):
+            record_type = record.get("type")
+            if batch_type is not None and (
+                record_type != batch_type or len(instances) >= batch_size
+            ):
+                _flush(batch_type, instances, source_ids, id_maps)
+                instances, source_ids = [], []
+            try:
+                instances.append(_build_instance(record, id_maps))
+            except KeyError as error:
+                raise ValueError(
+                    f"Record {line}: unknown parent or missing field {error}"
+                ) from error
+            except ValueError as error:
+                raise ValueError(f"Record {line}: {error}") from error
+            source_ids.append(record.get("id"))
+            counts[record_type] += 1
+            batch_type = record_type
+        if instances:
+            _flush(batch_type, instances, source_ids, id_maps)
+    finally:
+        # bulk_create sends no signals, and earlier batches stay committed
+        # even when a later record is rejected.
+        if counts["category"] or counts["quiz"]:
+            bump_catalogue_version()
+    return counts
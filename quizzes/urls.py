@@ -1,17 +1,81 @@
 """
 URL configuration module for the quizzes application.
+
+The read views quiz_list, take_quiz and quiz_result are served by their
+asynchronous versions when the QUIZZES_ASYNC_VIEWS setting is true, which
+quiz_site.asgi enables by default.
 """
 
-from django.urls import path
-from . import views
-
-urlpatterns = [
-    path("", views.quiz_list, name="quiz_list"),
-    path("manage/", views.manage_quiz, name="manage_quiz"),
-    path("create/", views.create_quiz, name="create_quiz"),
-    path("<int:quiz_id>/edit/", views.edit_quiz, name="edit_quiz"),
-    path("<int:quiz_id>/delete/", views.delete_quiz, name="delete_quiz"),
-    path("<int:quiz_id>/take/", views.take_quiz, name="take_quiz"),
-    path("<int:quiz_id>/save/", views.save_quiz_answers, name="save_quiz_answers"),
-    path("<int:quiz_id>/results/", views.quiz_result, name="quiz_result"),
+from django.conf import settings
+from django.urls import include, path
+from . import api, views
+
+api_urlpatterns = [
+    path("categories/", api.category_list, name="api_category_list"),
+    path("quizzes/", api.quiz_list, name="api_quiz_list"),
+    path("quizzes/<int:quiz_id>/", api.quiz_detail, name="api_quiz_detail"),
+    path("quizzes/<int:quiz_id>/submit/", api.submit_quiz, name="api_submit_quiz"),
 ]
+
+
+def build_urlpatterns(async_views):
+    """
+    Return the URL patterns of the application.
+
+    Args:
+        async_views (bool): Whether to route the read views to their
+            asynchronous versions.
+
+    Returns:
+        list: The URL patterns.
+    """
+    if async_views:
+        quiz_list = views.quiz_list_async
+        take_quiz = views.take_quiz_async
+        quiz_result = views.quiz_result_async
+    else:
+        quiz_list = views.quiz_list
+        take_quiz = views.take_quiz
+        quiz_result = views.quiz_result
+
+    return [
+        path("", quiz_list, name="quiz_list"),
+        path("search/", views.search, name="search"),
+        path("api/", include(api_urlpatterns)),
+        path("manage/", views.manage_quiz, name="manage_quiz"),
+        path(
+            "manage/instrumentation/",
+            views.instrumentation_report,
+            name="instrumentation_report",
+        ),
+        path("create/", views.create_quiz, name="create_quiz"),
+        path("<int:quiz_id>/edit/", views.edit_quiz, name="edit_quiz"),
+        path("<int:quiz_id>/delete/", views.delete_quiz, name="delete_quiz"),
+        path("<int:quiz_id>/take/", take_quiz, name="take_quiz"),
+        path(
+            "<int:quiz_id>/autosave/", views.autosave_answer, name="autosave_answer"
+        ),
+        path(
+            "<int:quiz_id>/save/", views.save_quiz_answers, name="save_quiz_answers"
+        ),
+        path("<int:quiz_id>/stats/", views.quiz_stats, name="quiz_stats"),
+        path("leaderboard/", views.leaderboard, name="leaderboard"),
+        path(
+            "<int:quiz_id>/leaderboard/",
+            views.leaderboard,
+            name="quiz_leaderboard",
+        ),
+        path(
+            "<int:quiz_id>/results/",
+            views.latest_quiz_result,
+            name="latest_quiz_result",
+        ),
+        path(
+            "<int:quiz_id>/results/<int:attempt_id>/",
+            quiz_result,
+            name="quiz_result",
+        ),
+    ]
+
+
+urlpatterns = build_urlpatterns(getattr(settings, "QUIZZES_ASYNC_VIEWS", False))
@@ -0,0 +1,59 @@
+"""
+Vendor assets module for the quizzes application.
+
+This module defines the following functions:
+- vendor_url: Return the URL a vendor library is loaded from.
+
+The front-end libraries of the pages are served from static/vendor, where the
+fetch_vendor_assets command downloads the pinned versions below, so pages need
+no external CDN and the libraries go through the static pipeline like any
+other file. A library that has not been fetched yet is loaded from its CDN.
+"""
+
+from functools import lru_cache
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.templatetags.static import static
+
+# Static path and CDN URL of every vendor library, by name.
+VENDOR_ASSETS = {
+    "bootstrap.css": (
+        "vendor/bootstrap/4.5.2/bootstrap.min.css",
+        "https://maxcdn.bootstrapcdn.com/bootstrap/4.5.2/css/bootstrap.min.css",
+    ),
+    "jquery.js": (
+        "vendor/jquery/3.5.1/jquery.min.js",
+        "https://ajax.googleapis.com/ajax/libs/jquery/3.5.1/jquery.min.js",
+    ),
+    "popper.js": (
+        "vendor/popper.js/1.16.0/popper.min.js",
+        "https://cdnjs.cloudflare.com/ajax/libs/popper.js/1.16.0/umd/popper.min.js",
+    ),
+    "bootstrap.js": (
+        "vendor/bootstrap/4.5.2/bootstrap.min.js",
+        "https://maxcdn.bootstrapcdn.com/bootstrap/4.5.2/js/bootstrap.min.js",
+    ),
+}
+
+
+@lru_cache(maxsize=None)
+def vendor_url(name):
+    """
+    Return the URL a vendor library is loaded from.
+
+    The result is cached for the life of the process.
+
+    Args:
+        name (str): The name of the library, a key of VENDOR_ASSETS.
+
+    Returns:
+        str: The static URL of the local copy, or the CDN URL if the library
+        was not fetched (or, without DEBUG, not collected).
+    """
+    path, cdn_url = VENDOR_ASSETS[name]
+    if settings.DEBUG and not finders.find(path):
+        return cdn_url
+    try:
+        return static(path)
+    except ValueError:
+        return cdn_url
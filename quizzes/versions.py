@@ -0,0 +1,146 @@
+"""
+Content versions module for the quizzes application.
+
+This module defines the following functions:
+- get_quiz_version: Return the content version of a quiz.
+- aget_quiz_version: Asynchronous version of get_quiz_version.
+- bump_quiz_version: Mark the content of a quiz as changed.
+- get_catalogue_version: Return the content version of the quiz catalogue.
+- bump_catalogue_version: Mark the quiz catalogue as changed.
+- version_datetime: Return the time a version was last bumped.
+
+Versions live in the "versions" cache and are part of the keys of derived
+cache entries, so bumping a version invalidates every entry built from the
+old content without having to know their keys. They also serve as HTTP
+validators (see quizzes.conditional). The versions cache must be shared by
+every process serving the site and large enough never to evict a version;
+the derived entries may live in a per-process cache.
+
+A version is the time of the last change in nanoseconds. Bumping adds the time
+elapsed since the previous version, and at least 1, with an incr, and a
+missing version is seeded from the clock with an add, so that an evicted
+counter never reuses an old value. Both must be atomic for racing bumps to
+yield distinct versions: they are with Redis and with the default
+AtomicFileBasedCache (see quiz_site/cache.py), but not with Django's plain
+FileBasedCache or DatabaseCache, whose add and incr read and then write.
+"""
+
+import datetime
+import time
+from django.core.cache import caches
+
+VERSION_CACHE_ALIAS = "versions"
+QUIZ_VERSION_CACHE_KEY = "quizzes:version:quiz:{quiz_id}"
+CATALOGUE_VERSION_CACHE_KEY = "quizzes:version:catalogue"
+
+
+def _cache():
+    return caches[VERSION_CACHE_ALIAS]
+
+
+def _get_version(key):
+    """
+    Return the version stored under a key, seeding it if it is missing.
+    """
+    cache = _cache()
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key)
+    return version
+
+
+async def _aget_version(key):
+    """
+    Asynchronous version of _get_version.
+    """
+    cache = _cache()
+    version = await cache.aget(key)
+    if version is None:
+        await cache.aadd(key, time.time_ns(), None)
+        version = await cache.aget(key)
+    return version
+
+
+def _bump_version(key):
+    """
+    Advance the version stored under a key, reseeding it if it is missing.
+    """
+    cache = _cache()
+    now = time.time_ns()
+    version = cache.get(key)
+    if version is None and cache.add(key, now, None):
+        return
+    try:
+        cache.incr(key, max(1, now - (version or now)))
+    except ValueError:
+        # Evicted between the add and the incr.
+        cache.set(key, now, None)
+
+
+def get_quiz_version(quiz_id):
+    """
+    Return the content version of a quiz.
+
+    Args:
+        quiz_id (int): The ID of the quiz.
+
+    Returns:
+        int: The current content version.
+    """
+    return _get_version(QUIZ_VERSION_CACHE_KEY.format(quiz_id=quiz_id))
+
+
+async def aget_quiz_version(quiz_id):
+    """
+    Asynchronous version of get_quiz_version.
+    """
+    return await _aget_version(QUIZ_VERSION_CACHE_KEY.format(quiz_id=quiz_id))
+
+
+def bump_quiz_version(quiz_id):
+    """
+    Mark the content of a quiz as changed.
+
+    Args:
+        quiz_id (int): The ID of the quiz.
+    """
+    _bump_version(QUIZ_VERSION_CACHE_KEY.format(quiz_id=quiz_id))
+
+
+def get_catalogue_version():
+    """
+    Return the content version of the quiz catalogue.
+
+    The catalogue covers what the quiz list shows: quiz titles, images and
+    categories.
+
+    Returns:
+        int: The current content version.
+    """
+    return _get_version(CATALOGUE_VERSION_CACHE_KEY)
+
+
+def bump_catalogue_version():
+    """
+    Mark the quiz catalogue as changed.
+    """
+    _bump_version(CATALOGUE_VERSION_CACHE_KEY)
+
+
+def version_datetime(version):
+    """
+    Return the time a version was last bumped.
+
+    Concurrent bumps can push a version slightly ahead of the clock, so the
+    result is capped at the current time.
+
+    Args:
+        version (int): A content version.
+
+    Returns:
+        datetime: The aware UTC datetime of the version.
+    """
+    return datetime.datetime.fromtimestamp(
+        min(version, time.time_ns()) / 1e9, datetime.timezone.utc
+    )
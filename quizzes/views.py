@@ -3,24 +3,161 @@
 Views module for the quizzes application.
 
 This module defines the following views:
-- quiz_list: Display a list of quizzes and categories.
+- quiz_list: Display a page of quizzes and the list of categories.
+- quiz_list_async: Asynchronous version of quiz_list.
+- search: Display the quizzes matching a search query.
 - take_quiz: Display the quiz for taking.
+- take_quiz_async: Asynchronous version of take_quiz.
+- autosave_answer: Store the answer to one question in the taker's draft.
 - save_quiz_answers: Save the answers submitted by the user.
-- quiz_result: Display the results of the taken quiz.
+- quiz_result: Display the results of an attempt at the quiz.
+- quiz_result_async: Asynchronous version of quiz_result.
+- latest_quiz_result: Redirect to the results of the latest attempt at the quiz.
+- quiz_stats: Display the statistics of a quiz to staff members.
+- leaderboard: Display the leaderboard of a quiz or the global leaderboard.
+- instrumentation_report: Return the request instrumentation summary to staff.
 - manage_quiz: Display a list of quizzes for management purposes.
 - create_quiz: Handle quiz creation.
 - edit_quiz: Handle quiz editing.
 - delete_quiz: Handle quiz deletion.
+
+The asynchronous read views use the async ORM and are routed instead of their
+synchronous counterparts when QUIZZES_ASYNC_VIEWS is set (see quizzes.urls).
+
+quiz_list and take_quiz answer conditional requests with 304 Not Modified
+using validators derived from content versions (see quizzes.conditional).
+
+Quizzes with a sample size or shuffled options are drawn again for every visit
+of take_quiz (see quizzes.sampling); the draw is posted back with the answers
+and stored on the attempt.
+
+Answers are autosaved to a cache-backed draft while the quiz is taken (see
+quizzes.drafts): take_quiz restores the draft, keeping the draw of randomized
+quizzes, and save_quiz_answers drops it once the attempt is saved.
+
+take_quiz and quiz_result are rendered from quiz snapshots (see
+quizzes.snapshots): an attempt is always shown against the version of the quiz
+it was taken on, even after the quiz is edited.
 """
 
+from django.contrib.admin.views.decorators import staff_member_required
+from django.core.exceptions import ValidationError
+from django.http import Http404, HttpResponse, HttpResponseBadRequest, JsonResponse
 from django.shortcuts import render, redirect, get_object_or_404
-from .models import Quiz, Category, Answer, Option
+from django.views.decorators.cache import cache_control, never_cache
+from django.views.decorators.http import condition, require_POST
+from quiz_site.replicas import no_replica_pin
+from .models import Quiz, Category, Attempt, Answer
+from .conditional import (
+    catalogue_etag,
+    catalogue_last_modified,
+    quiz_etag,
+    quiz_last_modified,
+)
+from .drafts import (
+    aget_request_draft,
+    asave_draft,
+    delete_draft,
+    get_request_draft,
+    get_taker,
+    new_taker,
+    restore_answers,
+    save_draft,
+    set_taker_cookie,
+    update_draft,
+)
+from .editing import save_quiz
 from .forms import QuizForm, QuestionFormSet
+from .grading import get_answer_key, grade
+from .images import get_derivative_url
+from .instrumentation import metrics
+from .leaderboards import get_rank, get_top
+from .payloads import aget_quiz_payload, get_quiz_payload
+from .sampling import (
+    aget_question_bank,
+    apply_layout,
+    draw_layout,
+    get_question_bank,
+    is_randomized,
+    load_layout,
+    sign_layout,
+)
+from .search import search_quizzes
+from .snapshots import (
+    aget_current_snapshot,
+    aget_snapshot,
+    get_current_snapshot,
+    get_snapshot,
+)
+from .stats import get_quiz_stats
+from .submissions import save_answers
+
+QUIZ_LIST_PAGE_SIZE = 24
+# Seconds browsers and proxies may reuse a page before revalidating it.
+QUIZ_LIST_MAX_AGE = 60
+SEARCH_MAX_AGE = 60
+# Limits of the values of one autosave, which are not checked against the quiz.
+AUTOSAVE_MAX_VALUES = 100
+AUTOSAVE_MAX_LENGTH = 1000
+
+
+def _int_param(request, name):
+    """
+    Return an integer query parameter, or None if it is missing or malformed.
+    """
+    try:
+        return int(request.GET[name])
+    except (KeyError, ValueError):
+        return None
 
 
+def _quiz_page_queryset(request):
+    """
+    Return the category filter of the request and the query of its page.
+
+    The query fetches one extra quiz to tell whether a next page exists.
+    """
+    category_id = _int_param(request, "category")
+    after = _int_param(request, "after")
+
+    quizzes = Quiz.objects.select_related("category").order_by("id")
+    if category_id is not None:
+        quizzes = quizzes.filter(category_id=category_id)
+    if after is not None:
+        quizzes = quizzes.filter(id__gt=after)
+    return category_id, quizzes[: QUIZ_LIST_PAGE_SIZE + 1]
+
+
+def _quiz_list_context(quizzes, categories, category_id):
+    """
+    Return the quiz list context for a fetched page of quizzes.
+
+    The card URL of every quiz is resolved from the quiz row, so rendering
+    the page reads neither storage nor the database.
+    """
+    next_after = None
+    if len(quizzes) > QUIZ_LIST_PAGE_SIZE:
+        quizzes = quizzes[:QUIZ_LIST_PAGE_SIZE]
+        next_after = quizzes[-1].id
+    for quiz in quizzes:
+        quiz.card_url = get_derivative_url(quiz, "card")
+    return {
+        "quizzes": quizzes,
+        "categories": categories,
+        "category_id": category_id,
+        "next_after": next_after,
+    }
+
+
+@cache_control(public=True, max_age=QUIZ_LIST_MAX_AGE)
+@condition(catalogue_etag, catalogue_last_modified)
 def quiz_list(request):
     """
-    Display a list of quizzes and categories.
+    Display a page of quizzes and the list of categories.
+
+    Quizzes are paginated by ID with a keyset cursor (?after=<id>) and can be
+    filtered by category (?category=<id>), so every page costs the same
+    however large the catalogue grows.
 
     Args:
         request (HttpRequest): The HTTP request object.
@@ -28,12 +165,86 @@ def quiz_list(request):
     Returns:
         HttpResponse: The rendered quiz list page.
     """
-    quizzes = Quiz.objects.all()
-    categories = Category.objects.all()
-    context = {"quizzes": quizzes, "categories": categories}
+    category_id, quizzes = _quiz_page_queryset(request)
+    context = _quiz_list_context(
+        list(quizzes), Category.objects.order_by("name"), category_id
+    )
+    return render(request, "quizzes/quiz_list.html", context)
+
+
+@cache_control(public=True, max_age=QUIZ_LIST_MAX_AGE)
+@condition(catalogue_etag, catalogue_last_modified)
+async def quiz_list_async(request):
+    """
+    Asynchronous version of quiz_list.
+    """
+    category_id, quizzes = _quiz_page_queryset(request)
+    context = _quiz_list_context(
+        [quiz async for quiz in quizzes],
+        [category async for category in Category.objects.order_by("name")],
+        category_id,
+    )
     return render(request, "quizzes/quiz_list.html", context)
 
 
+@cache_control(public=True, max_age=SEARCH_MAX_AGE)
+def search(request):
+    """
+    Display the quizzes matching a search query.
+
+    Args:
+        request (HttpRequest): The HTTP request object.
+
+    Returns:
+        HttpResponse: The rendered search results page.
+    """
+    query = request.GET.get("q", "").strip()
+    quizzes = search_quizzes(query) if query else []
+    return render(
+        request, "quizzes/search.html", {"query": query, "quizzes": quizzes}
+    )
+
+
+def _take_quiz_context(quiz, bank, draft):
+    """
+    Return the context of the take quiz page and the draft to store, if any.
+
+    Randomized quizzes keep the draw of the draft while it is valid and are
+    drawn again otherwise, which starts a new draft. The answers of the draft
+    are filled in.
+    """
+    draft = draft or {"draw": None, "answers": {}}
+    questions = quiz["questions"]
+    new_draft = None
+    if is_randomized(bank):
+        try:
+            layout = load_layout(quiz["id"], draft["draw"])
+        except ValidationError:
+            layout = draw_layout(bank)
+            draft = new_draft = {
+                "draw": sign_layout(quiz["id"], layout),
+                "answers": {},
+            }
+        questions = apply_layout(questions, layout)
+    context = {
+        "quiz": quiz,
+        "questions": restore_answers(questions, draft["answers"]),
+        "draw": draft["draw"] if is_randomized(bank) else None,
+    }
+    return context, new_draft
+
+
+def _remember_taker(request, response, taker):
+    """
+    Set the draft owner cookie on a response unless the request has it.
+    """
+    if get_taker(request) != taker:
+        set_taker_cookie(response, taker)
+    return response
+
+
+@cache_control(private=True, no_cache=True)
+@condition(quiz_etag, quiz_last_modified)
 def take_quiz(request, quiz_id):
     """
     Display the quiz for taking.
@@ -45,13 +256,83 @@ def take_quiz(request, quiz_id):
     Returns:
         HttpResponse: The rendered take quiz page.
     """
-    quiz = Quiz.objects.get(id=quiz_id)
-    questions = quiz.questions.all()
-    return render(
-        request, "quizzes/take_quiz.html", {"quiz": quiz, "questions": questions}
+    quiz = get_quiz_payload(quiz_id)
+    bank = get_question_bank(quiz_id, quiz)
+    taker = get_taker(request) or new_taker()
+    context, new_draft = _take_quiz_context(
+        quiz, bank, get_request_draft(request, quiz_id)
+    )
+    if new_draft is not None:
+        save_draft(taker, quiz_id, new_draft)
+    response = render(request, "quizzes/take_quiz.html", context)
+    return _remember_taker(request, response, taker)
+
+
+@cache_control(private=True, no_cache=True)
+@condition(quiz_etag, quiz_last_modified)
+async def take_quiz_async(request, quiz_id):
+    """
+    Asynchronous version of take_quiz.
+    """
+    quiz = await aget_quiz_payload(quiz_id)
+    bank = await aget_question_bank(quiz_id, quiz)
+    taker = get_taker(request) or new_taker()
+    context, new_draft = _take_quiz_context(
+        quiz, bank, await aget_request_draft(request, quiz_id)
     )
+    if new_draft is not None:
+        await asave_draft(taker, quiz_id, new_draft)
+    response = render(request, "quizzes/take_quiz.html", context)
+    return _remember_taker(request, response, taker)
 
 
+@no_replica_pin
+@require_POST
+@never_cache
+def autosave_answer(request, quiz_id):
+    """
+    Store the answer to one question in the taker's draft.
+
+    The request posts "question", the question ID, and "value" once per
+    selected option ID or with the typed text; no value clears the answer.
+    Autosaving touches neither the database nor the session, so it does not
+    pin the taker to the primary database either.
+
+    Args:
+        request (HttpRequest): The HTTP request object.
+        quiz_id (int): The ID of the quiz being taken.
+
+    Returns:
+        HttpResponse: An empty 204 response, or a bad request response if the
+        taker has no draft cookie, the question is not one of the quiz or the
+        answer is malformed.
+
+    Raises:
+        Http404: If the quiz does not exist.
+    """
+    taker = get_taker(request)
+    if taker is None:
+        return HttpResponseBadRequest("Missing draft cookie.")
+    try:
+        question_id = int(request.POST["question"])
+    except (KeyError, ValueError):
+        return HttpResponseBadRequest("Invalid question.")
+    # The snapshot of a quiz being taken is in memory: no query.
+    if question_id not in get_current_snapshot(quiz_id).question_ids:
+        return HttpResponseBadRequest("Invalid question.")
+    values = request.POST.getlist("value")
+    if len(values) > AUTOSAVE_MAX_VALUES or any(
+        len(value) > AUTOSAVE_MAX_LENGTH for value in values
+    ):
+        return HttpResponseBadRequest("Answer too long.")
+    try:
+        update_draft(taker, quiz_id, question_id, values)
+    except ValueError as error:
+        return HttpResponseBadRequest(str(error))
+    return HttpResponse(status=204)
+
+
+@never_cache
 def save_quiz_answers(request, quiz_id):
     """
     Save the answers submitted by the user.
@@ -61,98 +342,217 @@ def save_quiz_answers(request, quiz_id):
         quiz_id (int): The ID of the quiz being taken.
 
     Returns:
-        HttpResponse: Redirect to the quiz result page or take quiz page.
+        HttpResponse: Redirect to the quiz result page or take quiz page,
+        or a bad request response if any posted option is invalid.
     """
     quiz = Quiz.objects.get(id=quiz_id)
-    questions = quiz.questions.all()
     if request.method == "POST":
-        Answer.objects.filter(question__in=questions).delete()  # Clear previous answers
-        for question in questions:
-            if question.question_type == "TEXT":
-                user_answer = request.POST.get(f"question_{question.id}")
-                Answer.objects.create(question=question, text_answer=user_answer)
-            elif question.question_type == "RADIO":
-                selected_option_id = request.POST.get(f"question_{question.id}")
-                if selected_option_id:
-                    option = Option.objects.get(id=selected_option_id)
-                    Answer.objects.create(question=question, selected_option=option)
-            elif question.question_type == "CHECKBOX":
-                selected_option_ids = request.POST.getlist(f"question_{question.id}")
-                for option_id in selected_option_ids:
-                    option = Option.objects.get(id=option_id)
-                    Answer.objects.create(question=question, selected_option=option)
-        return redirect("quiz_result", quiz_id=quiz.id)
+        # The session identifies the taker on the leaderboards.
+        if request.session.session_key is None:
+            request.session.create()
+        try:
+            attempt, _ = save_answers(
+                quiz.id,
+                request.POST,
+                request.session.session_key,
+                draw=request.POST.get("draw"),
+            )
+        except ValidationError as error:
+            return HttpResponseBadRequest(" ".join(error.messages))
+        delete_draft(get_taker(request), quiz.id)
+        return redirect("quiz_result", quiz_id=quiz.id, attempt_id=attempt.id)
     return redirect("take_quiz", quiz_id=quiz.id)
 
 
-def quiz_result(request, quiz_id):
+def _taker_attempts(request):
+    """
+    Return the attempts submitted in the session of a request.
+
+    Results are only shown to the session that submitted them: attempt IDs
+    are sequential, so they alone would expose the answers of every taker.
+    """
+    session_key = request.session.session_key
+    if not session_key:
+        return Attempt.objects.none()
+    return Attempt.objects.filter(session_key=session_key)
+
+
+def _quiz_result_context(snapshot, layout, answers):
     """
-    Display the results of the taken quiz.
+    Grade the answers of an attempt against its snapshot for the result page.
+    """
+    answer_key = snapshot.answer_key
+    if layout:
+        answer_key = apply_layout(answer_key, layout)
+    score, results = grade(answer_key, answers)
+    return {
+        "score": score,
+        "quiz": snapshot.payload,
+        "total_questions": len(answer_key),
+        "results": results,
+    }
+
+
+@cache_control(private=True, no_cache=True)
+def quiz_result(request, quiz_id, attempt_id):
+    """
+    Display the results of an attempt at the quiz.
+
+    The attempt is shown as graded, from the snapshot of the quiz version it
+    was taken on; attempts saved before snapshots existed use the current one.
+    Only the session that submitted the attempt can see it.
 
     Args:
         request (HttpRequest): The HTTP request object.
         quiz_id (int): The ID of the quiz taken.
+        attempt_id (int): The ID of the attempt.
 
     Returns:
         HttpResponse: The rendered quiz result page.
+
+    Raises:
+        Http404: If the attempt does not exist or belongs to another session.
     """
-    quiz = Quiz.objects.get(id=quiz_id)
-    answers = Answer.objects.filter(question__quiz=quiz)
-    score = 0
-    total_questions = quiz.questions.count()
-    results = []
-
-    for question in quiz.questions.all():
-        question_result = {
-            "question": question,
-            "correct": [],
-            "selected": [],
-            "options": [],
-        }
-        if question.question_type == "TEXT":
-            correct_option = question.options.filter(is_correct=True).first()
-            user_answer = answers.filter(question=question).first()
-            question_result["correct"].append(
-                correct_option.text if correct_option else ""
-            )
-            question_result["selected"].append(
-                user_answer.text_answer if user_answer else ""
-            )
-            if (
-                user_answer
-                and correct_option
-                and user_answer.text_answer.strip().lower()
-                == correct_option.text.strip().lower()
-            ):
-                score += 1
-        else:
-            correct_options = question.options.filter(is_correct=True)
-            user_answers = answers.filter(question=question)
-            selected_option_ids = user_answers.values_list("selected_option", flat=True)
-            for option in question.options.all():
-                question_result["options"].append(option)
-                if option.is_correct:
-                    question_result["correct"].append(option.text)
-                if option.id in selected_option_ids:
-                    question_result["selected"].append(option.text)
-            if set(selected_option_ids) == set(
-                correct_options.values_list("id", flat=True)
-            ):
-                score += 1
-        results.append(question_result)
+    attempt = get_object_or_404(
+        _taker_attempts(request).values("layout", "snapshot_id"),
+        id=attempt_id,
+        quiz_id=quiz_id,
+    )
+    if attempt["snapshot_id"] is None:
+        snapshot = get_current_snapshot(quiz_id)
+    else:
+        snapshot = get_snapshot(attempt["snapshot_id"])
+    answers = (
+        Answer.objects.filter(attempt_id=attempt_id)
+        .order_by("id")
+        .values_list("question_id", "selected_option_id", "text_answer", "is_correct")
+    )
+    return render(
+        request,
+        "quizzes/quiz_result.html",
+        _quiz_result_context(snapshot, attempt["layout"], answers),
+    )
+
 
+@cache_control(private=True, no_cache=True)
+async def quiz_result_async(request, quiz_id, attempt_id):
+    """
+    Asynchronous version of quiz_result.
+    """
+    attempt = (
+        await _taker_attempts(request)
+        .filter(id=attempt_id, quiz_id=quiz_id)
+        .values("layout", "snapshot_id")
+        .afirst()
+    )
+    if attempt is None:
+        raise Http404("No Attempt matches the given query.")
+    if attempt["snapshot_id"] is None:
+        snapshot = await aget_current_snapshot(quiz_id)
+    else:
+        snapshot = await aget_snapshot(attempt["snapshot_id"])
+    answers = [
+        answer
+        async for answer in Answer.objects.filter(attempt_id=attempt_id)
+        .order_by("id")
+        .values_list("question_id", "selected_option_id", "text_answer", "is_correct")
+    ]
     return render(
         request,
         "quizzes/quiz_result.html",
+        _quiz_result_context(snapshot, attempt["layout"], answers),
+    )
+
+
+@never_cache
+def latest_quiz_result(request, quiz_id):
+    """
+    Redirect to the results of the latest attempt of the session at the quiz.
+
+    Args:
+        request (HttpRequest): The HTTP request object.
+        quiz_id (int): The ID of the quiz taken.
+
+    Returns:
+        HttpResponse: Redirect to the quiz result page.
+
+    Raises:
+        Http404: If the session has no attempt at the quiz.
+    """
+    attempt = (
+        _taker_attempts(request)
+        .filter(quiz_id=quiz_id)
+        .order_by("-created")
+        .values_list("id", flat=True)
+        .first()
+    )
+    if attempt is None:
+        raise Http404("No attempts at this quiz.")
+    return redirect("quiz_result", quiz_id=quiz_id, attempt_id=attempt)
+
+
+@staff_member_required
+def quiz_stats(request, quiz_id):
+    """
+    Display the statistics of a quiz to staff members.
+
+    Only the precomputed summary tables are read.
+
+    Args:
+        request (HttpRequest): The HTTP request object.
+        quiz_id (int): The ID of the quiz.
+
+    Returns:
+        HttpResponse: The rendered quiz statistics page.
+    """
+    quiz = get_object_or_404(Quiz, id=quiz_id)
+    stats = get_quiz_stats(quiz.id, get_answer_key(quiz.id))
+    return render(request, "quizzes/quiz_stats.html", {"quiz": quiz, **stats})
+
+
+@never_cache
+def leaderboard(request, quiz_id=None):
+    """
+    Display the leaderboard of a quiz or the global leaderboard.
+
+    Only the leaderboard cache is read, see quizzes.leaderboards.
+
+    Args:
+        request (HttpRequest): The HTTP request object.
+        quiz_id (int): The ID of the quiz, or None for the global leaderboard.
+
+    Returns:
+        HttpResponse: The rendered leaderboard page, with the rank of the
+        current taker.
+    """
+    quiz = get_object_or_404(Quiz, id=quiz_id) if quiz_id is not None else None
+    member = request.session.session_key
+    return render(
+        request,
+        "quizzes/leaderboard.html",
         {
-            "score": score,
             "quiz": quiz,
-            "total_questions": total_questions,
-            "results": results,
+            "entries": get_top(quiz_id, member),
+            "my_rank": get_rank(member, quiz_id) if member else None,
         },
     )
 
 
+@staff_member_required
+def instrumentation_report(request):
+    """
+    Return the request instrumentation summary to staff members.
+
+    Args:
+        request (HttpRequest): The HTTP request object.
+
+    Returns:
+        JsonResponse: Duration percentiles, query counts and template render
+        times per view name.
+    """
+    return JsonResponse(metrics.report())
+
+
 def manage_quiz(request):
     """
     Display a list of quizzes for management purposes.
@@ -171,6 +571,8 @@ def create_quiz(request):
     """
     Handle quiz creation.
 
+    The quiz, its questions and their options are saved in one transaction.
+
     Args:
         request (HttpRequest): The HTTP request object.
 
@@ -184,11 +586,7 @@ def create_quiz(request):
         )
 
         if quiz_form.is_valid() and question_formset.is_valid():
-            quiz = quiz_form.save()
-            questions = question_formset.save(commit=False)
-            for question in questions:
-                question.quiz = quiz
-                question.save()
+            save_quiz(quiz_form, question_formset)
             return redirect("manage_quiz")
     else:
         quiz_form = QuizForm()
@@ -208,6 +606,9 @@ def edit_quiz(request, quiz_id):
     """
     Handle quiz editing.
 
+    Only the questions and options that changed are written, in bulk and in
+    one transaction.
+
     Args:
         request (HttpRequest): The HTTP request object.
         quiz_id (int): The ID of the quiz to edit.
@@ -222,11 +623,7 @@ def edit_quiz(request, quiz_id):
         question_formset = QuestionFormSet(request.POST, instance=quiz)
 
         if quiz_form.is_valid() and question_formset.is_valid():
-            quiz = quiz_form.save()
-            questions = question_formset.save(commit=False)
-            for question in questions:
-                question.quiz = quiz
-                question.save()
+            save_quiz(quiz_form, question_formset)
             return redirect("manage_quiz")
     else:
         quiz_form = QuizForm(instance=quiz)